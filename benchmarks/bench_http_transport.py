@@ -0,0 +1,99 @@
+"""
+Per-request latency of a Discord poll: bare `requests.get` (new TCP/TLS connection per call, as before)
+vs the pooled keep-alive clients from `http_transport`, against a local stand-in of the Discord endpoint.
+
+    python -m benchmarks.bench_http_transport [--requests 200] [--tls]
+
+--tls serves over HTTPS with a throw-away self-signed certificate (needs the `openssl` CLI) so the
+handshake cost that pooling removes is included.
+"""
+import argparse
+import asyncio
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import time
+
+import httpx
+import requests
+
+import http_transport
+from tests.fake_discord_rest import FakeDiscordRestServer
+
+CHANNEL_ID = '1021379480503205898'
+
+
+def make_certificate(directory: str) -> tuple:
+    certfile, keyfile = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1',
+                    '-keyout', keyfile, '-out', certfile], check=True, capture_output=True)
+    return certfile, keyfile
+
+
+def summarize(name: str, samples: list) -> str:
+    samples = sorted(samples)
+    p99 = samples[int(0.99 * (len(samples) - 1))]
+    return (f'{name:<24} {1000 * statistics.mean(samples):>8.3f} {1000 * statistics.median(samples):>8.3f} '
+            f'{1000 * p99:>8.3f}')
+
+
+def bench_requests(url: str, count: int, verify) -> list:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        requests.get(url, headers={'authorization': 'token'}, verify=verify).json()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_pooled(url: str, count: int, verify) -> list:
+    client = httpx.Client(**http_transport.client_options(), verify=verify)
+    samples = []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            client.get(url, headers={'authorization': 'token'}).json()
+            samples.append(time.perf_counter() - start)
+    finally:
+        client.close()
+    return samples
+
+
+async def bench_pooled_async(url: str, count: int, verify) -> list:
+    samples = []
+    async with httpx.AsyncClient(**http_transport.client_options(), verify=verify) as client:
+        for _ in range(count):
+            start = time.perf_counter()
+            (await client.get(url, headers={'authorization': 'token'})).json()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--tls', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = make_certificate(tmp) if args.tls else (None, None)
+        server = FakeDiscordRestServer(certfile, keyfile).start()
+        for i in range(50):
+            server.add_message({'id': str(1384267025815175340 + i), 'content': f'msg {i}', 'embeds': []})
+        url = server.base_url.format(channel_id=CHANNEL_ID, msg_limit=50)
+        verify_requests = certfile if args.tls else True
+        verify_httpx = ssl.create_default_context(cafile=certfile) if args.tls else True
+
+        print(f'{server.scheme.upper()} x {args.requests} requests, latency in ms')
+        print(f'{"client":<24} {"mean":>8} {"p50":>8} {"p99":>8}')
+        print(summarize('requests.get (no pool)', bench_requests(url, args.requests, verify_requests)))
+        print(summarize('httpx.Client (pooled)', bench_pooled(url, args.requests, verify_httpx)))
+        print(summarize('httpx.AsyncClient', asyncio.run(bench_pooled_async(url, args.requests, verify_httpx))))
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
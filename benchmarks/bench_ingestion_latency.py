@@ -0,0 +1,140 @@
+"""
+Message-arrival → signal execution latency, REST polling vs Gateway push.
+
+Runs the real `Main.run` runtime (with signal execution replaced by a timestamp recorder and no IB
+connection) against local stand-ins for the Discord REST endpoint and the Gateway, posting messages at
+random intervals.
+
+    python -m benchmarks.bench_ingestion_latency [--messages 20] [--poll-interval 1.0]
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from datetime import datetime, timezone, timedelta
+
+import config
+import discord_interface
+import http_transport
+from discord_gateway import DiscordGatewayClient
+from main import Main
+from poll_scheduler import AdaptivePollScheduler
+from signal_pipeline import SignalPipeline
+from contract_prefetcher import ContractPrefetcher
+from tests.fake_discord_rest import FakeDiscordRestServer
+from tests.fake_gateway import FakeGatewayServer
+
+PUBLISHED_AT = {}
+
+
+class OfflineIBInterface:
+    """
+    The parts of IBInterface the runtime touches while idle, without a connection.
+    """
+
+    async def refresh_option_chains_async(self):
+        pass
+
+
+class IngestionHarness(Main):
+    def __init__(self, mode: str, rest_url: str, gateway_url: str, duration: float, last_signal_id: int):
+        self.poll_scheduler = AdaptivePollScheduler.from_config()
+        self.poll_mode = None
+        self.dc_client = discord_interface.DiscordChannelClient('token', base_url=rest_url,
+                                                                scheduler=self.poll_scheduler)
+        self.last_signal_id = last_signal_id
+        self.fetch_cursor = last_signal_id
+        self.message_queue = asyncio.Queue()
+        self.signal_queue = asyncio.Queue()
+        self.notifications = set()
+        self.pipeline = SignalPipeline.from_config()
+        self.ib_interface = OfflineIBInterface()
+        self.prefetcher = ContractPrefetcher(self.ib_interface)
+        self.gateway = None
+        self.gateway_live = False
+        if mode == 'gateway':
+            self.gateway = DiscordGatewayClient('token', [config.CHANNEL_INFO['channel_id']],
+                                                self.on_gateway_message, gateway_url=gateway_url)
+        self.EXIT_TIME = int(time.time() + duration)
+        self.latencies = []
+
+    def background_tasks(self) -> list:
+        return [self.gateway.run()] if self.gateway is not None else []
+
+    def parse_signal(self, signal: dict, trace=None):
+        return dict(signal, underlying='SPX')
+
+    async def execute_signal(self, signal: dict, trace=None):
+        self.latencies.append(time.perf_counter() - PUBLISHED_AT[signal['id']])
+
+
+def publish_messages(count: int, rest: FakeDiscordRestServer, gateway: FakeGatewayServer, loop, next_id):
+    time.sleep(1.5)
+    for _ in range(count):
+        time.sleep(0.1 + 0.4 * (next_id[0] % 7) / 7)
+        created = datetime.now(timezone.utc) - timedelta(milliseconds=5)
+        next_id[0] = max(next_id[0] + 1, discord_interface.snowflake_from_datetime(created))
+        message = {'id': str(next_id[0]), 'channel_id': config.CHANNEL_INFO['channel_id'],
+                   'content': 'BTO SPX 5800C 0DTE', 'embeds': [], 'timestamp': created.isoformat()}
+        PUBLISHED_AT[message['id']] = time.perf_counter()
+        rest.add_message(message)
+        if gateway is not None:
+            asyncio.run_coroutine_threadsafe(gateway.publish(message), loop).result()
+
+
+async def run_harness(harness: IngestionHarness):
+    try:
+        await harness.run_async()
+    finally:
+        await http_transport.aclose()  # the shared async client is bound to this run's event loop
+
+
+def run_mode(mode: str, count: int, rest, gateway, loop, next_id) -> dict:
+    duration = 1.5 + count * 0.5 + 3
+    harness = IngestionHarness(mode, rest.base_url, gateway.url, duration, next_id[0])
+    requests_before = len(rest.requests)
+    publisher = threading.Thread(target=publish_messages,
+                                 args=(count, rest, gateway if mode == 'gateway' else None, loop, next_id))
+    publisher.start()
+    asyncio.run(run_harness(harness))
+    publisher.join()
+    latencies = sorted(harness.latencies)
+    return {'mode': mode, 'delivered': len(latencies),
+            'p50_ms': 1000 * statistics.median(latencies) if latencies else float('nan'),
+            'p99_ms': 1000 * latencies[int(0.99 * (len(latencies) - 1))] if latencies else float('nan'),
+            'max_ms': 1000 * latencies[-1] if latencies else float('nan'),
+            'http_requests': len(rest.requests) - requests_before}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=20)
+    parser.add_argument('--poll-interval', type=float, default=config.SLEEP_DELAY_BETWEEN_POLLS,
+                        help='SLEEP_DELAY_BETWEEN_POLLS and idle poll cadence')
+    args = parser.parse_args()
+
+    config.TEST_MODE = True  # never touch last_log_id.json
+    config.FLATTEN_AT_EXIT = False  # nothing to flatten without IB
+    config.SLEEP_DELAY_BETWEEN_POLLS = args.poll_interval
+    config.POLL_IDLE_DELAY = args.poll_interval
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    gateway = asyncio.run_coroutine_threadsafe(FakeGatewayServer().start(), loop).result()
+    rest = FakeDiscordRestServer().start()
+    next_id = [discord_interface.snowflake_from_datetime(datetime.now(timezone.utc))]
+
+    results = [run_mode(mode, args.messages, rest, gateway, loop, next_id) for mode in ('poll', 'gateway')]
+
+    print(f'{"mode":<8} {"delivered":>9} {"p50 ms":>9} {"p99 ms":>9} {"max ms":>9} {"HTTP reqs":>10}')
+    for r in results:
+        print(f'{r["mode"]:<8} {r["delivered"]:>9} {r["p50_ms"]:>9.1f} {r["p99_ms"]:>9.1f} {r["max_ms"]:>9.1f} '
+              f'{r["http_requests"]:>10}')
+
+    rest.stop()
+    asyncio.run_coroutine_threadsafe(gateway.stop(), loop).result()
+
+
+if __name__ == '__main__':
+    main()
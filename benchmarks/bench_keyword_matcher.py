@@ -0,0 +1,79 @@
+"""
+Keyword detection cost as the vocabularies grow: the per-keyword `keyword in text.lower()` scans the
+parser used vs the compiled KeywordMatcher (substring and whole-word modes).
+
+    python -m benchmarks.bench_keyword_matcher [--messages 2000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+
+import config
+from keyword_matcher import KeywordMatcher
+
+SIZES = (10, 100, 500)
+
+MESSAGES = [
+    "BTO SPX 5800C 0DTE @ 4.20 small size, lotto",
+    "good morning everyone, watching SPY 540 level today into the open",
+    "Scaling out of SPX 5800C here, holding runners for the afternoon push",
+    "STC AAPL 150C 06/20 all out, nice trade everyone",
+]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> dict:
+    vocabulary = {}
+    for category, seed in (('BUY', config.BUY_SIGNALS), ('SELL', config.SELL_SIGNALS), ('TRIM', config.TRIM_SIGNALS)):
+        words = list(seed)
+        while len(words) < size:
+            words.append(''.join(rng.choice('ABCDEFGHIJKLMNOPRSTUVWXYZ') for _ in range(rng.randint(4, 9))))
+        vocabulary[category] = words[:size]
+    return vocabulary
+
+
+def naive(vocabulary: dict, messages: list) -> int:
+    found = 0
+    for text in messages:
+        for keywords in vocabulary.values():
+            found += any(keyword.lower() in text.lower() for keyword in keywords)
+    return found
+
+
+def compiled(matcher: KeywordMatcher, messages: list) -> int:
+    found = 0
+    for text in messages:
+        found += len(matcher.categories_in(text))
+    return found
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    messages = [MESSAGES[i % len(MESSAGES)] for i in range(args.messages)]
+    print(f'{"keywords/category":>18} {"naive scan":>12} {"substring":>12} {"whole word":>12}  (us/msg)')
+    for size in SIZES:
+        vocabulary = make_vocabulary(size, rng)
+        substring = KeywordMatcher(vocabulary, whole_word=False)
+        whole_word = KeywordMatcher(vocabulary)
+        assert naive(vocabulary, messages) == compiled(substring, messages)
+        timings = [best_of(args.repeat, naive, vocabulary, messages),
+                   best_of(args.repeat, compiled, substring, messages),
+                   best_of(args.repeat, compiled, whole_word, messages)]
+        print(f'{size:>18} ' + ' '.join(f'{1e6 * t / args.messages:12.2f}' for t in timings))
+
+
+if __name__ == '__main__':
+    main()
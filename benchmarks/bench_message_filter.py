@@ -0,0 +1,85 @@
+"""
+New-message filtering over a synthetic 10k-message backlog: the previous dateutil/Decimal list
+comprehension (plus the per-signal re-parse) vs the snowflake-only `filter_new_messages`.
+
+    python -m benchmarks.bench_message_filter [--messages 10000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone, timedelta
+from decimal import Decimal
+
+from dateutil.parser import parse as parse_dt_from_str
+
+from discord_interface import filter_new_messages, snowflake_from_ms, snowflake_to_ms
+
+MAX_AGE_SECONDS = 60
+
+
+def make_backlog(count: int, now_ms: int) -> list:
+    rng = random.Random(7)
+    messages = []
+    for i in range(count):
+        created_ms = now_ms - rng.randint(0, 10 * 60 * 1000)
+        created = datetime.fromtimestamp(created_ms / 1000, tz=timezone.utc)
+        messages.append({'id': str(snowflake_from_ms(created_ms) + i % 4096), 'content': 'BTO SPX 5800C 0DTE',
+                         'embeds': [], 'timestamp': created.isoformat()})
+    messages.sort(key=lambda m: int(m['id']), reverse=True)
+    return messages
+
+
+def legacy_filter(messages: list, last_signal_id, c_dt: datetime) -> list:
+    signals = [signal for signal in messages
+               if Decimal(signal['id']) > Decimal(last_signal_id)
+               and ((c_dt - parse_dt_from_str(signal['timestamp']).replace(tzinfo=timezone.utc)).total_seconds()
+                    < MAX_AGE_SECONDS)
+               and c_dt > parse_dt_from_str(signal['timestamp']).replace(tzinfo=timezone.utc)]
+    signals.reverse()
+    kept = []
+    for signal in signals:
+        msg_time = parse_dt_from_str(signal['timestamp']).replace(tzinfo=timezone.utc)
+        if c_dt - msg_time > timedelta(seconds=MAX_AGE_SECONDS):
+            continue
+        kept.append(signal)
+    return kept
+
+
+def snowflake_filter(messages: list, last_signal_id, now_ms: int) -> list:
+    signals = filter_new_messages(messages, last_signal_id, now_ms, MAX_AGE_SECONDS * 1000)
+    return [signal for signal in signals if now_ms - snowflake_to_ms(signal['id']) <= MAX_AGE_SECONDS * 1000]
+
+
+def best_of(repeat: int, fn, *args) -> tuple:
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    now_ms = int(time.time() * 1000)
+    c_dt = datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc)
+    backlog = make_backlog(args.messages, now_ms)
+    last_signal_id = backlog[len(backlog) // 2]['id']
+
+    legacy_time, legacy = best_of(args.repeat, legacy_filter, backlog, last_signal_id, c_dt)
+    fast_time, fast = best_of(args.repeat, snowflake_filter, backlog, last_signal_id, now_ms)
+
+    print(f'{args.messages} messages, {len(fast)} fresh after cursor')
+    print(f'dateutil + Decimal : {1000 * legacy_time:9.2f} ms  ({1e6 * legacy_time / args.messages:.2f} us/msg)')
+    print(f'snowflake          : {1000 * fast_time:9.2f} ms  ({1e6 * fast_time / args.messages:.2f} us/msg)')
+    print(f'speed-up           : {legacy_time / fast_time:9.1f}x')
+    # timestamps carry sub-millisecond precision the snowflake does not, so allow boundary jitter
+    assert abs(len(legacy) - len(fast)) <= 2, (len(legacy), len(fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Parser throughput and regression suite over the labelled corpus (plain, bold and embed alerts, DTE
+forms, $-prefixed strikes, Ticker:/Expiration: templates, chatter): messages/sec, p50/p99 latency and
+memory allocated per message for CommonParser, with LegacyCommonParser measured on the same corpus.
+
+The regression check compares the speed-up over the legacy parser (a ratio, so it holds across
+machines) with benchmarks/parser_baseline.json and exits non-zero when it drops by more than the
+threshold.
+
+    python -m benchmarks.bench_parser [--messages 5000] [--repeat 5] [--check] [--threshold 0.2]
+    python -m benchmarks.bench_parser --update-baseline
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from unittest import mock
+
+import utils
+from benchmarks.signal_corpus import labelled_messages
+from message_parsers import CommonParser, LegacyCommonParser
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'parser_baseline.json')
+
+
+def parse_one(parse, owner, msg):
+    try:
+        return parse(owner, msg, state={'msg_id': msg['id']})
+    except Exception:
+        return 'error'
+
+
+def latencies(parse, owner, messages: list) -> list:
+    """
+    Per-message parse time in nanoseconds.
+    """
+    timings = []
+    clock = time.perf_counter_ns
+    for msg in messages:
+        start = clock()
+        parse_one(parse, owner, msg)
+        timings.append(clock() - start)
+    return timings
+
+
+def best_run(repeat: int, parse, owner, messages: list) -> tuple:
+    """
+    Total seconds of the fastest of `repeat` passes and the per-message latencies of that pass.
+    """
+    best, best_timings = float('inf'), None
+    for _ in range(repeat):
+        timings = latencies(parse, owner, messages)
+        total = sum(timings) / 1e9
+        if total < best:
+            best, best_timings = total, timings
+    return best, best_timings
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def allocations(parse, owner, messages: list) -> tuple:
+    """
+    Mean peak bytes allocated while parsing one message, and memory blocks still held per message.
+    """
+    tracemalloc.start()
+    try:
+        peaks = 0
+        retained = tracemalloc.take_snapshot()
+        for msg in messages:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            parse_one(parse, owner, msg)
+            peaks += tracemalloc.get_traced_memory()[1] - before
+        blocks = sum(stat.count_diff for stat in tracemalloc.take_snapshot().compare_to(retained, 'filename'))
+    finally:
+        tracemalloc.stop()
+    return peaks / len(messages), blocks / len(messages)
+
+
+def measure(parse, owner, messages: list, repeat: int) -> dict:
+    total, timings = best_run(repeat, parse, owner, messages)
+    return {
+        'msgs_per_sec': len(messages) / total,
+        'p50_us': percentile(timings, 50) / 1e3,
+        'p99_us': percentile(timings, 99) / 1e3,
+    }
+
+
+def load_baseline() -> dict:
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=5000)
+    parser.add_argument('--signal-ratio', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--check', action='store_true', help='fail when the speed-up regresses past --threshold')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed fractional drop of the speed-up')
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+
+    owner = CommonParser()
+    messages = [msg for msg, _ in labelled_messages(args.messages, args.signal_ratio)]
+    # the next-friday expiry default only knows weekdays; pin it so the run works any day
+    with mock.patch.object(utils, 'get_next_friday', lambda symbol='': '20250620'):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            legacy = measure(LegacyCommonParser.parse_message, owner, messages, args.repeat)
+        current = measure(CommonParser.parse_message, owner, messages, args.repeat)
+        current['peak_bytes_per_msg'], current['blocks_per_msg'] = allocations(
+            CommonParser.parse_message, owner, messages)
+
+    speedup = current['msgs_per_sec'] / legacy['msgs_per_sec']
+    print(f'{len(messages)} messages, {args.signal_ratio:.0%} signals, best of {args.repeat}')
+    print(f'{"":14} {"msgs/s":>10} {"p50 us":>8} {"p99 us":>8}')
+    for name, stats in (('legacy parser', legacy), ('CommonParser', current)):
+        print(f'{name:14} {stats["msgs_per_sec"]:10,.0f} {stats["p50_us"]:8.2f} {stats["p99_us"]:8.2f}')
+    print(f'allocated per message: {current["peak_bytes_per_msg"]:,.0f} B peak, '
+          f'{current["blocks_per_msg"]:.3f} blocks retained')
+    print(f'speed-up over legacy: {speedup:.2f}x')
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, 'w') as f:
+            json.dump({'speedup': round(speedup, 2), 'messages': len(messages),
+                       'signal_ratio': args.signal_ratio}, f, indent=4)
+            f.write('\n')
+        print(f'baseline written to {BASELINE_PATH}')
+
+    if args.check:
+        baseline = load_baseline()['speedup']
+        floor = baseline * (1 - args.threshold)
+        if speedup < floor:
+            print(f'REGRESSION: speed-up {speedup:.2f}x is below {floor:.2f}x '
+                  f'(baseline {baseline:.2f}x - {args.threshold:.0%})')
+            sys.exit(1)
+        print(f'ok: speed-up {speedup:.2f}x >= {floor:.2f}x (baseline {baseline:.2f}x - {args.threshold:.0%})')
+
+
+if __name__ == '__main__':
+    main()
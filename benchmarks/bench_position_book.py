@@ -0,0 +1,91 @@
+"""
+Trailing-stop evaluation cost as the number of open positions grows: the dict-of-dicts sweep the
+TrailingStopManager used vs the NumPy PositionBook (one vectorized sweep, and one position per tick).
+
+    python -m benchmarks.bench_position_book [--sweeps 200] [--repeat 5]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from position_book import HOLD, PositionBook
+
+SIZES = (10, 100, 500, 2000)
+RULES = dict(breakeven_pct=5, pullback_pct=20, timeout_minutes=30)
+
+
+def dict_sweep(trails: dict, prices: dict, now: float) -> list:
+    """
+    The per-symbol rules as they ran over `active_trails` before the position book.
+    """
+    exits = []
+    for symbol, trail in trails.items():
+        price = prices[symbol]
+        if not trail['breakeven_hit'] and price >= trail['entry_price'] * (1 + RULES['breakeven_pct'] / 100):
+            trail['breakeven_hit'] = True
+        if trail['breakeven_hit']:
+            if price > trail['highest']:
+                trail['highest'] = price
+            elif price < trail['highest'] * (1 - RULES['pullback_pct'] / 100):
+                exits.append(symbol)
+                continue
+        if (now - trail['start_time']) / 60 > RULES['timeout_minutes']:
+            exits.append(symbol)
+    return exits
+
+
+def best_of(repeat: int, fn) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sweeps', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    print(f'{"positions":>10} {"dict sweep":>12} {"book sweep":>12} {"book tick":>12}  (us)')
+    for size in SIZES:
+        symbols = [f'SPX{i}' for i in range(size)]
+        # random walks around the entry that never trigger an exit, so every run sees the same book
+        walks = [{symbol: rng.uniform(1.95, 2.4) for symbol in symbols} for _ in range(args.sweeps)]
+
+        def run_dict():
+            trails = {symbol: {'entry_price': 2.0, 'highest': 2.0, 'breakeven_hit': False, 'qty': 1,
+                               'start_time': 0.0} for symbol in symbols}
+            for prices in walks:
+                assert not dict_sweep(trails, prices, 60.0)
+
+        book = PositionBook()
+        for symbol in symbols:
+            book.add(symbol, 2.0, 1, 0.0)
+        arrays = [book.prices_from(prices.get) for prices in walks]
+
+        def run_book():
+            book.breakeven[:] = False
+            book.highest[:] = 2.0
+            for prices in arrays:
+                assert not book.evaluate(prices, 60.0, **RULES).any()
+
+        def run_ticks():
+            for prices in walks[:max(1, args.sweeps // size)]:
+                for symbol, price in prices.items():
+                    assert book.on_price(symbol, price, 60.0, **RULES) == HOLD
+
+        ticks = max(1, args.sweeps // size) * size
+        timings = [best_of(args.repeat, run_dict) / args.sweeps,
+                   best_of(args.repeat, run_book) / args.sweeps,
+                   best_of(args.repeat, run_ticks) / ticks]
+        print(f'{size:>10} ' + ' '.join(f'{1e6 * t:12.2f}' for t in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Pre-classifier quality and cost over the labelled corpus: precision/recall against the labels,
+messages/sec, a check that nothing the full parser resolves is dropped, and the end-to-end parse
+cost with and without the pre-filter.
+
+    python -m benchmarks.bench_signal_classifier [--messages 20000] [--signal-ratio 0.2]
+"""
+import argparse
+import time
+from unittest import mock
+
+import config
+import utils
+from benchmarks.signal_corpus import labelled_messages
+from message_parsers import CommonParser
+from signal_classifier import classification_report
+from signal_grammar import message_text
+
+
+def parse_all(owner, messages: list) -> list:
+    results = []
+    for msg in messages:
+        try:
+            results.append(CommonParser.parse_message(owner, msg, state={'msg_id': msg['id']}))
+        except Exception:
+            results.append(None)
+    return results
+
+
+def tradable(result) -> bool:
+    return isinstance(result, dict) and result.get('strike', '') != '' and result.get('p_or_c') in ('c', 'p')
+
+
+def timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=20_000)
+    parser.add_argument('--signal-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    corpus = labelled_messages(args.messages, args.signal_ratio)
+    report = classification_report([(message_text(msg), is_signal) for msg, is_signal in corpus])
+    print(f'{report["messages"]} messages, {args.signal_ratio:.0%} signals')
+    print(f'precision {report["precision"]:.3f}  recall {report["recall"]:.3f}  '
+          f'(tp {report["true_positives"]}, fp {report["false_positives"]}, fn {report["false_negatives"]})')
+    print(f'passed to parser {report["passed"]:.1%}, classifier {report["msgs_per_sec"]:,.0f} msgs/s')
+
+    owner = CommonParser()
+    messages = [msg for msg, _ in corpus]
+    # the next-friday expiry default only knows weekdays; pin it so the run works any day
+    with mock.patch.object(utils, 'get_next_friday', lambda symbol='': '20250620'):
+        with mock.patch.object(config, 'SIGNAL_PREFILTER_ENABLED', False):
+            full_time, full = timed(parse_all, owner, messages)
+        filtered_time, filtered = timed(parse_all, owner, messages)
+
+    dropped = [msg['content'] for msg, before, after in zip(messages, full, filtered)
+               if tradable(before) and not tradable(after)]
+    print(f'parse without pre-filter {len(messages) / full_time:,.0f} msgs/s, '
+          f'with pre-filter {len(messages) / filtered_time:,.0f} msgs/s')
+    print(f'tradable signals dropped by the pre-filter: {len(dropped)}')
+    assert report['recall'] == 1.0 and not dropped, dropped[:5]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Per-message parse time of the original multi-pass parser (LegacyCommonParser, debug prints sent to
+/dev/null) vs the single-pass grammar behind CommonParser, over a mix of alert formats.
+
+    python -m benchmarks.bench_signal_grammar [--messages 20000] [--repeat 5]
+"""
+import argparse
+import contextlib
+import os
+import time
+
+from unittest import mock
+
+import config
+import utils
+from message_parsers import CommonParser, LegacyCommonParser
+
+ALERTS = [
+    "BTO AAPL 150C 06/20",
+    "BTO SPX 5800C 0DTE @ 4.20",
+    "**BTO** **AMD** **160C** **06/21** @ **2.35**",
+    "Entry: NVDA $120 call 7/19",
+    "BUY TSLA $250C 12/20",
+    "spx 5800 calls 0DTE",
+    "QQQ 480 puts exp 06/14",
+    "STC AAPL 150C 06/20 all out, nice trade everyone",
+    "Scaling out of SPX 5800C here, holding runners",
+    "good morning everyone, watching SPY 540 level today",
+]
+
+
+def make_messages(count: int) -> list:
+    return [{'id': str(i), 'content': ALERTS[i % len(ALERTS)], 'embeds': []} for i in range(count)]
+
+
+def run(parse, owner, messages: list) -> list:
+    results = []
+    for msg in messages:
+        try:
+            results.append(parse(owner, msg, state={'msg_id': msg['id']}))
+        except Exception:
+            results.append('error')
+    return results
+
+
+def best_of(repeat: int, fn, *args) -> tuple:
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    owner = CommonParser()
+    messages = make_messages(args.messages)
+    # the next-friday expiry default only knows weekdays; pin it so the run works any day. The chatter
+    # pre-filter (measured by bench_signal_classifier) is off so both parsers see every message.
+    with mock.patch.object(utils, 'get_next_friday', lambda symbol='': '20250620'), \
+            mock.patch.object(config, 'SIGNAL_PREFILTER_ENABLED', False):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            legacy_time, legacy = best_of(args.repeat, run, LegacyCommonParser.parse_message, owner, messages)
+        grammar_time, grammar = best_of(args.repeat, run, CommonParser.parse_message, owner, messages)
+
+    assert legacy == grammar, 'grammar output differs from the legacy parser'
+    print(f'{args.messages} messages, {len(ALERTS)} alert formats, outputs identical')
+    print(f'legacy parser  : {1e6 * legacy_time / args.messages:8.2f} us/msg')
+    print(f'single pass    : {1e6 * grammar_time / args.messages:8.2f} us/msg')
+    print(f'speed-up       : {legacy_time / grammar_time:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
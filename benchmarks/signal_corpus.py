@@ -0,0 +1,99 @@
+"""
+Synthetic, labelled Discord traffic for the parser benchmarks: option alerts in the formats the
+parser handles (plain, bold, embeds, DTE, $-prefixed strikes, word rights, Ticker:/Expiration:
+templates) mixed with the chatter that fills busy channels. Every message is (message dict, is_signal).
+"""
+import random
+
+TICKERS = ['SPX', 'SPY', 'QQQ', 'AAPL', 'TSLA', 'NVDA', 'AMD', 'META', 'AMZN', 'MSFT', 'IWM', 'NFLX']
+BUY_WORDS = ['BTO', 'BUY', 'Entry', 'OPEN', 'ADD', 'bto', 'Buying']
+
+SIGNAL_FORMATS = [
+    '{buy} {ticker} {strike}{r} {date}',
+    '{buy} {ticker} {strike}{r} {date} @ {price}',
+    '{buy} {ticker} {strike}{R} {dte}',
+    '**{buy}** **{ticker}** **{strike}{R}** **{date}** @ **{price}**',
+    '{buy}: {ticker} ${strike} {right} {date}',
+    '{buy} {ticker} ${strike}{R} {date} @ {price}',
+    '{ticker} {strike} {rights} exp {date}',
+    '{buy} ${ticker} {strike}{r} {date} @ {price} small size',
+    '{ticker} {strike}{R} {dte} @ {price}',
+    '{buy} {ticker} {strike}{right_word} {date}',
+    'Ticker: {ticker} Expiration: {date} Strike: {strike}{R} Price: {price}',
+    '{buy} {ticker} {strike}{R} {date}\nStop loss {stop}, target {price}',
+    '{ticker} {strike}{R} {dte}s lotto @ {price} (small)',
+    '{buy} {ticker} {date} {strike}{r}',
+]
+
+EMBED_SIGNAL_FORMATS = [
+    ({'title': '{buy} {ticker} {strike}{R}', 'description': 'exp {date} @ {price}'}, ''),
+    ({'title': 'New alert', 'description': '{buy} {ticker} {strike}{R} {dte} @ {price}'}, '@everyone'),
+    ({'title': 'Trade Alert',
+      'description': '**Ticker:** {ticker}\n**Expiration:** {date}\n**Strike:** {strike}{R}\n**Price:** {price}'}, ''),
+]
+
+CHATTER = [
+    'good morning everyone, watching {ticker} {level} level today',
+    'that was a nice run, congrats to everyone who held',
+    '{ticker} looking choppy here, waiting for a better entry',
+    'https://discord.com/channels/{n}/{n}',
+    'anyone else in {ticker}? {level} is the line in the sand',
+    'lunch time, back in 30',
+    '{ticker} {level} resistance, {level2} support on the 5m',
+    'remember to size down on 0DTE days',
+    'market is closed monday for the holiday',
+    'lol',
+    '{ticker} up {pct}% premarket',
+    'great call yesterday on ${ticker}',
+    'cpi at 8:30, be careful',
+    'not financial advice, trade your own plan',
+]
+
+EMBED_CHATTER = [
+    ({'title': 'Daily recap', 'description': '{ticker} closed at {level}, volume was light'}, ''),
+    ({'title': 'Watchlist', 'description': '{ticker} {level2} / {ticker} {level}'}, 'today:'),
+]
+
+
+def _fields(rng: random.Random) -> dict:
+    call = rng.random() < 0.6
+    strike = rng.choice([rng.randint(10, 600), rng.randint(4000, 6000) // 5 * 5, round(rng.uniform(1, 60), 1)])
+    return {
+        'buy': rng.choice(BUY_WORDS),
+        'ticker': rng.choice(TICKERS),
+        'strike': strike,
+        'r': 'c' if call else 'p',
+        'R': 'C' if call else 'P',
+        'right': 'call' if call else 'put',
+        'rights': 'calls' if call else 'puts',
+        'right_word': 'call' if call else 'put',
+        'date': f'{rng.randint(1, 12)}/{rng.randint(1, 28):02d}',
+        'dte': rng.choice(['0DTE', '1DTE', '2DTE']),
+        'price': f'{rng.uniform(0.2, 9.5):.2f}',
+        'stop': f'{rng.uniform(0.1, 2):.2f}',
+        'level': rng.randint(100, 6000),
+        'level2': rng.randint(100, 6000),
+        'pct': rng.randint(1, 9),
+        'n': rng.randint(10 ** 17, 10 ** 18),
+    }
+
+
+def _message(i: int, content: str, embed: dict = None) -> dict:
+    return {'id': str(1_300_000_000_000_000_000 + i), 'content': content, 'embeds': [embed] if embed else []}
+
+
+def labelled_messages(count: int, signal_ratio: float = 0.2, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        fields = _fields(rng)
+        is_signal = rng.random() < signal_ratio
+        use_embed = rng.random() < 0.15
+        if use_embed:
+            embed, content = rng.choice(EMBED_SIGNAL_FORMATS if is_signal else EMBED_CHATTER)
+            embed = {key: value.format(**fields) for key, value in embed.items()}
+            corpus.append((_message(i, content, embed), is_signal))
+        else:
+            template = rng.choice(SIGNAL_FORMATS if is_signal else CHATTER)
+            corpus.append((_message(i, template.format(**fields)), is_signal))
+    return corpus
@@ -0,0 +1,72 @@
+# =============================================================================================== #
+from ib_insync import Order
+
+# =============================================================================================== #
+
+
+def build_bracket(ib, action: str, qty: float, take_profit_price: float, stop_loss_price: float,
+                  entry_price: float = None, account: str = None) -> tuple:
+    """
+    (entry, take_profit, stop_loss) orders of one bracket, with order ids assigned up front so the exit
+    legs reference their parent before anything is sent. Only the last leg transmits, so TWS releases
+    the group together; the exit legs also share an OCA group. `entry_price` makes a limit entry,
+    otherwise the entry is a market order.
+    """
+    entry = Order(orderId=ib.client.getReqId(), action=action, totalQuantity=qty, orderType='MKT',
+                  transmit=False, account=account or '')
+    if entry_price is not None:
+        entry.orderType, entry.lmtPrice = 'LMT', entry_price
+    take_profit, stop_loss = build_exits(ib, action, qty, take_profit_price, stop_loss_price,
+                                         f'bracket-{entry.orderId}', parent_id=entry.orderId, account=account)
+    return entry, take_profit, stop_loss
+
+
+def build_exits(ib, action: str, qty: float, take_profit_price: float, stop_loss_price: float, oca_group: str,
+                parent_id: int = 0, account: str = None) -> tuple:
+    """
+    (take_profit, stop_loss) of a position opened with `action`, in one OCA group. As children of `parent_id`
+    they transmit with the last leg; standalone (e.g. re-placed for a partly filled entry) both transmit.
+    """
+    exit_action = 'SELL' if action == 'BUY' else 'BUY'
+    take_profit = Order(orderId=ib.client.getReqId(), action=exit_action, totalQuantity=qty, orderType='LMT',
+                        lmtPrice=take_profit_price, parentId=parent_id, ocaGroup=oca_group, ocaType=1,
+                        transmit=not parent_id, account=account or '')
+    stop_loss = Order(orderId=ib.client.getReqId(), action=exit_action, totalQuantity=qty, orderType='STP',
+                      auxPrice=stop_loss_price, parentId=parent_id, ocaGroup=oca_group, ocaType=1,
+                      transmit=True, account=account or '')
+    return take_profit, stop_loss
+
+
+class BracketTrade:
+    """
+    The three legs of a bracket submitted as one group. Behaves like the entry Trade (`orderStatus`,
+    `statusEvent`, `isActive`, ...) so fills are awaited the same way, with the exit legs alongside.
+    """
+
+    def __init__(self, entry, take_profit, stop_loss):
+        self.entry = entry
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+
+    def __getattr__(self, name):
+        return getattr(self.entry, name)
+
+    @property
+    def legs(self) -> tuple:
+        return self.entry, self.take_profit, self.stop_loss
+
+    def status(self) -> dict:
+        return {'entry': self.entry.orderStatus.status, 'take_profit': self.take_profit.orderStatus.status,
+                'stop_loss': self.stop_loss.orderStatus.status}
+
+    def protected(self) -> bool:
+        """
+        True while the entry is filled and both exit legs are working.
+        """
+        return self.entry.orderStatus.status == 'Filled' and \
+            self.take_profit.isActive() and self.stop_loss.isActive()
+
+    def done(self) -> bool:
+        return not any(leg.isActive() for leg in self.legs)
+
+# =============================================================================================== #
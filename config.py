@@ -17,9 +17,19 @@ REJECT_SIGNALS = ["placeholder"]
 
 DAILY_EXPIRY_SIGNALS = ["spx", "spy", "qqq", "spxw"]
 
+# Ingestion mode: 'gateway' receives messages pushed over the Discord Gateway WebSocket
+# (REST polling is still used as fallback while the gateway is down), 'poll' uses REST polling only
+DISCORD_INGESTION_MODE = 'gateway'
+DISCORD_GATEWAY_URL = 'wss://gateway.discord.gg/?v=9&encoding=json'
+DISCORD_GATEWAY_INTENTS = (1 << 9) | (1 << 12) | (1 << 15)  # GUILD_MESSAGES | DIRECT_MESSAGES | MESSAGE_CONTENT
+
 # FORMAT_12_BUY = True will trigger a buy even if no explicit buy keywords exist
 FORMAT_12_BUY = False
 
+# Drop chatter before full parsing: only messages with a strike/right token (150C, 150call, $150C,
+# '150 calls') reach the parser, since nothing else can produce a tradable signal
+SIGNAL_PREFILTER_ENABLED = True
+
 
 # =============================
 # PRICE FILTERING + RUNTIME BEHAVIOR
@@ -32,6 +42,24 @@ ALERT_EXPIRY_DURATION = 60  # Ignore signals older than this (seconds)
 SLEEP_DELAY_BETWEEN_POLLS = 1  # Delay between Discord polls (seconds)
 SIGNAL_MAX_AGE_SECONDS = 60  # or whatever value you prefer
 
+# Signals of different underlyings execute concurrently (qualify, quote, fill), at most
+# SIGNAL_MAX_CONCURRENCY at a time; signals of the same underlying always execute in arrival order.
+SIGNAL_MAX_CONCURRENCY = 4
+# Start qualifying the contract and streaming its quote as soon as a signal is parsed, overlapping the
+# IB round trips with the remaining filters and any wait in the pipeline (dropped if the signal is rejected)
+SPECULATIVE_PREFETCH = True
+
+# Adaptive poll cadence (seconds). Polls every POLL_MIN_DELAY while the channel is active or inside
+# POLL_HOT_WINDOWS (local time), POLL_IDLE_DELAY when quiet and POLL_MAX_DELAY once dormant.
+# The cadence never outruns the Discord rate-limit budget reported in the response headers.
+POLL_MIN_DELAY = 0.25
+POLL_IDLE_DELAY = SLEEP_DELAY_BETWEEN_POLLS
+POLL_MAX_DELAY = 5
+POLL_ACTIVE_WINDOW_SECONDS = 120       # channel counts as active this long after a new message
+POLL_DORMANT_AFTER_SECONDS = 900       # no messages for this long -> POLL_MAX_DELAY
+POLL_HOT_WINDOWS = [((9, 25), (10, 0)), ((15, 45), (16, 0))]
+POLL_RATE_LIMIT_RESERVE = 1            # requests per bucket window kept in reserve
+
 TEST_MODE = False
 ENABLE_PAPER_TRADING = True
 
@@ -61,6 +89,13 @@ TRAILING_STOP_PERCENT = 2000  # per cent x 100 (1000 = 10%)
 BREAKEVEN_TRIGGER_PERCENT = 5     # When price exceeds entry by this %, lock in MAX_LOSS_STOP_PERCENT
 MAX_LOSS_STOP_PERCENT = 20        # Allowed pullback from highest price after breakeven
 TIMEOUT_EXIT_MINUTES = 30          # Exit after this many minutes regardless of price
+TRAIL_SWEEP_INTERVAL = 1           # Seconds between timeout sweeps (pullbacks are checked on every tick)
+
+# Have IB enforce the policy above server side instead: a stop that IB converts into a MAX_LOSS_STOP_PERCENT
+# trail at the breakeven price, plus a market exit conditioned on TIMEOUT_EXIT_MINUTES. The bot only watches
+# the fills, so stops hold even if it stalls or disconnects.
+USE_NATIVE_TRAILING = False
+NATIVE_TRAIL_INITIAL_STOP_PERCENT = 100  # stop below entry before breakeven; 100 = none (one tick), as client side
 
 # Attach IB native trailing stop alongside adaptive logic
 FALLBACK_IB_TRAIL_ENABLED = False
@@ -82,6 +117,8 @@ PERCENT_TO_TRIM = 100  # % of position to trim when TRIM command detected
 USE_BRAKET_ORDER = False
 TAKE_PROFIT_PERCENTAGE = 15
 STOP_LOSS_PERCENTAGE = 20
+BRACKET_LIMIT_ENTRY = False  # enter at a limit at the quoted price instead of at market
+BRACKET_ENTRY_TIMEOUT_SECONDS = 30  # an unfilled limit entry is cancelled, with its exits, after this
 
 
 # =============================
@@ -91,6 +128,15 @@ STOP_LOSS_PERCENTAGE = 20
 USE_OPTION_ADAPTIVE_ALGO = True
 ADAPTIVE_PRIORITY_TYPE = 'Urgent'  # Options: Patient, Normal, Urgent
 
+# Pegged execution: market buys/sells go out as a limit at the mid instead, moved toward the far touch every
+# PEG_STEP_SECONDS (reaching it after PEG_STEPS moves) but never more than PEG_MAX_SLIPPAGE_PERCENT past the
+# arrival mid, and cancelled when unfilled after PEG_TIMEOUT_SECONDS. Stop exits always go at market.
+USE_PEG_EXECUTION = False
+PEG_STEP_SECONDS = 0.25
+PEG_STEPS = 4
+PEG_MAX_SLIPPAGE_PERCENT = 5
+PEG_TIMEOUT_SECONDS = 5
+
 # TWS / Gateway
 USE_TWS = True
 USE_GATEWAY = not USE_TWS
@@ -100,6 +146,44 @@ PAPER_TRADING = True
 TWS = {'IP': '127.0.0.1', 'PORT': 7497, 'CLIENT_ID': 53}
 GATEWAY = {'IP': '127.0.0.1', 'PORT': 4002, 'CLIENT_ID': 50}
 
+# Qualified contracts are cached by (underlying, expiry, strike, right, tradingClass) so repeat
+# lookups skip the IB round trip; the cache is saved to CONTRACT_CACHE_FILE and reloaded on start.
+CONTRACT_CACHE_SIZE = 512              # least recently used contracts are evicted past this
+CONTRACT_CACHE_PERSIST = True
+CONTRACT_CACHE_FILE = 'contract_cache.json'
+
+# Option chains of these underlyings (symbol, underlying secType, tradingClass) are downloaded at start
+# and every OPTION_CHAIN_REFRESH_MINUTES for the nearest OPTION_CHAIN_EXPIRIES expirations. Contracts
+# then resolve locally and signals with an unlisted strike/expiry are rejected before reaching IB;
+# an unlisted strike within OPTION_CHAIN_SNAP_DISTANCE of a listed one is snapped to it instead.
+OPTION_CHAIN_WATCHLIST = [('SPX', 'IND', 'SPXW'), ('SPY', 'STK', 'SPY'), ('QQQ', 'STK', 'QQQ')]
+OPTION_CHAIN_EXPIRIES = 3
+OPTION_CHAIN_REFRESH_MINUTES = 60
+OPTION_CHAIN_SNAP_DISTANCE = 0.0       # 0 = never snap, only validate
+
+# Quotes are taken from the first tick that passes the quality rule instead of waiting out the timeout:
+# a two-sided quote with a spread within QUOTE_MAX_SPREAD_PERCENT of the mid, or a last trade at most
+# QUOTE_MAX_LAST_AGE_SECONDS old. On timeout: any last, a wide quote, the close, then frozen/delayed data.
+QUOTE_MAX_SPREAD_PERCENT = 15
+QUOTE_MAX_LAST_AGE_SECONDS = 10
+QUOTE_DELAYED_FALLBACK = True
+QUOTE_DELAYED_TIMEOUT = 1.0            # seconds to wait for frozen/delayed data
+
+# Limit prices are put on each contract's price grid from its IB market rule (loaded once per contract);
+# without one they use TICK_SIZE_FALLBACK, an increment that is valid on every option grid
+TICK_SIZE_FALLBACK = 0.10
+
+# Streaming subscriptions are shared per contract and stay open for repeat lookups; idle ones are
+# cancelled least recently used first once MARKET_DATA_LINES - MARKET_DATA_LINE_RESERVE are in use.
+MARKET_DATA_LINES = 100                # market data lines of the account (IB default: 100)
+MARKET_DATA_LINE_RESERVE = 10          # lines left free for snapshots, chains and other clients
+
+# Every request to IB goes through one token bucket: IB_PACER_RATE messages/s sustained (IB allows 50),
+# bursts of up to IB_PACER_BURST. Orders and cancels are never held back; queued qualification,
+# market data and historical requests are served in that order as tokens free up.
+IB_PACER_RATE = 45
+IB_PACER_BURST = 45
+
 
 
 # =============================
@@ -118,6 +202,24 @@ IGNORE_NEW_SIGNAL_IF_PL_GREATER_THAN_VALUE = 200
 EXIT_HOUR = 16
 EXIT_MINUTE = 0
 
+# When EXIT_HOUR:EXIT_MINUTE is reached while the bot runs (not when it starts later), every open position is
+# closed at once: limits at the quote, moved to the far touch after FLATTEN_REPRICE_SECONDS, replaced by market
+# orders after FLATTEN_MARKET_SECONDS; the bot stops waiting for fills after FLATTEN_DEADLINE_SECONDS
+FLATTEN_AT_EXIT = True
+FLATTEN_REPRICE_SECONDS = 3
+FLATTEN_MARKET_SECONDS = 8
+FLATTEN_DEADLINE_SECONDS = 20
+
+# =============================
+# HTTP TRANSPORT (Discord REST + Telegram)
+# =============================
+
+HTTP_USE_HTTP2 = False          # needs `pip install httpx[http2]`
+HTTP_CONNECT_TIMEOUT = 3.0      # seconds
+HTTP_READ_TIMEOUT = 5.0         # seconds
+HTTP_MAX_CONNECTIONS = 10       # pooled keep-alive connections
+HTTP_KEEPALIVE_EXPIRY = 60      # seconds an idle connection is kept open
+
 # =============================
 # TELEGRAM NOTIFICATIONS
 # =============================
@@ -125,4 +227,3 @@ TELEGRAM_ENABLED    = True                      # master switch
 TELEGRAM_BOT_TOKEN  = "000"  
 TELEGRAM_CHAT_ID    = "-000"          # your channel or user ID
 
-Harden error handling around all external calls (IB, Discord HTTP, Telegram).
@@ -0,0 +1,122 @@
+# =============================================================================================== #
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from ib_insync import Contract, util
+import config
+
+# =============================================================================================== #
+
+
+def contract_key(contract: Contract) -> tuple:
+    """
+    (underlying, expiry, strike, right, tradingClass) of an unqualified contract; stocks get an empty
+    expiry/right and a 0.0 strike.
+    """
+    return (contract.symbol.upper(), contract.lastTradeDateOrContractMonth or '', float(contract.strike or 0.0),
+            (contract.right or '').upper(), contract.tradingClass or '')
+
+
+class ContractCache:
+    """
+    Qualified IB contracts by contract_key, so a repeated create_contract skips the qualifyContracts
+    round trip.
+    - Least recently used entries are evicted past `max_entries`.
+    - Every new entry is written to `path` (JSON) and loaded back on start, so a restart starts warm.
+    - Options are dropped once their expiry date has passed, on load and on lookup.
+    """
+
+    def __init__(self, path: str = None, max_entries: int = 512, today=date.today):
+        self.path = path
+        self.max_entries = max_entries
+        self.today = today
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    @classmethod
+    def from_config(cls):
+        return cls(path=config.CONTRACT_CACHE_FILE if config.CONTRACT_CACHE_PERSIST else None,
+                   max_entries=config.CONTRACT_CACHE_SIZE)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def get(self, key: tuple):
+        """
+        A copy of the cached qualified contract, or None (counted as a miss).
+        """
+        with self.lock:
+            fields = self.entries.get(key)
+            if fields is not None and self._expired(key):
+                del self.entries[key]
+                fields = None
+            if fields is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return Contract.create(**fields)
+
+    def put(self, key: tuple, contract: Contract):
+        """
+        Store a qualified contract (one with a conId); anything else is ignored.
+        """
+        if not contract.conId or self._expired(key):
+            return
+        with self.lock:
+            self.entries[key] = util.dataclassNonDefaults(contract)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            snapshot = list(self.entries.items())
+        self.save(snapshot)
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def _expired(self, key: tuple) -> bool:
+        expiry = key[1]
+        return len(expiry) == 8 and expiry < self.today().strftime('%Y%m%d')
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as _file:
+                stored = json.load(_file)['contracts']
+        except FileNotFoundError:
+            return
+        except (json.decoder.JSONDecodeError, KeyError, TypeError) as _exc:
+            logging.warning(f'[CONTRACT CACHE] Ignoring unreadable {self.path}: {_exc}')
+            return
+        for key, fields in stored[-self.max_entries:]:
+            key = tuple(key)
+            if not self._expired(key):
+                self.entries[key] = fields
+        logging.info(f'[CONTRACT CACHE] Loaded {len(self.entries)} contracts from {self.path}')
+
+    def save(self, snapshot: list):
+        if not self.path:
+            return
+        tmp_path = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'w') as _file:
+                json.dump({'contracts': [[list(key), fields] for key, fields in snapshot]}, _file)
+            os.replace(tmp_path, self.path)
+        except OSError as _exc:
+            logging.warning(f'[CONTRACT CACHE] Could not write {self.path}: {_exc}')
+
+# =============================================================================================== #
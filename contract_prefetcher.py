@@ -0,0 +1,89 @@
+# =============================================================================================== #
+import asyncio
+import logging
+import config
+
+# =============================================================================================== #
+
+
+class ContractPrefetcher:
+    """
+    Speculative contract resolution for signals that are still being filtered or waiting in the pipeline.
+    - `start` qualifies the option and opens its market data stream in the background, as soon as the
+      parser has produced underlying, expiry, strike and right.
+    - `claim` hands the qualified contract (its stream already warm) to the execution, provided it was
+      prefetched for the same option symbol; anything else is resolved the normal way.
+    - `discard` drops the speculative work of a rejected signal: the task is cancelled, or the stream it
+      opened is cancelled unless another consumer holds it.
+    """
+
+    def __init__(self, ib_interface):
+        self.ib_interface = ib_interface
+        self.pending = {}  # signal id -> (option symbol, task)
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def start(self, signal_id, option_symbol: str, parsed_symbol):
+        self.discard(signal_id)
+        task = asyncio.get_running_loop().create_task(self._warm(parsed_symbol))
+        self.pending[signal_id] = (option_symbol, task)
+        self.started += 1
+
+    async def claim(self, signal_id, option_symbol: str):
+        """
+        The prefetched contract of `signal_id` if it was prefetched for `option_symbol`, else None.
+        """
+        entry = self.pending.get(signal_id)
+        if entry is None:
+            return None
+        if entry[0] != option_symbol:  # e.g. the strike was snapped to a listed one
+            self.misses += 1
+            self.discard(signal_id)
+            return None
+        _, task = self.pending.pop(signal_id)
+        try:
+            contract = await task
+        except Exception as _exc:
+            logging.info(f'[PREFETCH] Speculative lookup of {option_symbol} failed: {_exc}')
+            self.misses += 1
+            return None
+        self.ib_interface.market_data.release(contract)  # the stream stays open for the quote
+        self.hits += 1
+        return contract
+
+    def discard(self, signal_id):
+        entry = self.pending.pop(signal_id, None)
+        if entry is None:
+            return
+        _, task = entry
+        self.discarded += 1
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled() and task.exception() is None:
+            contract = task.result()
+            self.ib_interface.market_data.release(contract)
+            self.ib_interface.market_data.discard(contract)
+
+    def metrics(self) -> dict:
+        return {'pending': len(self.pending), 'started': self.started, 'hits': self.hits, 'misses': self.misses,
+                'discarded': self.discarded}
+
+    # ------------------------------------------------------------------------------------------- #
+
+    async def _warm(self, parsed_symbol):
+        contract = await self.ib_interface.create_contract_async(parsed_symbol)
+        self.ib_interface.market_data.acquire(contract)
+        if config.USE_PEG_EXECUTION:  # the peg limits need the contract's price grid
+            try:
+                await self.ib_interface.ticks.load(contract)
+            except asyncio.CancelledError:  # discarded meanwhile: `discard` only sees finished tasks
+                self.ib_interface.market_data.release(contract)
+                self.ib_interface.market_data.discard(contract)
+                raise
+        return contract
+
+# =============================================================================================== #
@@ -0,0 +1,215 @@
+# =============================================================================================== #
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+
+import websockets
+
+# =============================================================================================== #
+
+GATEWAY_URL = 'wss://gateway.discord.gg/?v=9&encoding=json'
+
+# Gateway opcodes (https://discord.com/developers/docs/topics/opcodes-and-status-codes)
+OP_DISPATCH = 0
+OP_HEARTBEAT = 1
+OP_IDENTIFY = 2
+OP_RESUME = 6
+OP_RECONNECT = 7
+OP_INVALID_SESSION = 9
+OP_HELLO = 10
+OP_HEARTBEAT_ACK = 11
+
+# Close codes after which reconnecting with the same token is pointless
+FATAL_CLOSE_CODES = {4004, 4010, 4011, 4012, 4013, 4014}
+
+# GUILD_MESSAGES | DIRECT_MESSAGES | MESSAGE_CONTENT
+DEFAULT_INTENTS = (1 << 9) | (1 << 12) | (1 << 15)
+
+MESSAGE_EVENTS = ('MESSAGE_CREATE', 'MESSAGE_UPDATE')
+
+# =============================================================================================== #
+
+
+class DiscordGatewayClient:
+    """
+    Push-based Discord ingestion over the Gateway WebSocket.
+    Subscribes to MESSAGE_CREATE / MESSAGE_UPDATE for the given channels and hands every
+    message dict (same shape as the REST payload) to `on_message` as soon as it arrives.
+    Keeps the session alive with heartbeats and resumes / reconnects on failures.
+    """
+
+    def __init__(self, auth_token: str, channel_ids, on_message, gateway_url: str = GATEWAY_URL,
+                 intents: int = DEFAULT_INTENTS, max_backoff: float = 30.0):
+        self.auth_token = auth_token
+        self.channel_ids = {str(channel_id) for channel_id in channel_ids}
+        self.on_message = on_message
+        self.gateway_url = gateway_url
+        self.intents = intents
+        self.max_backoff = max_backoff
+
+        self.session_id = None
+        self.resume_gateway_url = None
+        self.seq = None
+
+        self.connected = False
+        self.last_event_at = None
+        self.reconnects = 0
+
+        self._ws = None
+        self._heartbeat_acked = True
+        self._stopped = False
+        self._loop = None
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def start(self) -> threading.Thread:
+        """
+        Run the gateway on its own event loop in a daemon thread.
+        """
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()), name='discord-gateway', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped = True
+        if self._loop and self._ws:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+
+    async def run(self):
+        """
+        Keep a gateway session open until `stop` is called, reconnecting with backoff.
+        """
+        self._loop = asyncio.get_running_loop()
+        backoff = 1.0
+        while not self._stopped:
+            try:
+                await self._run_session()
+                backoff = 1.0
+            except websockets.ConnectionClosed as exc:
+                code = exc.rcvd.code if exc.rcvd else None
+                if code in FATAL_CLOSE_CODES:
+                    logging.error(f'[GATEWAY] Fatal close code {code}, giving up on the gateway')
+                    self._stopped = True
+                    break
+                logging.warning(f'[GATEWAY] Connection closed (code={code}), reconnecting')
+            except Exception as _exc:
+                logging.error(f'[GATEWAY] Session error: {_exc}')
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+                backoff = min(backoff * 2, self.max_backoff)
+            finally:
+                self.connected = False
+                self._ws = None
+            if not self._stopped:
+                self.reconnects += 1
+
+    # ------------------------------------------------------------------------------------------- #
+
+    async def _run_session(self):
+        resuming = self.session_id is not None and self.seq is not None
+        url = self.resume_gateway_url if resuming and self.resume_gateway_url else self.gateway_url
+
+        async with websockets.connect(url, max_size=None, ping_interval=None) as ws:
+            self._ws = ws
+            hello = json.loads(await ws.recv())
+            if hello.get('op') != OP_HELLO:
+                raise RuntimeError(f'expected HELLO, got op {hello.get("op")}')
+            interval = hello['d']['heartbeat_interval'] / 1000
+
+            self._heartbeat_acked = True
+            heartbeat = asyncio.create_task(self._heartbeat_loop(ws, interval))
+            try:
+                if resuming:
+                    await self._send(ws, OP_RESUME, {'token': self.auth_token, 'session_id': self.session_id,
+                                                     'seq': self.seq})
+                else:
+                    await self._identify(ws)
+
+                async for raw in ws:
+                    if not await self._handle_payload(ws, json.loads(raw)):
+                        return
+            finally:
+                heartbeat.cancel()
+
+    async def _identify(self, ws):
+        await self._send(ws, OP_IDENTIFY, {
+            'token': self.auth_token,
+            'intents': self.intents,
+            'properties': {'os': 'linux', 'browser': 'Discord_To_IBKR', 'device': 'Discord_To_IBKR'},
+        })
+
+    async def _handle_payload(self, ws, payload: dict) -> bool:
+        """
+        Handle one gateway payload. Returns False when the session has to be re-established.
+        """
+        op = payload.get('op')
+        if payload.get('s') is not None:
+            self.seq = payload['s']
+        self.last_event_at = time.monotonic()
+
+        if op == OP_DISPATCH:
+            self._handle_dispatch(payload.get('t'), payload.get('d') or {})
+        elif op == OP_HEARTBEAT:
+            await self._send(ws, OP_HEARTBEAT, self.seq)
+        elif op == OP_HEARTBEAT_ACK:
+            self._heartbeat_acked = True
+        elif op == OP_RECONNECT:
+            logging.info(f'[GATEWAY] Server requested reconnect')
+            await ws.close(4000)
+            return False
+        elif op == OP_INVALID_SESSION:
+            if not payload.get('d'):
+                self.session_id = None
+                self.seq = None
+            logging.warning(f'[GATEWAY] Invalid session (resumable={bool(payload.get("d"))})')
+            await asyncio.sleep(random.uniform(1, 5))
+            await ws.close(4000)
+            return False
+        return True
+
+    def _handle_dispatch(self, event: str, data: dict):
+        if event == 'READY':
+            self.session_id = data.get('session_id')
+            self.resume_gateway_url = data.get('resume_gateway_url')
+            self.connected = True
+            logging.info(f'[GATEWAY] Session ready ({self.session_id})')
+        elif event == 'RESUMED':
+            self.connected = True
+            logging.info(f'[GATEWAY] Session resumed at seq {self.seq}')
+        elif event in MESSAGE_EVENTS:
+            if str(data.get('channel_id')) not in self.channel_ids:
+                return
+            # MESSAGE_UPDATE may be partial (e.g. embed unfurls); only forward ones carrying content
+            if event == 'MESSAGE_UPDATE' and 'content' not in data and 'embeds' not in data:
+                return
+            data.setdefault('content', '')
+            data.setdefault('embeds', [])
+            try:
+                self.on_message(data)
+            except Exception as _exc:
+                logging.error(f'[GATEWAY] on_message failed for {data.get("id")}: {_exc}')
+
+    async def _heartbeat_loop(self, ws, interval: float):
+        await asyncio.sleep(interval * random.random())
+        while True:
+            if not self._heartbeat_acked:
+                # zombied connection: no ACK since the last beat
+                logging.warning(f'[GATEWAY] Heartbeat not acknowledged, forcing reconnect')
+                await ws.close(4000)
+                return
+            self._heartbeat_acked = False
+            await self._send(ws, OP_HEARTBEAT, self.seq)
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    async def _send(ws, op: int, data):
+        await ws.send(json.dumps({'op': op, 'd': data}))
+
+
+# =============================================================================================== #
+
+
+if __name__ == '__main__':
+    pass
@@ -1,19 +1,26 @@
 # =============================================================================================== #
 from datetime import datetime, timezone, timedelta
-import requests
 import json
 import logging
+import http_transport
 
 # =============================================================================================== #
 
 BASE_URL = 'https://discord.com/api/v9/channels/{channel_id}/messages?limit={msg_limit}'
+MAX_PAGE_SIZE = 100  # Discord caps `limit` at 100 messages per request
+MAX_CATCH_UP_PAGES = 50
+
+DISCORD_EPOCH_MS = 1420070400000
+MAX_CLOCK_SKEW_MS = 5_000  # messages stamped up to this far ahead of the local clock are still accepted
 
 # =============================================================================================== #
 
 
 class DiscordChannelClient:
-    def __init__(self, auth_token: str):
+    def __init__(self, auth_token: str, base_url: str = BASE_URL, scheduler=None):
         self.auth_token = auth_token
+        self.base_url = base_url
+        self.scheduler = scheduler  # poll_scheduler.AdaptivePollScheduler fed with every response
 
         self.headers = {'authorization': self.auth_token,
                         'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, '
@@ -21,12 +28,132 @@ class DiscordChannelClient:
 
     def poll_new_messages(self, channel_id: str, limit: int) -> list:
         try:
-            return requests.get(BASE_URL.format(channel_id=channel_id, msg_limit=limit),
-                                headers=self.headers).json()
+            response = http_transport.get_client().get(self.base_url.format(channel_id=channel_id, msg_limit=limit),
+                                                       headers=self.headers)
+            return self._observe(response)
         except Exception as _exc:
             logging.error(f'Exception polling new messages from discord. exc: {_exc}')
             return []
 
+    def fetch_messages_after(self, channel_id: str, after, limit: int = MAX_PAGE_SIZE) -> list:
+        """
+        Fetch only the messages posted after the `after` snowflake (at most `limit`), newest first.
+        """
+        try:
+            response = http_transport.get_client().get(self._after_url(channel_id, after, limit),
+                                                       headers=self.headers)
+            messages = self._observe(response)
+        except Exception as _exc:
+            logging.error(f'Exception fetching messages after {after} from discord. exc: {_exc}')
+            return []
+        return self._newest_first(messages, after)
+
+    async def fetch_messages_after_async(self, channel_id: str, after, limit: int = MAX_PAGE_SIZE) -> list:
+        """
+        Async variant of `fetch_messages_after` on the shared async client.
+        """
+        try:
+            response = await http_transport.get_async_client().get(self._after_url(channel_id, after, limit),
+                                                                   headers=self.headers)
+            messages = self._observe(response)
+        except Exception as _exc:
+            logging.error(f'Exception fetching messages after {after} from discord. exc: {_exc}')
+            return []
+        return self._newest_first(messages, after)
+
+    def catch_up(self, channel_id: str, after, max_pages: int = MAX_CATCH_UP_PAGES) -> list:
+        """
+        Drain every message newer than the `after` snowflake, paginating forward a full page at a time.
+        A steady-state poll costs one request; a backlog (restart, network blip) is fetched in full
+        instead of being cut at a single page. Returns newest first.
+        """
+        messages = []
+        cursor = after
+        for _ in range(max_pages):
+            page = self.fetch_messages_after(channel_id, cursor, MAX_PAGE_SIZE)
+            messages.extend(page)
+            if len(page) < MAX_PAGE_SIZE:
+                break
+            cursor = page[0]['id']
+        else:
+            logging.warning(f'Discord catch-up stopped after {max_pages} pages at message {cursor}, '
+                            f'remaining messages are fetched on the next poll')
+
+        return sorted(messages, key=lambda message: int(message['id']), reverse=True)
+
+    async def catch_up_async(self, channel_id: str, after, max_pages: int = MAX_CATCH_UP_PAGES) -> list:
+        """
+        Async variant of `catch_up`.
+        """
+        messages = []
+        cursor = after
+        for _ in range(max_pages):
+            page = await self.fetch_messages_after_async(channel_id, cursor, MAX_PAGE_SIZE)
+            messages.extend(page)
+            if len(page) < MAX_PAGE_SIZE:
+                break
+            cursor = page[0]['id']
+        else:
+            logging.warning(f'Discord catch-up stopped after {max_pages} pages at message {cursor}, '
+                            f'remaining messages are fetched on the next poll')
+
+        return sorted(messages, key=lambda message: int(message['id']), reverse=True)
+
+    def _observe(self, response):
+        body = response.json()
+        if self.scheduler is not None:
+            self.scheduler.observe_response(response.status_code, response.headers, body)
+        return body
+
+    def _after_url(self, channel_id: str, after, limit: int) -> str:
+        return self.base_url.format(channel_id=channel_id, msg_limit=limit) + f'&after={after}'
+
+    @staticmethod
+    def _newest_first(messages, after) -> list:
+        if not isinstance(messages, list):
+            logging.error(f'Unexpected response fetching messages after {after} from discord: {messages}')
+            return []
+        return sorted(messages, key=lambda message: int(message['id']), reverse=True)
+
+
+def snowflake_to_ms(snowflake) -> int:
+    """
+    Creation time (unix epoch milliseconds) encoded in a Discord snowflake.
+    """
+    return (int(snowflake) >> 22) + DISCORD_EPOCH_MS
+
+
+def snowflake_from_ms(epoch_ms: int) -> int:
+    """
+    Smallest Discord snowflake that could have been created at `epoch_ms`.
+    """
+    return max(epoch_ms - DISCORD_EPOCH_MS, 0) << 22
+
+
+def snowflake_from_datetime(dt: datetime) -> int:
+    """
+    Smallest Discord snowflake that could have been created at `dt`, usable as an `after` cursor.
+    """
+    return snowflake_from_ms(int(dt.timestamp() * 1000))
+
+
+def filter_new_messages(messages: list, last_id, now_ms: int, max_age_ms: int,
+                        max_skew_ms: int = MAX_CLOCK_SKEW_MS) -> list:
+    """
+    Messages newer than `last_id`, created less than `max_age_ms` before `now_ms` and at most `max_skew_ms`
+    after it (Discord's clock may run ahead of ours; the cursor moves past a dropped message for good),
+    de-duplicated by id (last copy wins, e.g. a MESSAGE_UPDATE) and ordered oldest first.
+    Age, ordering and dedup all come from the integer snowflake; no timestamp string is parsed.
+    """
+    lower = max(int(last_id), snowflake_from_ms(now_ms - max_age_ms + 1) - 1)
+    upper = snowflake_from_ms(now_ms + max_skew_ms + 1)
+    fresh = {}
+    for message in messages:
+        snowflake = int(message['id'])
+        if lower < snowflake < upper:
+            fresh[snowflake] = message
+    return [fresh[snowflake] for snowflake in sorted(fresh)]
+
 
 # =============================================================================================== #
 
@@ -0,0 +1,171 @@
+# =============================================================================================== #
+import asyncio
+import copy
+import logging
+import time
+from math import isnan
+import ib_insync
+from ib_insync import LimitOrder, MarketOrder
+import config
+from ib_interface import fallback_quote
+
+# =============================================================================================== #
+
+
+class FlattenEngine:
+    """
+    Closes every open position at once.
+    - Working orders (native trails, bracket legs, unfilled entries) are cancelled first, so nothing
+      else can fill while the book is being closed.
+    - The position contracts are qualified in one batch and quoted concurrently.
+    - All closing orders go out together as limits at the quote, on the contract's price grid; an order
+      still working after `reprice_after` seconds is moved to the far touch, after `market_after` seconds
+      it is replaced by a market order (at once when the limit is rejected). Fills are tracked concurrently.
+    - `flatten` returns once every closing order is done or `deadline` seconds have passed.
+    """
+
+    def __init__(self, ib_interface, reprice_after: float = 3.0, market_after: float = 8.0,
+                 deadline: float = 20.0, quote_timeout: float = 1.0, clock=time.monotonic):
+        self.ib_interface = ib_interface
+        self.reprice_after = reprice_after
+        self.market_after = market_after
+        self.deadline = deadline
+        self.quote_timeout = quote_timeout
+        self.clock = clock
+        self.task = None
+
+    @classmethod
+    def from_config(cls, ib_interface):
+        return cls(ib_interface, reprice_after=config.FLATTEN_REPRICE_SECONDS,
+                   market_after=config.FLATTEN_MARKET_SECONDS, deadline=config.FLATTEN_DEADLINE_SECONDS)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def start(self):
+        """
+        Flatten in the background on the running event loop (once at a time), or right away when no loop
+        is running.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return ib_insync.util.run(self.flatten())
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self.flatten())
+        return self.task
+
+    async def flatten(self) -> dict:
+        started = self.clock()
+        await self.cancel_working_orders()
+        positions = self.ib_interface.get_positions()
+        if positions:
+            logging.info(f'[FLATTEN] Closing {len(positions)} positions')
+            contracts = await self.resolve(positions)
+            await asyncio.gather(*(self.ib_interface.ticks.load(contract) for contract in contracts))
+            quotes = await asyncio.gather(*(self.quote(contract) for contract in contracts))
+            results = await asyncio.gather(*(self.close(position, contract, quote, started)
+                                             for position, contract, quote in zip(positions, contracts, quotes)),
+                                           return_exceptions=True)
+            for contract, result in zip(contracts, results):
+                if isinstance(result, Exception):  # the other positions are closed regardless
+                    logging.error(f'[FLATTEN] {contract.localSymbol}: closing failed: {result}')
+
+        remaining = self.ib_interface.get_positions()
+        elapsed = self.clock() - started
+        if remaining:
+            logging.error(f'[FLATTEN] {len(remaining)} positions still open after {elapsed:.1f}s: '
+                          f'{[position.contract.localSymbol for position in remaining]}')
+        else:
+            logging.info(f'[FLATTEN] Book flat after {elapsed:.1f}s')
+        return {'positions': len(positions), 'remaining': len(remaining), 'elapsed': elapsed}
+
+    # ------------------------------------------------------------------------------------------- #
+
+    async def cancel_working_orders(self):
+        working = self.ib_interface.portfolio.working_orders()
+        for trade in working:
+            self.ib_interface.ib.cancelOrder(trade.order)
+        await asyncio.gather(*(self.ib_interface.wait_for_fill_async(trade, timeout=self.quote_timeout)
+                               for trade in working))
+
+    async def resolve(self, positions: list) -> list:
+        """
+        Routable copies of the position contracts (IB reports positions without an exchange), in one request.
+        """
+        contracts = []
+        for position in positions:
+            contract = copy.copy(position.contract)
+            contract.exchange = 'SMART'
+            contracts.append(contract)
+        await self.ib_interface.ib.qualifyContractsAsync(*contracts)
+        return contracts
+
+    async def quote(self, contract) -> tuple:
+        """
+        (price, bid, ask) from the live stream within `quote_timeout`; price is None without one (no delayed data,
+        the position is closed at market instead), also when no market data line can be opened.
+        """
+        try:
+            ticker = self.ib_interface.market_data.acquire(contract)
+        except Exception as _exc:  # e.g. MarketDataLinesExhausted while trails hold the lines
+            logging.warning(f'[FLATTEN] {contract.localSymbol}: no quote ({_exc}), closing at market')
+            return None, None, None
+        try:
+            tier, price = await self.ib_interface.wait_for_quote_async(ticker, self.quote_timeout)
+            if tier is None:
+                tier, price = fallback_quote(ticker)
+        except Exception as _exc:
+            logging.warning(f'[FLATTEN] {contract.localSymbol}: no quote ({_exc}), closing at market')
+            price = None
+        finally:
+            self.ib_interface.market_data.release(contract)
+        return price, ticker.bid, ticker.ask
+
+    async def close(self, position, contract, quote: tuple, started: float) -> ib_insync.Trade:
+        price, bid, ask = quote
+        action = 'SELL' if position.position > 0 else 'BUY'
+        touch = bid if action == 'SELL' else ask
+        if price is None or price <= 0:
+            return await self.place_market(contract, action, abs(position.position), started)
+
+        ticks = self.ib_interface.ticks
+        order = self.with_account(LimitOrder(action, abs(position.position), ticks.round(contract, price)))
+        trade = self.ib_interface.ib.placeOrder(contract, order)
+        if await self.ib_interface.wait_for_fill_async(trade, timeout=self.remaining(started, self.reprice_after)):
+            return trade
+
+        if not trade.isActive():  # rejected or cancelled, a finished order cannot be modified
+            logging.warning(f'[FLATTEN] {contract.localSymbol}: limit ended {trade.orderStatus.status}, '
+                            f'closing the rest at market')
+        else:
+            touch = ticks.round(contract, touch) if touch is not None and not isnan(touch) and touch > 0 else None
+            if touch is not None and touch != order.lmtPrice:
+                logging.info(f'[FLATTEN] {contract.localSymbol}: repricing {order.lmtPrice} -> {touch}')
+                order.lmtPrice = touch
+                self.ib_interface.ib.placeOrder(contract, order)
+            if await self.ib_interface.wait_for_fill_async(trade,
+                                                           timeout=self.remaining(started, self.market_after)):
+                return trade
+            logging.warning(f'[FLATTEN] {contract.localSymbol}: limit unfilled, escalating to market')
+
+        if trade.isActive():
+            self.ib_interface.ib.cancelOrder(order)
+            await self.ib_interface.wait_for_fill_async(trade, timeout=self.quote_timeout)
+        if trade.remaining() <= 0:
+            return trade
+        return await self.place_market(contract, action, trade.remaining(), started)
+
+    async def place_market(self, contract, action: str, qty: float, started: float) -> ib_insync.Trade:
+        trade = self.ib_interface.ib.placeOrder(contract, self.with_account(MarketOrder(action, qty)))
+        await self.ib_interface.wait_for_fill_async(trade, timeout=self.remaining(started, self.deadline))
+        return trade
+
+    def with_account(self, order):
+        if self.ib_interface.account_number:
+            order.account = self.ib_interface.account_number
+        return order
+
+    def remaining(self, started: float, until: float) -> float:
+        return max(0.0, started + until - self.clock())
+
+# =============================================================================================== #
@@ -0,0 +1,73 @@
+# =============================================================================================== #
+import logging
+import httpx
+import config
+
+# =============================================================================================== #
+
+_client = None
+_async_client = None
+
+# =============================================================================================== #
+
+
+def http2_available() -> bool:
+    """
+    HTTP/2 needs the optional `h2` package (pip install httpx[http2]).
+    """
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def client_options() -> dict:
+    http2 = config.HTTP_USE_HTTP2 and http2_available()
+    if config.HTTP_USE_HTTP2 and not http2:
+        logging.warning(f'[HTTP] HTTP/2 requested but the h2 package is missing, using HTTP/1.1')
+    return {
+        'http2': http2,
+        'timeout': httpx.Timeout(config.HTTP_READ_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+        'limits': httpx.Limits(max_connections=config.HTTP_MAX_CONNECTIONS,
+                               max_keepalive_connections=config.HTTP_MAX_CONNECTIONS,
+                               keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY),
+    }
+
+
+def get_client() -> httpx.Client:
+    """
+    Process-wide pooled client: connections (and their TLS sessions) are kept alive and reused
+    by every Discord / Telegram call instead of paying a handshake per request. Thread-safe.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.Client(**client_options())
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Async counterpart of `get_client`. Bound to the event loop it is first used on.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(**client_options())
+    return _async_client
+
+
+def close():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+# =============================================================================================== #
@@ -1,23 +1,50 @@
 # ib_interface.py
 
+import asyncio
 import logging
+import time
+from datetime import datetime, timezone
+from math import isnan
 import ib_insync
 from ib_insync import Option, Stock, Order
+import config
+from contract_cache import ContractCache, contract_key
+from option_chain_index import OptionChainIndex
+from market_data_manager import MarketDataManager
+from ib_pacer import LANE_MARKET_DATA, IBPacer, PacedIB, paced_group
+from portfolio_index import PortfolioIndex
+from bracket_order import BracketTrade, build_bracket, build_exits
+from peg_executor import PegExecutor
+from native_trail import build_native_trail
+from tick_rules import TickRules
 
 
 class IBInterface:
-    def __init__(self, host: str = "127.0.0.1", port: int = 7497, clientId: int = 1, account_number: str = ""):
+    def __init__(self, host: str = "127.0.0.1", port: int = 7497, clientId: int = 1, account_number: str = "",
+                 contract_cache: ContractCache = None, option_chains: OptionChainIndex = None,
+                 pacer: IBPacer = None):
         """
-        Initialize the IB connection.
+        Initialize the IB connection. Every request is paced through `pacer` (see ib_pacer.py).
         """
-        self.ib = ib_insync.IB()
+        self.pacer = pacer if pacer is not None else IBPacer.from_config()
+        self.ib = PacedIB(ib_insync.IB(), self.pacer)
         self.account_number = account_number
+        self.contract_cache = contract_cache if contract_cache is not None else ContractCache.from_config()
+        self.option_chains = option_chains if option_chains is not None else OptionChainIndex.from_config()
+        self.market_data = MarketDataManager.from_config(self.ib)
+        self.ticks = TickRules.from_config(self.ib)
+        self.portfolio = PortfolioIndex()
+        self.portfolio.attach(self.ib)
+        self.executor = PegExecutor.from_config(self)
         self.ib.connect(host, port, clientId)
         logging.info(f"[IB] Connected to {host}:{port} as clientId={clientId}")
+        self.portfolio.seed(self.ib)
 
     def create_contract(self, parsed_symbol) -> ib_insync.Contract:
         """
         Build and qualify a Stock or Option contract from parsed_symbol.
+        Qualified contracts are served from the contract cache or the option chain index without an IB
+        round trip.
         - If parsed_symbol is a plain string (e.g., "AAPL"), we treat it as a Stock.
         - Otherwise, parsed_symbol should have attributes:
             • underlying_symbol (str, e.g., "SPX")
@@ -25,11 +52,21 @@ class IBInterface:
             • strike_price (float)
             • call_or_put ("C" or "P")
         """
+        return self.qualify_contract(self.build_contract(parsed_symbol))
+
+    async def create_contract_async(self, parsed_symbol) -> ib_insync.Contract:
+        """
+        Async variant of `create_contract`.
+        """
+        return await self.qualify_contract_async(self.build_contract(parsed_symbol))
+
+    @staticmethod
+    def build_contract(parsed_symbol) -> ib_insync.Contract:
+        """
+        Unqualified Stock or Option contract for parsed_symbol (see create_contract).
+        """
         if not hasattr(parsed_symbol, "underlying_symbol"):
-            contract = Stock(parsed_symbol, "SMART", "USD")
-            self.ib.qualifyContracts(contract)
-            logging.info(f"[CONTRACT] Qualified Stock: {contract.localSymbol}")
-            return contract
+            return Stock(parsed_symbol, "SMART", "USD")
 
         expiry_str = parsed_symbol.expiry.strftime("%Y%m%d")
         contract = Option(
@@ -50,10 +87,66 @@ class IBInterface:
                 currency="USD",
                 tradingClass="SPXW"
             )
+        return contract
+
+    def qualify_contract(self, contract: ib_insync.Contract) -> ib_insync.Contract:
+        """
+        Cached contract for `contract`'s (underlying, expiry, strike, right, tradingClass), else the one
+        listed in the option chain index, else qualify it with IB; the result is cached.
+        """
+        key = contract_key(contract)
+        known = self.known_contract(key)
+        if known is not None:
+            return known
+
         self.ib.qualifyContracts(contract)
-        logging.info(f"[CONTRACT] Qualified Option: {contract.localSymbol}")
+        self.contract_cache.put(key, contract)
+        logging.info(f"[CONTRACT] Qualified {contract.secType}: {contract.localSymbol}")
+        return contract
+
+    async def qualify_contract_async(self, contract: ib_insync.Contract) -> ib_insync.Contract:
+        """
+        Async variant of `qualify_contract`.
+        """
+        key = contract_key(contract)
+        known = self.known_contract(key)
+        if known is not None:
+            return known
+
+        await self.ib.qualifyContractsAsync(contract)
+        self.contract_cache.put(key, contract)
+        logging.info(f"[CONTRACT] Qualified {contract.secType}: {contract.localSymbol}")
         return contract
 
+    def known_contract(self, key: tuple):
+        """
+        Qualified contract for a contract_key from the cache or the option chain index, else None.
+        """
+        cached = self.contract_cache.get(key)
+        if cached is not None:
+            logging.debug(f"[CONTRACT] Cache hit: {cached.localSymbol}")
+            return cached
+
+        listed = self.option_chains.resolve(key)
+        if listed is not None:
+            self.contract_cache.put(key, listed)
+            logging.info(f"[CONTRACT] Resolved from chain index: {listed.localSymbol}")
+        return listed
+
+    def refresh_option_chains(self, force: bool = False):
+        """
+        Re-download the watched option chains when the refresh interval has passed (or `force`).
+        """
+        if force or self.option_chains.refresh_due():
+            self.option_chains.refresh(self.ib)
+
+    async def refresh_option_chains_async(self, force: bool = False):
+        """
+        Async variant of `refresh_option_chains`.
+        """
+        if force or self.option_chains.refresh_due():
+            await self.option_chains.refresh_async(self.ib)
+
     def get_realtime_price(
         self,
         contract: ib_insync.Contract,
@@ -61,47 +154,217 @@ class IBInterface:
         use_snapshot: bool = False
     ) -> tuple[float, ib_insync.Contract]:
         """
-        Fetch a single real-time price for a qualified IB Contract.
+        Fetch a single real-time price for a qualified IB Contract (see get_quote).
         If use_snapshot=True, requests a one-shot snapshot.
-        Otherwise, subscribes to streaming ticks for up to `timeout` seconds.
 
         Returns:
             (price: float, contract: ib_insync.Contract)
         """
+        quote = self.get_quote(contract, timeout=timeout, use_snapshot=use_snapshot)
+        return quote['price'], contract
+
+    async def get_realtime_price_async(self, contract: ib_insync.Contract, timeout: float = 3.0,
+                                       use_snapshot: bool = False) -> tuple[float, ib_insync.Contract]:
+        """
+        Async variant of `get_realtime_price`.
+        """
+        quote = await self.get_quote_async(contract, timeout=timeout, use_snapshot=use_snapshot)
+        return quote['price'], contract
+
+    def get_quote(self, contract: ib_insync.Contract, timeout: float = 3.0, use_snapshot: bool = False) -> dict:
+        """
+        Read `contract`'s shared streaming ticker (see MarketDataManager) and return as soon as a tick
+        meets the quality rule, immediately when the contract is already streaming: a two-sided quote
+        with a spread within QUOTE_MAX_SPREAD_PERCENT of the mid ('quote' tier) or a last trade at most
+        QUOTE_MAX_LAST_AGE_SECONDS old ('trade' tier). After `timeout` seconds it falls back to any last
+        ('last'), a wide two-sided quote ('wide_quote'), the close ('close') and finally frozen/delayed
+        data ('frozen'/'delayed').
+
+        Returns:
+            {'price', 'tier', 'elapsed' (seconds), 'bid', 'ask', 'last'}; price is -1.0 and tier None
+            when nothing usable arrived.
+        """
+        started = time.monotonic()
+        tier, price, ticker = None, -1.0, None
         try:
             if not getattr(contract, "conId", None):
                 self.ib.qualifyContracts(contract)
 
             if use_snapshot:
-                ticker = self.ib.reqMktData(contract, "", False, True)
-                self.ib.sleep(0.5)
-                price = ticker.last if (ticker.last not in [None, 0.0]) else None
-                try:
-                    self.ib.cancelMktData(contract)
-                except Exception:
-                    pass
+                ticker = self.ib.reqMktData(contract, "", True, False)
+                tier, price = self.wait_for_quote(ticker, timeout)
             else:
-                ticker = self.ib.reqMktData(contract, "", False, False)
-                self.ib.sleep(timeout)
-                self.ib.cancelMktData(contract)
-                price = ticker.last if ticker.last and ticker.last not in [0.0] else ticker.marketPrice()
+                ticker = self.market_data.acquire(contract)
+                try:
+                    tier, price = self.wait_for_quote(ticker, timeout)
+                finally:
+                    self.market_data.release(contract)
+            if tier is None:
+                tier, price = fallback_quote(ticker)
+
+            # the delayed request would replace the live line, so only take it over when nobody holds it
+            if tier is None and config.QUOTE_DELAYED_FALLBACK and \
+                    (use_snapshot or self.market_data.discard(contract)):
+                tier, price = self.delayed_quote(contract, config.QUOTE_DELAYED_TIMEOUT)
+
+        except Exception as exc:
+            logging.error(f"[PRICE EXC] failed for {getattr(contract, 'localSymbol', contract)}: {exc}")
+            tier, price = None, -1.0
 
-            if price in [None, 0.0]:
-                if hasattr(ticker, "bid") and hasattr(ticker, "ask") and ticker.bid and ticker.ask:
-                    price = (ticker.bid + ticker.ask) / 2
-                else:
-                    price = None
+        return _quote_result(contract, ticker, tier, price, started)
+
+    async def get_quote_async(self, contract: ib_insync.Contract, timeout: float = 3.0,
+                              use_snapshot: bool = False) -> dict:
+        """
+        Async variant of `get_quote`: waits on the ticker's update events without blocking the loop.
+        """
+        started = time.monotonic()
+        tier, price, ticker = None, -1.0, None
+        try:
+            if not getattr(contract, "conId", None):
+                await self.ib.qualifyContractsAsync(contract)
 
-            if price:
-                logging.info(f"[PRICE FETCH] {contract.localSymbol}: {price}")
-                return price, contract
+            if use_snapshot:
+                ticker = self.ib.reqMktData(contract, "", True, False)
+                tier, price = await self.wait_for_quote_async(ticker, timeout)
             else:
-                logging.warning(f"[PRICE FETCH FAIL] No valid price for {contract.localSymbol}")
-                return -1.0, contract
+                ticker = self.market_data.acquire(contract)
+                try:
+                    tier, price = await self.wait_for_quote_async(ticker, timeout)
+                finally:
+                    self.market_data.release(contract)
+            if tier is None:
+                tier, price = fallback_quote(ticker)
+
+            if tier is None and config.QUOTE_DELAYED_FALLBACK and \
+                    (use_snapshot or self.market_data.discard(contract)):
+                tier, price = await self.delayed_quote_async(contract, config.QUOTE_DELAYED_TIMEOUT)
 
         except Exception as exc:
             logging.error(f"[PRICE EXC] failed for {getattr(contract, 'localSymbol', contract)}: {exc}")
-            return -1.0, contract
+            tier, price = None, -1.0
+
+        return _quote_result(contract, ticker, tier, price, started)
+
+    def wait_for_quote(self, ticker: ib_insync.Ticker, timeout: float) -> tuple:
+        """
+        Block on IB updates (not a fixed sleep) until a tick of `ticker` meets the quality rule, or
+        `timeout` seconds pass. Returns (tier, price), or (None, None) on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            tier, price = acceptable_quote(ticker, config.QUOTE_MAX_SPREAD_PERCENT, config.QUOTE_MAX_LAST_AGE_SECONDS)
+            if tier is not None:
+                return tier, price
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, None
+            self.ib.waitOnUpdate(timeout=remaining)
+
+    def delayed_quote(self, contract: ib_insync.Contract, timeout: float) -> tuple:
+        """
+        Last resort: re-request `contract` as frozen/delayed data (market data type 4) and take whatever
+        price shows up within `timeout` seconds. Returns (tier, price) or (None, None).
+        """
+        ticker = self.request_delayed(contract)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                _, price = fallback_quote(ticker)
+                if price is not None:
+                    return ('frozen' if ticker.marketDataType == 2 else 'delayed'), price
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, None
+                self.ib.waitOnUpdate(timeout=remaining)
+        finally:
+            try:
+                self.ib.cancelMktData(contract)
+            except Exception:
+                pass
+
+    def request_delayed(self, contract: ib_insync.Contract) -> ib_insync.Ticker:
+        """
+        Stream `contract` as frozen/delayed data (market data type 4). The type applies to every request of the
+        session, so it is set back to live right after this one: no other request (of a concurrent task) can
+        go out in between and end up delayed on a line handed out as live (the three messages are paced as
+        one unit).
+        """
+        with paced_group(self.ib, LANE_MARKET_DATA):
+            self.ib.reqMarketDataType(4)
+            try:
+                return self.ib.reqMktData(contract, "", False, False)
+            finally:
+                self.ib.reqMarketDataType(1)
+
+    async def wait_for_quote_async(self, ticker: ib_insync.Ticker, timeout: float) -> tuple:
+        """
+        Async variant of `wait_for_quote`, awaiting the ticker's update events.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            tier, price = acceptable_quote(ticker, config.QUOTE_MAX_SPREAD_PERCENT, config.QUOTE_MAX_LAST_AGE_SECONDS)
+            if tier is not None:
+                return tier, price
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, None
+            try:
+                await asyncio.wait_for(next_emit(ticker.updateEvent), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def delayed_quote_async(self, contract: ib_insync.Contract, timeout: float) -> tuple:
+        """
+        Async variant of `delayed_quote`.
+        """
+        ticker = self.request_delayed(contract)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                _, price = fallback_quote(ticker)
+                if price is not None:
+                    return ('frozen' if ticker.marketDataType == 2 else 'delayed'), price
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None, None
+                try:
+                    await asyncio.wait_for(next_emit(ticker.updateEvent), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            try:
+                self.ib.cancelMktData(contract)
+            except Exception:
+                pass
+
+    def wait_for_fill(self, trade: ib_insync.Trade, timeout: float = None) -> bool:
+        """
+        Block on IB updates until `trade` is done (or `timeout` seconds pass, if given).
+        Returns whether the order ended up filled.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while trade.isActive():
+            remaining = deadline - time.monotonic() if deadline is not None else 0
+            if deadline is not None and remaining <= 0:
+                return False
+            self.ib.waitOnUpdate(timeout=remaining)
+        return trade.orderStatus.status == "Filled"
+
+    async def wait_for_fill_async(self, trade: ib_insync.Trade, timeout: float = None) -> bool:
+        """
+        Async variant of `wait_for_fill`, awaiting the trade's status events.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while trade.isActive():
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(next_emit(trade.statusEvent), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return trade.orderStatus.status == "Filled"
 
     def get_live_price(self, contract: ib_insync.Contract, timeout: float = 2.0) -> float:
         """
@@ -112,12 +375,18 @@ class IBInterface:
 
     def submit_buy_market_order(self, order: dict, adaptive_algo_priority: str = None) -> ib_insync.Trade:
         """
-        Place a simple market BUY order.
+        Place a simple market BUY order, or with USE_PEG_EXECUTION a limit pegged from the mid toward
+        the far touch (see peg_executor.py) when the contract has a streaming two-sided quote.
         Expects `order` to contain:
-          • parsed_symbol
+          • parsed_symbol (or an already qualified `contract`)
           • qty
+          • peg (optional): False to always send a market order
         """
-        contract = self.create_contract(order['parsed_symbol'])
+        contract = order.get('contract') or self.create_contract(order['parsed_symbol'])
+        if config.USE_PEG_EXECUTION and order.get('peg', True):
+            trade = self.executor.submit(contract, "BUY", order['qty'])
+            if trade is not None:
+                return trade
         ib_order = Order(
             action="BUY",
             orderType="MKT",
@@ -132,12 +401,18 @@ class IBInterface:
 
     def submit_sell_market_order(self, order: dict, adaptive_algo_priority: str = None) -> ib_insync.Trade:
         """
-        Place a simple market SELL order.
+        Place a simple market SELL order, or with USE_PEG_EXECUTION a limit pegged from the mid toward
+        the far touch (see peg_executor.py) when the contract has a streaming two-sided quote.
         Expects `order` to contain:
-          • parsed_symbol
+          • parsed_symbol (or an already qualified `contract`)
           • qty
+          • peg (optional): False to always send a market order
         """
-        contract = self.create_contract(order['parsed_symbol'])
+        contract = order.get('contract') or self.create_contract(order['parsed_symbol'])
+        if config.USE_PEG_EXECUTION and order.get('peg', True):
+            trade = self.executor.submit(contract, "SELL", order['qty'])
+            if trade is not None:
+                return trade
         ib_order = Order(
             action="SELL",
             orderType="MKT",
@@ -150,44 +425,60 @@ class IBInterface:
         logging.info(f"[SELL] Market order placed for {contract.localSymbol} qty={order['qty']}")
         return trade
 
-    def submit_bracket_order_order(self, order: dict, adaptive_algo_priority: str = None) -> ib_insync.Trade:
+    def submit_bracket_order_order(self, order: dict, adaptive_algo_priority: str = None) -> BracketTrade:
         """
-        Place a bracket order: market BUY with attached limit TP and stop-loss.
+        Place a bracket order: BUY entry with a limit take-profit and a stop-loss, sent as one group (the
+        exits are transmitted together with the entry and cancel each other via OCA).
         Expects `order` to contain:
-          • parsed_symbol, qty, tp (take-profit price), sl (stop-loss price)
+          • parsed_symbol (or an already qualified `contract`), qty, tp (take-profit price), sl (stop-loss price)
+          • entry_price (optional): limit entry instead of a market entry
+        Returns a BracketTrade tracking all three legs.
         """
-        contract = self.create_contract(order['parsed_symbol'])
-        parent = Order(
-            action="BUY",
-            orderType="MKT",
-            totalQuantity=order['qty'],
-            account=self.account_number if self.account_number else None,
-        )
-        if adaptive_algo_priority:
-            parent.adaptivePriority = adaptive_algo_priority
-        trade = self.ib.placeOrder(contract, parent)
+        contract = order.get('contract') or self.create_contract(order['parsed_symbol'])
+        legs = build_bracket(self.ib, "BUY", order['qty'], order.get('tp'), order.get('sl'),
+                             entry_price=order.get('entry_price'), account=self.account_number)
+        if adaptive_algo_priority and legs[0].orderType == "MKT":
+            legs[0].adaptivePriority = adaptive_algo_priority
+        bracket = BracketTrade(*(self.ib.placeOrder(contract, leg) for leg in legs))
+        logging.info(f"[BRACKET] Placed bracket order for {contract.localSymbol} qty={order['qty']} "
+                     f"entry={legs[0].orderType} tp={order.get('tp')} sl={order.get('sl')}")
+        return bracket
 
-        # Attach TP and SL
-        take_profit = Order(
-            action="SELL",
-            orderType="LMT",
-            totalQuantity=order['qty'],
-            lmtPrice=order.get('tp'),
-            parentId=parent.orderId,
-            account=self.account_number if self.account_number else None,
-        )
-        stop_loss = Order(
-            action="SELL",
-            orderType="STP",
-            totalQuantity=order['qty'],
-            auxPrice=order.get('sl'),
-            parentId=parent.orderId,
-            account=self.account_number if self.account_number else None,
-        )
-        self.ib.placeOrder(contract, take_profit)
-        self.ib.placeOrder(contract, stop_loss)
-        logging.info(f"[BRACKET] Placed bracket order for {contract.localSymbol} qty={order['qty']}")
-        return trade
+    def resubmit_bracket_exits(self, bracket: BracketTrade, qty: float) -> BracketTrade:
+        """
+        Re-place the take-profit and stop-loss of a bracket whose entry was cancelled partly filled (its exits
+        were cancelled with it), for the `qty` that was bought. Returns the bracket with the new exit legs.
+        """
+        entry = bracket.entry.order
+        legs = build_exits(self.ib, entry.action, qty, bracket.take_profit.order.lmtPrice,
+                           bracket.stop_loss.order.auxPrice, f"bracket-{entry.orderId}-filled",
+                           account=self.account_number)
+        take_profit, stop_loss = (self.ib.placeOrder(bracket.contract, leg) for leg in legs)
+        logging.info(f"[BRACKET] Re-placed exits for {bracket.contract.localSymbol} qty={qty} "
+                     f"tp={legs[0].lmtPrice} sl={legs[1].auxPrice}")
+        return BracketTrade(bracket.entry, take_profit, stop_loss)
+
+    async def replace_bracket_exits_async(self, bracket: BracketTrade, qty: float,
+                                          timeout: float = 5.0) -> BracketTrade:
+        """
+        Protect the `qty` bought by a bracket entry that was cancelled partly filled. The original exits are
+        cancelled and their cancel confirmed (not assumed from the parent's) before a standalone pair is placed
+        for what is still held, so two sets of exits never work at once. Exits already working for exactly
+        `qty` are kept.
+        """
+        exits = (bracket.take_profit, bracket.stop_loss)
+        if all(leg.isActive() and leg.order.totalQuantity == qty and not leg.filled() for leg in exits):
+            return bracket
+        for leg in exits:
+            if leg.isActive():
+                self.ib.cancelOrder(leg.order)
+        await asyncio.gather(*(self.wait_for_fill_async(leg, timeout=timeout) for leg in exits))
+        if any(leg.isActive() for leg in exits):
+            logging.error(f"[BRACKET] Exits of {bracket.contract.localSymbol} not confirmed cancelled, "
+                          f"not re-placing them")
+            return bracket
+        held = qty - sum(leg.filled() for leg in exits)
+        return self.resubmit_bracket_exits(bracket, held) if held > 0 else bracket
 
     def submit_trailing_stop_order(self, order: dict) -> ib_insync.Trade:
         """
@@ -195,18 +486,15 @@ class IBInterface:
         """
         return self.place_native_trail_stop(order)
 
-    # alias for unsubscribe
-    stop_stream = unsub_market_data
-
     def place_native_trail_stop(self, order: dict) -> ib_insync.Trade:
         """
         Place a native IB trailing-stop order.
         Expects `order` to contain:
-          • parsed_symbol
+          • parsed_symbol (or an already qualified `contract`)
           • qty
           • trail_percent
         """
-        contract = self.create_contract(order["parsed_symbol"])
+        contract = order.get("contract") or self.create_contract(order["parsed_symbol"])
         trailing_percent = order.get("trail_percent", 1.5) / 100.0
         ib_order = Order(
             orderType="TRAIL",
@@ -223,15 +511,48 @@ class IBInterface:
         )
         return trade
 
+    def submit_native_trail(self, order: dict) -> tuple:
+        """
+        Hand the adaptive trailing policy of a position to IB: a stop that IB turns into a trail at the
+        breakeven price, and a time-conditioned exit, in one OCA group (see native_trail.py).
+        Expects `order` to contain:
+          • contract (qualified), qty, entry_price
+        Returns the (stop, timeout exit) trades.
+        """
+        contract = order['contract']
+        legs = build_native_trail(order['qty'], order['entry_price'], config.BREAKEVEN_TRIGGER_PERCENT,
+                                  config.MAX_LOSS_STOP_PERCENT, config.TIMEOUT_EXIT_MINUTES,
+                                  oca_group=f"trail-{contract.conId}-{time.time():.0f}",
+                                  initial_stop_pct=config.NATIVE_TRAIL_INITIAL_STOP_PERCENT,
+                                  account=self.account_number)
+        trades = tuple(self.ib.placeOrder(contract, leg) for leg in legs)
+        logging.info(f"[NATIVE TRAIL] {contract.localSymbol} qty={order['qty']}: stop {legs[0].auxPrice}, "
+                     f"trails {config.MAX_LOSS_STOP_PERCENT}% from {legs[0].triggerPrice}, "
+                     f"exits at {legs[1].conditions[0].time} UTC")
+        return trades
+
+    def get_positions(self) -> list:
+        """
+        Open positions from the local portfolio index, without a broker round trip.
+        """
+        return self.portfolio.open_positions()
+
+    def latest_ticker(self, contract: ib_insync.Contract):
+        """
+        Latest streaming Ticker of `contract` without an IB request, or None when it is not subscribed.
+        """
+        return self.market_data.ticker(contract)
+
     def unsub_market_data(self, contract: ib_insync.Contract):
         """
-        Cancel any ongoing market data subscription.
+        Cancel the shared market data subscription of `contract` unless another consumer holds it.
+        Safe to call on contracts that were never subscribed or are already cancelled.
         """
-        try:
-            self.ib.cancelMktData(contract)
+        if self.market_data.discard(contract):
             logging.info(f"[UNSUBSCRIBE] Cancelled market data for {contract.localSymbol}")
-        except Exception as exc:
-            logging.warning(f"[UNSUBSCRIBE FAIL] Could not cancel data for {contract}: {exc}")
+
+    # alias for unsubscribe
+    stop_stream = unsub_market_data
 
     def disconnect(self):
         """
@@ -239,6 +560,70 @@ class IBInterface:
         """
         try:
             self.ib.disconnect()
-            logging.info("[IB] Disconnected from Interactive Brokers")
+            logging.info(f"[IB] Disconnected from Interactive Brokers | "
+                         f"contract cache: {self.contract_cache.metrics()} | market data: {self.market_data.metrics()}")
         except Exception as exc:
             logging.error(f"[IB DISCONNECT ERROR] {exc}")
+
+
+def next_emit(event) -> asyncio.Future:
+    """
+    Future set by the next emit of an ib_insync event. Unlike awaiting the event itself, it listens from the
+    moment it is created, so an emit before the awaiting task first runs is not missed.
+    """
+    future = asyncio.get_running_loop().create_future()
+
+    def on_emit(*args):
+        if not future.done():
+            future.set_result(args)
+
+    event.connect(on_emit)
+    future.add_done_callback(lambda _: event.disconnect(on_emit))
+    return future
+
+
+def _quote_result(contract, ticker, tier, price, started: float) -> dict:
+    elapsed = time.monotonic() - started
+    if tier is not None:
+        logging.info(f"[PRICE FETCH] {contract.localSymbol}: {price} ({tier} tier, {elapsed * 1000:.0f} ms)")
+    else:
+        logging.warning(f"[PRICE FETCH FAIL] No valid price for {getattr(contract, 'localSymbol', contract)} "
+                        f"after {elapsed * 1000:.0f} ms")
+        price = -1.0
+    return {'price': price, 'tier': tier, 'elapsed': elapsed,
+            'bid': getattr(ticker, 'bid', None), 'ask': getattr(ticker, 'ask', None),
+            'last': getattr(ticker, 'last', None)}
+
+
+def acceptable_quote(ticker: ib_insync.Ticker, max_spread_percent: float, max_last_age: float, now=None) -> tuple:
+    """
+    ('quote', mid) for a two-sided quote whose spread is within `max_spread_percent` of the mid,
+    ('trade', last) for a last trade at most `max_last_age` seconds old (needs the RT Volume tick time),
+    else (None, None).
+    """
+    if _valid_price(ticker.bid) and _valid_price(ticker.ask) and ticker.ask >= ticker.bid:
+        mid = (ticker.bid + ticker.ask) / 2
+        if (ticker.ask - ticker.bid) / mid * 100 <= max_spread_percent:
+            return 'quote', mid
+    if _valid_price(ticker.last) and ticker.rtTime is not None:
+        now = now or datetime.now(timezone.utc)
+        if (now - ticker.rtTime).total_seconds() <= max_last_age:
+            return 'trade', ticker.last
+    return None, None
+
+
+def fallback_quote(ticker: ib_insync.Ticker) -> tuple:
+    """
+    Best price that does not meet the quality rule: any last, a wide two-sided quote, then the close.
+    """
+    if _valid_price(ticker.last):
+        return 'last', ticker.last
+    if _valid_price(ticker.bid) and _valid_price(ticker.ask):
+        return 'wide_quote', (ticker.bid + ticker.ask) / 2
+    if _valid_price(ticker.close):
+        return 'close', ticker.close
+    return None, None
+
+
+def _valid_price(value) -> bool:
+    return value is not None and not isnan(value) and value > 0
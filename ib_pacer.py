@@ -0,0 +1,254 @@
+# =============================================================================================== #
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+import config
+
+# =============================================================================================== #
+
+# Priority lanes, served lowest number first
+LANE_ORDERS = 0        # placeOrder, cancelOrder: never wait
+LANE_CONTRACTS = 1     # qualification, contract details, option chain parameters
+LANE_MARKET_DATA = 2   # market data subscriptions and snapshots
+LANE_HISTORICAL = 3    # historical bars
+
+LANE_NAMES = {LANE_ORDERS: 'orders', LANE_CONTRACTS: 'contracts', LANE_MARKET_DATA: 'market_data',
+              LANE_HISTORICAL: 'historical'}
+
+METHOD_LANES = {
+    'placeOrder': LANE_ORDERS, 'cancelOrder': LANE_ORDERS, 'reqGlobalCancel': LANE_ORDERS,
+    'qualifyContracts': LANE_CONTRACTS, 'reqContractDetails': LANE_CONTRACTS,
+    'reqSecDefOptParams': LANE_CONTRACTS, 'reqMatchingSymbols': LANE_CONTRACTS, 'reqMarketRule': LANE_CONTRACTS,
+    'reqMktData': LANE_MARKET_DATA, 'cancelMktData': LANE_MARKET_DATA, 'reqMarketDataType': LANE_MARKET_DATA,
+    'reqTickers': LANE_MARKET_DATA, 'reqTickByTickData': LANE_MARKET_DATA,
+    'cancelTickByTickData': LANE_MARKET_DATA,
+    'reqHistoricalData': LANE_HISTORICAL, 'reqHistoricalTicks': LANE_HISTORICAL, 'reqHeadTimeStamp': LANE_HISTORICAL,
+}
+
+# =============================================================================================== #
+
+
+class IBPacer:
+    """
+    Token bucket shared by every request sent to IB, so bursts stay under the API message rate.
+    - `acquire(lane)` waits for a token; waiting requests are served by lane priority, FIFO within a lane.
+    - `take(lane)` is for synchronous calls: the token is taken at once, putting the bucket into debt if
+      it is empty, which the waiting (lower priority) requests then absorb. Orders always go this way.
+    - `defer(lane, send)` queues a synchronous request that could not get a token: `send` is called by the
+      dispatcher in its turn, like a waiting `acquire`.
+    """
+
+    def __init__(self, rate: float = 45, burst: float = 45, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = burst
+        self.updated = clock()
+        self.lanes = {lane: deque() for lane in LANE_NAMES}
+        self.stats = {lane: {'requests': 0, 'waited': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+                      for lane in LANE_NAMES}
+        self.debt_events = 0
+        self._dispatcher = None
+
+    @classmethod
+    def from_config(cls):
+        return cls(rate=config.IB_PACER_RATE, burst=config.IB_PACER_BURST)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def take(self, lane: int, wait: bool = False):
+        """
+        Take a token now. With `wait` (blocking callers outside the event loop, never orders) sleep until
+        one is available instead of going into debt.
+        """
+        self._refill()
+        if wait and lane != LANE_ORDERS and self.tokens < 1:
+            delay = (1 - self.tokens) / self.rate
+            self.sleep(delay)
+            self._refill()
+            self._record(lane, delay)
+        else:
+            self._record(lane, 0.0)
+        if self.tokens < 1:
+            self.debt_events += 1
+        self.tokens -= 1
+
+    async def acquire(self, lane: int):
+        """
+        Wait for a token behind every waiting request of the same or a higher priority lane.
+        """
+        self._refill()
+        if self.tokens >= 1 and not any(self.lanes[waiting] for waiting in self.lanes if waiting <= lane):
+            self.tokens -= 1
+            self._record(lane, 0.0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self.lanes[lane].append((future, self.clock()))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        await future
+
+    def try_take(self, lane: int, cost: int = 1) -> bool:
+        """
+        Take `cost` tokens if a request of `lane` may go out now (a token is free and nothing of the same or
+        a higher priority is waiting).
+        """
+        self._refill()
+        if self.tokens < 1 or any(self.lanes[waiting] for waiting in self.lanes if waiting <= lane):
+            return False
+        self.tokens -= cost
+        if self.tokens < 0:
+            self.debt_events += 1
+        self._record(lane, 0.0)
+        return True
+
+    def defer(self, lane: int, send, cost: int = 1):
+        """
+        Queue `send()` (the messages of a synchronous request) to be called in its turn; needs a running loop.
+        """
+        self.lanes[lane].append((_Deferred(send, cost), self.clock()))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def depth(self) -> int:
+        return sum(len(waiting) for waiting in self.lanes.values())
+
+    def metrics(self) -> dict:
+        lanes = {}
+        for lane, name in LANE_NAMES.items():
+            stats = self.stats[lane]
+            lanes[name] = {'queued': len(self.lanes[lane]), 'requests': stats['requests'], 'waited': stats['waited'],
+                           'mean_wait_ms': 1000 * stats['wait_total'] / stats['waited'] if stats['waited'] else 0.0,
+                           'max_wait_ms': 1000 * stats['wait_max']}
+        self._refill()
+        return {'tokens': round(self.tokens, 2), 'queued': self.depth(), 'debt_events': self.debt_events,
+                'lanes': lanes}
+
+    # ------------------------------------------------------------------------------------------- #
+
+    async def _dispatch(self):
+        while True:
+            lane = next((lane for lane in sorted(self.lanes) if self.lanes[lane]), None)
+            if lane is None:
+                return
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            waiter, queued_at = self.lanes[lane].popleft()
+            if isinstance(waiter, _Deferred):
+                self.tokens -= waiter.cost
+                self._record(lane, self.clock() - queued_at)
+                try:
+                    waiter.send()
+                except Exception as _exc:
+                    logging.error(f'[PACER] Deferred {LANE_NAMES[lane]} request failed: {_exc}')
+                continue
+            if waiter.done():  # the waiter was cancelled
+                continue
+            self.tokens -= 1
+            self._record(lane, self.clock() - queued_at)
+            waiter.set_result(None)
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _record(self, lane: int, waited: float):
+        stats = self.stats[lane]
+        stats['requests'] += 1
+        if waited > 0:
+            stats['waited'] += 1
+            stats['wait_total'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+
+
+class _Deferred:
+    __slots__ = ('send', 'cost')
+
+    def __init__(self, send, cost: int):
+        self.send = send
+        self.cost = cost
+
+
+class PacedIB:
+    """
+    Wraps an `ib_insync.IB` so every request message goes through the pacer, in the lane of METHOD_LANES.
+    - `*Async` requests wait for their token.
+    - Synchronous orders take it at once; other synchronous requests sleep for it when no event loop is
+      running. Inside the loop they run at once (a ticker is returned as usual) but, without a free token,
+      their messages are held back and sent by the pacer in their turn.
+    Everything else (events, cached state, connect) passes straight through.
+    """
+
+    def __init__(self, ib, pacer: IBPacer):
+        self._ib = ib
+        self.pacer = pacer
+        self._held = None  # (lane, messages) while the messages of synchronous requests are collected
+
+    def __getattr__(self, name):
+        attribute = getattr(self._ib, name)
+        base = name[:-len('Async')] if name.endswith('Async') else name
+        lane = METHOD_LANES.get(base)
+        if lane is None or not callable(attribute):
+            return attribute
+
+        if name.endswith('Async'):
+            async def paced_async(*args, **kwargs):
+                await self.pacer.acquire(lane)
+                return await attribute(*args, **kwargs)
+            return paced_async
+
+        def paced(*args, **kwargs):
+            if lane == LANE_ORDERS or not _loop_running():
+                self.pacer.take(lane, wait=lane != LANE_ORDERS)
+                return attribute(*args, **kwargs)
+            with self.grouped(lane):
+                return attribute(*args, **kwargs)
+        return paced
+
+    @contextmanager
+    def grouped(self, lane: int):
+        """
+        Send the messages of the synchronous requests made inside as one unit in `lane`: at once if a
+        token is free, else together in their turn (nothing else goes out in between).
+        """
+        if self._held is not None:  # nested in another group
+            yield
+            return
+        client = self._ib.client
+        messages = []
+        self._held = (lane, messages)
+        client.sendMsg = messages.append
+        try:
+            yield
+        finally:
+            del client.sendMsg
+            self._held = None
+            if messages:
+                send = lambda: [type(client).sendMsg(client, message) for message in messages]  # noqa: E731
+                if self.pacer.try_take(lane, cost=len(messages)):
+                    send()
+                else:
+                    self.pacer.defer(lane, send, cost=len(messages))
+
+
+def paced_group(ib, lane: int):
+    """
+    `ib.grouped(lane)` when `ib` is paced, else a no-op context.
+    """
+    return ib.grouped(lane) if isinstance(ib, PacedIB) else nullcontext()
+
+
+def _loop_running() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+# =============================================================================================== #
@@ -0,0 +1,113 @@
+# =============================================================================================== #
+import re
+
+# =============================================================================================== #
+
+END = ''  # trie key marking the end of a keyword (every other key is a single character)
+
+# =============================================================================================== #
+
+
+class KeywordMatcher:
+    """
+    Finds the keywords of several categories (e.g. BUY/SELL/TRIM/REJECT) in one pass over a message.
+    All keywords are merged into a character trie that is compiled into a single regular expression,
+    so the scan cost follows the length of the text rather than the number of keywords.
+    - whole_word=True only reports keywords delimited by non-word characters, False reports substrings.
+    - case_sensitive=False matches the lowercased keywords against the lowercased text.
+    A keyword listed under several categories belongs to the first one.
+    """
+
+    def __init__(self, categories: dict, whole_word: bool = True, case_sensitive: bool = False):
+        self.whole_word = whole_word
+        self.case_sensitive = case_sensitive
+        self.categories = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                keyword = keyword if case_sensitive else keyword.lower()
+                if keyword:
+                    self.categories.setdefault(keyword, category)
+        self.keywords = frozenset(self.categories)
+
+        self.trie = {}
+        for keyword in self.categories:
+            node = self.trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[END] = keyword
+
+        self._search = self._scan = None
+        if self.categories:
+            pattern = _trie_pattern(self.trie)
+            if whole_word:
+                pattern = rf'(?<!\w)(?:{pattern})(?!\w)'
+            self._search = re.compile(pattern)
+            self._scan = re.compile(f'(?=({pattern}))')
+
+    def _haystack(self, text: str) -> str:
+        return text if self.case_sensitive else text.lower()
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def lookup(self, word: str):
+        """
+        Category of `word` when it is exactly one of the keywords, else None.
+        """
+        return self.categories.get(word if self.case_sensitive else word.lower())
+
+    def contains(self, text: str) -> bool:
+        return self._search is not None and self._search.search(self._haystack(text)) is not None
+
+    def first(self, text: str):
+        """
+        Leftmost hit as (start, end, keyword, category), or None.
+        """
+        hits = self.find_all(text, limit=1)
+        return hits[0] if hits else None
+
+    def find_all(self, text: str, limit: int = None) -> list:
+        """
+        Every keyword hit as (start, end, keyword, category), ordered by position; overlapping and
+        nested hits (e.g. 'stopped' inside 'stopped out') are all reported. Positions index the
+        lowercased text when the matcher is case-insensitive.
+        """
+        if self._scan is None:
+            return []
+        haystack = self._haystack(text)
+        hits = []
+        for match in self._scan.finditer(haystack):
+            start = match.start()
+            node = self.trie
+            # the regex returns the longest keyword starting here; shorter ones are its trie prefixes
+            for end, char in enumerate(match.group(1), start + 1):
+                node = node[char]
+                keyword = node.get(END)
+                if keyword is not None and (not self.whole_word or _word_ends_at(haystack, end)):
+                    hits.append((start, end, keyword, self.categories[keyword]))
+            if limit is not None and len(hits) >= limit:
+                return hits[:limit]
+        return hits
+
+    def categories_in(self, text: str) -> set:
+        return {hit[3] for hit in self.find_all(text)}
+
+
+# =============================================================================================== #
+
+
+def _trie_pattern(node: dict) -> str:
+    """
+    Regex for a trie node; alternatives are factored by prefix and longer keywords are tried first.
+    """
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in node.items() if char != END]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    return f'(?:{body})?' if END in node else body
+
+
+def _word_ends_at(text: str, end: int) -> bool:
+    return end == len(text) or not (text[end].isalnum() or text[end] == '_')
+
+
+# =============================================================================================== #
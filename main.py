@@ -1,5 +1,8 @@
 # =============================================================================================== #
 import discord_interface
+from discord_gateway import DiscordGatewayClient
+from poll_scheduler import AdaptivePollScheduler
+from latency_tracer import SignalTrace, stamp_received
 import config
 import polygon
 import ib_interface
@@ -8,36 +11,45 @@ from math import floor, isnan
 import json
 import logging
 from datetime import date, datetime, timezone, timedelta
-from dateutil.parser import parse as parse_dt_from_str
 import custom_logger
 import colorama
 import message_parsers
-from collections import defaultdict
 from pprint import pprint
-from decimal import Decimal
 from trailing_stop_manager import TrailingStopManager
-import threading
-from notification import send_telegram_message
+from signal_pipeline import SignalPipeline
+from contract_prefetcher import ContractPrefetcher
+from flatten_engine import FlattenEngine
+import asyncio
+import ib_insync
+from notification import send_telegram_message, send_telegram_message_async
 
 
 # =============================================================================================== #
 
 colorama.init()
 RUNTIME_LOG_FILE = 'runtime.log'
+CHAIN_REFRESH_CHECK_INTERVAL = 60  # seconds between checks whether the watched option chains are due
+PACER_REPORT_INTERVAL = 60  # seconds between IB pacer reports, logged only when requests had to wait
+CANCEL_CONFIRM_TIMEOUT = 5  # seconds to wait for IB to confirm the cancel of an unfilled entry
 
 # =============================================================================================== #
 
 class Main:
     def __init__(self):
-        self.dc_client = discord_interface.DiscordChannelClient(config.DISCORD_AUTH_TOKEN)
+        self.poll_scheduler = AdaptivePollScheduler.from_config()
+        self.poll_mode = None
+        self.dc_client = discord_interface.DiscordChannelClient(config.DISCORD_AUTH_TOKEN,
+                                                                scheduler=self.poll_scheduler)
         self.ib_interface = ib_interface.IBInterface()
+        self.ib_interface.refresh_option_chains()
         self.parser = getattr(message_parsers, config.CHANNEL_INFO['parser'])()
 
         self.portfolio_state = {}  # FIXED
-        self.trailing_manager = TrailingStopManager(self.ib_interface, self.portfolio_state)
+        self.trailing_manager = TrailingStopManager(self.ib_interface, self.portfolio_state, notify=self.notify)
+        self.flatten_engine = FlattenEngine.from_config(self.ib_interface)
 
         self.last_signal_id = read_last_signal_log_id()
-        self.qty_map = defaultdict(lambda *args: 0)
+        self.fetch_cursor = self.last_signal_id
         self.current_state = {}
         self.BUY_SIGNALS = config.BUY_SIGNALS
         self.SELL_SIGNALS = config.SELL_SIGNALS
@@ -50,125 +62,302 @@ class Main:
         self.EXIT_TIME = EXIT_TIME.replace(hour=config.EXIT_HOUR, minute=config.EXIT_MINUTE, second=0, microsecond=0)
         self.EXIT_TIME = int(self.EXIT_TIME.timestamp())
 
-        if config.TRAILING_STOP_ENABLED:
-            threading.Thread(target=self.run_trailing_loop, daemon=True).start()
+        self.message_queue = asyncio.Queue()  # gateway pushes, drained by the ingestion task
+        self.signal_queue = asyncio.Queue()  # fresh messages, consumed by the processing task
+        self.notifications = set()
+        self.pipeline = SignalPipeline.from_config()
+        self.prefetcher = ContractPrefetcher(self.ib_interface)
+        self.gateway = None
+        self.gateway_live = False
+        if config.DISCORD_INGESTION_MODE == 'gateway':
+            self.gateway = DiscordGatewayClient(config.DISCORD_AUTH_TOKEN, [config.CHANNEL_INFO['channel_id']],
+                                                self.on_gateway_message, gateway_url=config.DISCORD_GATEWAY_URL,
+                                                intents=config.DISCORD_GATEWAY_INTENTS)
 
         logging.info(f'Discord and IB clients initiated')
 
     def run(self):
+        ib_insync.util.run(self.run_async())
+
+    async def run_async(self):
+        """
+        Run the bot on the IB event loop: Discord ingestion, signal processing and the background tasks
+        (gateway session, trailing sweep, chain refresh) cooperate on it with IB's tick and order events.
+        Stops at the configured exit time, or when one of the tasks dies; when the exit time is reached
+        while running, the book is flattened once no new signal can be executed (not when the bot is
+        started after it, e.g. in the evening).
+        """
         logging.info(f'Initiating worker loop... BEHOLD!!')
-
+        started_after_exit = time.time() >= self.EXIT_TIME
+        if started_after_exit:
+            logging.warning(f'started after the exit time mentioned in config, open positions are not flattened')
+        tasks = [asyncio.create_task(coro) for coro in (self.ingest_messages(), self.process_signals(),
+                                                        *self.background_tasks())]
+        exit_time = asyncio.create_task(asyncio.sleep(max(0, self.EXIT_TIME - time.time())))
+        done, _ = await asyncio.wait([exit_time, *tasks], return_when=asyncio.FIRST_COMPLETED)
+        if exit_time in done:
+            logging.info(f'system stopped due to exit time mentioned in config')
+
+        for task in (exit_time, *tasks):
+            task.cancel()
+        self.pipeline.cancel()
+        if self.gateway is not None:
+            self.gateway.stop()
+        await asyncio.gather(exit_time, *tasks, return_exceptions=True)
+        await self.pipeline.drain()
+        if exit_time in done and config.FLATTEN_AT_EXIT and not started_after_exit:
+            self.trailing_manager.stop_all()
+            await self.flatten_engine.flatten()
+        if self.notifications:
+            await asyncio.gather(*self.notifications, return_exceptions=True)
+        for task in done:
+            if task is not exit_time and not task.cancelled():
+                task.result()
+
+    def background_tasks(self) -> list:
+        tasks = [self.refresh_chains(), self.report_pacing()]
+        if config.TRAILING_STOP_ENABLED and not config.USE_NATIVE_TRAILING:
+            tasks.append(self.sweep_trailing_stops())
+        if self.gateway is not None:
+            tasks.append(self.gateway.run())
+        return tasks
+
+    async def ingest_messages(self):
+        """
+        Move new, unexpired Discord messages onto `signal_queue`, oldest first.
+        """
         while True:
-            current_datetime = datetime.now()
-            current_timestamp = int(current_datetime.timestamp())
-
-            if self.EXIT_TIME < current_timestamp:
-                logging.info(f'system stopped due to exit time mentioned in config')
-                return
-
-            c_dt = current_dt()
-            all_signals = self.dc_client.poll_new_messages(config.CHANNEL_INFO['channel_id'], 50)
-
-            signals = [signal for signal in all_signals
-                       if Decimal(signal['id']) > Decimal(self.last_signal_id)
-                       and ((c_dt - parse_dt_from_str(signal['timestamp']).replace(tzinfo=timezone.utc)).total_seconds()
-                            < config.ALERT_EXPIRY_DURATION)
-                       and c_dt > parse_dt_from_str(signal['timestamp']).replace(tzinfo=timezone.utc)]
-
-            if not signals:
-                time.sleep(config.SLEEP_DELAY_BETWEEN_POLLS)
+            all_signals = await self.next_messages_async()
+            signals = discord_interface.filter_new_messages(all_signals, self.last_signal_id, current_time_ms(),
+                                                            config.ALERT_EXPIRY_DURATION * 1000)
+            if signals:
+                self.last_signal_id = signals[-1]['id']
+                if not config.TEST_MODE:
+                    update_last_signal_log_id(int(self.last_signal_id))
+                for signal in signals:
+                    self.signal_queue.put_nowait(signal)
+
+            if not self.gateway_live:
+                await self.wait_for_next_poll()
+
+    async def process_signals(self):
+        """
+        Parse queued messages in arrival order and hand the signals to the execution pipeline, so independent
+        signals are qualified, quoted and filled concurrently while signals of one underlying stay in order.
+        """
+        while True:
+            signal = await self.signal_queue.get()
+            if current_time_ms() - discord_interface.snowflake_to_ms(signal['id']) > \
+                    config.SIGNAL_MAX_AGE_SECONDS * 1000:
+                print(f"[INFO] Skipping stale signal {signal['id']}")
                 continue
-
-            self.last_signal_id = signals[0]['id']
-
-            if not config.TEST_MODE:
-                update_last_signal_log_id(Decimal(self.last_signal_id))
-
-            signals.reverse()
-            time.sleep(config.SLEEP_DELAY_BETWEEN_POLLS)
-
-            for signal in signals:
-                msg_time = parse_dt_from_str(signal['timestamp']).replace(tzinfo=timezone.utc)
-                if datetime.now(timezone.utc) - msg_time > timedelta(seconds=config.SIGNAL_MAX_AGE_SECONDS):
-                    print(f"[INFO] Skipping stale signal {signal['id']}")
-                    continue
-                try:
-                    self.process_signal(signal)
-                except Exception as _exc:
-                    logging.error(f'Exception processing signal. exc: {str(_exc)} | signal: {signal}')
-            time.sleep(config.SLEEP_DELAY_BETWEEN_POLLS)
-
-    def run_trailing_loop(self):
+            trace = SignalTrace.for_message(signal)
+            try:
+                parsed = self.parse_signal(signal, trace)
+            except Exception as _exc:
+                parsed = None
+                trace.finish(f'error: {_exc}')
+                logging.error(f'Exception processing signal. exc: {str(_exc)} | signal: {signal}')
+            if parsed is None:
+                self.prefetcher.discard(signal['id'])
+                trace.emit()
+                continue
+            self.pipeline.submit(self.signal_key(parsed),
+                                 lambda parsed=parsed, trace=trace: self.run_signal(parsed, trace))
+
+    async def run_signal(self, signal: dict, trace: SignalTrace):
+        try:
+            await self.execute_signal(signal, trace)
+        except Exception as _exc:
+            trace.finish(f'error: {_exc}')
+            logging.error(f'Exception processing signal. exc: {str(_exc)} | signal: {signal}')
+        finally:
+            self.prefetcher.discard(signal['id'])  # rejected before its contract was claimed
+            trace.emit()
+
+    async def sweep_trailing_stops(self):
+        """
+        Trailing stops react to each tick as it is dispatched; this cheap sweep catches the timeouts of
+        positions whose price stopped moving.
+        """
         while True:
+            await asyncio.sleep(config.TRAIL_SWEEP_INTERVAL)
             try:
                 self.trailing_manager.check_trailing_stops()
             except Exception as e:
-                logging.error(f"[TRAIL LOOP ERROR] {e}")
-            time.sleep(5)  # Check every 5 seconds
+                logging.error(f"[TRAIL SWEEP ERROR] {e}")
 
-    def process_signal(self, signal: dict):
+    async def refresh_chains(self):
+        while True:
+            await self.ib_interface.refresh_option_chains_async()
+            await asyncio.sleep(CHAIN_REFRESH_CHECK_INTERVAL)
+
+    async def report_pacing(self):
+        reported = 0
+        while True:
+            await asyncio.sleep(PACER_REPORT_INTERVAL)
+            metrics = self.ib_interface.pacer.metrics()
+            waited = sum(lane['waited'] for lane in metrics['lanes'].values()) + metrics['debt_events']
+            if waited > reported:
+                reported = waited
+                logging.info(f'[PACER] IB requests are being paced: {metrics}')
+
+    def notify(self, text: str):
+        """
+        Send a Telegram message in the background, so order handling never waits on it.
+        """
+        try:
+            task = asyncio.get_running_loop().create_task(send_telegram_message_async(text))
+        except RuntimeError:
+            send_telegram_message(text)
+            return
+        self.notifications.add(task)
+        task.add_done_callback(self.notifications.discard)
+
+    def on_gateway_message(self, message: dict):
+        self.message_queue.put_nowait(stamp_received(message))
+
+    async def next_messages_async(self) -> list:
+        """
+        Next batch of candidate messages, newest first (same order as the REST endpoint).
+        Drains the gateway push queue while the gateway session is live, otherwise falls back to
+        REST polling. One catch-up poll is made every time the gateway (re)connects.
+        """
+        if self.gateway is None or not self.gateway.connected:
+            if self.gateway_live:
+                logging.warning(f'Discord gateway down, falling back to polling')
+            self.gateway_live = False
+            return await self.poll_messages_async()
+
+        if not self.gateway_live:
+            self.gateway_live = True
+            logging.info(f'Discord gateway live, switching to push ingestion')
+            return await self.poll_messages_async()
+
+        try:
+            messages = [await asyncio.wait_for(self.message_queue.get(), config.SLEEP_DELAY_BETWEEN_POLLS)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.message_queue.empty():
+            messages.append(self.message_queue.get_nowait())
+        return sorted(messages, key=lambda message: int(message['id']), reverse=True)
+
+    async def poll_messages_async(self) -> list:
+        """
+        Fetch only the messages newer than the cursor (paginating through any backlog), newest first.
+        The cursor never lags further behind than ALERT_EXPIRY_DURATION since older messages are dropped anyway.
+        """
+        oldest_useful = discord_interface.snowflake_from_datetime(
+            current_dt() - timedelta(seconds=config.ALERT_EXPIRY_DURATION))
+        messages = await self.dc_client.catch_up_async(config.CHANNEL_INFO['channel_id'],
+                                                       max(int(self.fetch_cursor), oldest_useful))
+        for message in messages:
+            stamp_received(message)
+        if messages:
+            self.fetch_cursor = messages[0]['id']
+        self.poll_scheduler.observe_messages(len(messages))
+        return messages
+
+    async def wait_for_next_poll(self):
+        """
+        Wait for the cadence picked by the adaptive scheduler (activity, hot windows, rate-limit budget).
+        """
+        delay = self.poll_scheduler.next_delay()
+        if self.poll_scheduler.mode != self.poll_mode:
+            self.poll_mode = self.poll_scheduler.mode
+            logging.info(f'[POLL] cadence changed: {self.poll_scheduler.metrics()}')
+        await asyncio.sleep(delay)
+
+    def parse_signal(self, signal: dict, trace: SignalTrace = None):
+        """
+        Parse and pre-filter a message, in arrival order. Returns the parsed signal to execute, or None.
+        """
         signal_id = signal['id']
+        trace = trace or SignalTrace.for_message(signal)
+        parser_state = dict(self.current_state, msg_id=signal_id)
 
         if len(signal['embeds']) != 1:
             logging.info(f'Processing new signal #{signal["id"]}. signal content: {signal["content"]}')
 
-        if config.ONE_CONTRACT_AT_A_TIME:
-            positions = self.ib_interface.get_positions()
-            positions = [position for position in positions if position.position != 0]
-            if len(positions) == 0:
-                signal = self.parser.parse_message(self, signal, state=self.current_state)
-            else:
-                signal = self.parser.parse_message(self, signal, state=self.current_state)
-                if signal != {}:
-                    logging.info(f'Skipped signal due to already open positions.ONE_CONTRACT_AT_A_TIME is enabled')
-                    return
-                else:
-                    logging.info(f'Open position closed as positions.ONE_CONTRACT_AT_A_TIME is enabled')
-                    return
-        else:
-            signal = self.parser.parse_message(self, signal, state=self.current_state)
+        signal = self.parser.parse_message(self, signal, state=parser_state)
 
-        if signal == {}:
-            return
+        trace.mark('parsed')
+        if not signal:
+            trace.finish('not a signal')
+            return None
+
+        if config.SPECULATIVE_PREFETCH:
+            self.prefetch(signal)
 
         pprint(signal)
 
         if config.USE_BRAKET_ORDER and signal['instr'] != 'BUY':
             logging.warning(f'Skipping non-buy signal #{signal["id"]} since we are strictly using '
                             f'our Own position management')
-            return
+            return None
         if config.TRAILING_STOP_ENABLED and signal['instr'] != 'BUY':
             logging.warning(f'Skipping non-buy signal #{signal["id"]} since we have TRAILING_STOP_ENABLED from config')
-            return
+            return None
 
         if signal['instr'] in ['SMALL', 'HEDGE']:
             logging.warning(f'Skipping signal #{signal["id"]} since it is a {signal["instr"]} signal')
-            return
-
-        given_month = signal['exp_month']
-        given_day = signal['exp_day']
-        current_date = date.today()
-
-        given_date = date(current_date.year, given_month, given_day)
+            return None
+
+        return signal
+
+    def prefetch(self, signal: dict):
+        """
+        Start qualifying the signal's option and warming its quote while the signal is still being
+        filtered and queued; `run_signal` discards the work if the signal is rejected on the way.
+        """
+        try:
+            expiry_date = option_expiry(signal['exp_month'], signal['exp_day'])
+            option_symbol = polygon.build_option_symbol(signal['underlying'], expiry_date, signal['p_or_c'],
+                                                        signal['strike'])
+            self.prefetcher.start(signal['id'], option_symbol, polygon.parse_option_symbol(option_symbol))
+        except Exception as _exc:
+            logging.info(f'[PREFETCH] Not prefetching signal #{signal.get("id")}: {_exc}')
+
+    def signal_key(self, signal: dict) -> str:
+        """
+        Signals sharing a key execute in arrival order; with ONE_CONTRACT_AT_A_TIME they all share one.
+        """
+        return '*' if config.ONE_CONTRACT_AT_A_TIME else signal['underlying'].upper()
+
+    async def execute_signal(self, signal: dict, trace: SignalTrace):
+        if config.ONE_CONTRACT_AT_A_TIME:
+            if self.ib_interface.portfolio.has_open_positions():
+                logging.info(f'Skipped signal due to already open positions.ONE_CONTRACT_AT_A_TIME is enabled')
+                return
 
-        if given_date < current_date:
-            year_for_option_symbol = date(current_date.year + 1, given_month, given_day).year
-        else:
-            year_for_option_symbol = current_date.year
+        expiry_date = option_expiry(signal['exp_month'], signal['exp_day'])
+        expiry = expiry_date.strftime('%Y%m%d')
+        listed, strike = self.ib_interface.option_chains.validate(signal['underlying'], expiry, signal['strike'],
+                                                                  config.OPTION_CHAIN_SNAP_DISTANCE)
+        if not listed:
+            logging.warning(f'Skipping signal #{signal["id"]} since {signal["underlying"]} {expiry} '
+                            f'{signal["strike"]} is not listed (nearest listed strike: {strike})')
+            return
+        if strike != signal['strike']:
+            logging.info(f'signal #{signal["id"]} strike {signal["strike"]} snapped to listed strike {strike}')
+            signal['strike'] = strike
 
-        option_symbol = polygon.build_option_symbol(signal['underlying'],
-                                                    date(year_for_option_symbol, signal['exp_month'],
-                                                         signal['exp_day']), signal['p_or_c'], signal['strike'])
+        option_symbol = polygon.build_option_symbol(signal['underlying'], expiry_date, signal['p_or_c'],
+                                                    signal['strike'])
         parsed_symbol = polygon.parse_option_symbol(option_symbol)
 
         if signal['underlying'] in config.RESTRICTED_SYMBOLS:
             logging.warning(f'Skipping signal #{signal["id"]} since the underlying is in restricted symbols')
             return
 
-        contract = self.ib_interface.create_contract(parsed_symbol)
+        contract = await self.prefetcher.claim(signal['id'], option_symbol) or \
+            await self.ib_interface.create_contract_async(parsed_symbol)
+        trace.mark('qualified')
         logging.info(f"[DEBUG] Created IB contract: {contract}")
-        price, contract = self.ib_interface.get_realtime_price(contract, asset_type='option',
-                                                               parsed_symbol=parsed_symbol)
+        price, contract = await self.ib_interface.get_realtime_price_async(contract)
+        if config.USE_PEG_EXECUTION:  # already loaded when the contract was prefetched
+            await self.ib_interface.ticks.load(contract)
+        trace.mark('quoted')
         logging.info(f"[DEBUG] Real-time market price for {contract.localSymbol}: {price}")
 
         if not price or price <= 0 or isnan(price):
@@ -182,7 +371,7 @@ class Main:
             return
 
         if signal['instr'] in ['TRIM', 'SELL']:
-            self.process_sell_or_trim_signal(signal, parsed_symbol)
+            self.process_sell_or_trim_signal(signal, parsed_symbol, contract)
             return
 
         qty = floor(config.PER_SIGNAL_FUNDS_ALLOCATION / (price * 100))
@@ -205,9 +394,12 @@ class Main:
 
         order = {'asset_type': 'option',
                  'parsed_symbol': parsed_symbol,
+                 'contract': contract,
                  'qty': qty,
                  'tp': round(price * (1 + config.TAKE_PROFIT_PERCENTAGE / 100), 1),
                  'sl': round(price * (1 - config.STOP_LOSS_PERCENTAGE / 100), 1)}
+        if config.USE_BRAKET_ORDER and config.BRACKET_LIMIT_ENTRY:
+            order['entry_price'] = round(price, 2)
 
         logging.info(f"[DEBUG] Submitting {'bracket' if config.USE_BRAKET_ORDER else 'market'} order: {order}")
 
@@ -215,9 +407,27 @@ class Main:
             mkt_trade = self.ib_interface.submit_bracket_order_order(order, adaptive_algo_priority)
         else:
             mkt_trade = self.ib_interface.submit_buy_market_order(order, adaptive_algo_priority)
-
-        while mkt_trade.isActive():
-            self.ib_interface.ib.waitOnUpdate()
+        trace.mark('submitted')
+
+        limit_entry = order.get('entry_price') is not None
+        if not await self.ib_interface.wait_for_fill_async(
+                mkt_trade, timeout=config.BRACKET_ENTRY_TIMEOUT_SECONDS if limit_entry else None):
+            if mkt_trade.isActive():
+                self.ib_interface.ib.cancelOrder(mkt_trade.order)  # the exit legs go with their parent
+                await self.ib_interface.wait_for_fill_async(mkt_trade, timeout=CANCEL_CONFIRM_TIMEOUT)
+            if not mkt_trade.filled():
+                trace.finish(f'order {mkt_trade.orderStatus.status}')
+                logging.warning(f'signal #{signal["id"]} order ended {mkt_trade.orderStatus.status} without a fill')
+                return
+            # a limit or pegged entry can time out partly filled, manage what was bought
+            logging.warning(f'signal #{signal["id"]} order ended {mkt_trade.orderStatus.status} with '
+                            f'{mkt_trade.filled()} of {qty} filled')
+            qty = mkt_trade.filled()
+            if config.USE_BRAKET_ORDER:  # the cancelled exits must still cover what was bought
+                mkt_trade = await self.ib_interface.replace_bracket_exits_async(mkt_trade, qty,
+                                                                                 timeout=CANCEL_CONFIRM_TIMEOUT)
+        trace.mark('filled')
+        trace.finish('filled')
 
         logging.info(f'signal #{signal["id"]} market order filled')
 
@@ -228,10 +438,9 @@ class Main:
             f"> Price: ${price:.2f}  Qty: {qty}\n"
             f"> Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
         )
-        send_telegram_message(entry_msg)
+        self.notify(entry_msg)
         # ─────────────────────────────────────────────────────────────────
 
-        self.qty_map[parsed_symbol.underlying_symbol] += qty
         self.current_state[parsed_symbol.underlying_symbol] = {
             'option_symbol': option_symbol,
             'logged_at': time.time(),
@@ -241,32 +450,24 @@ class Main:
 
         if config.TRAILING_STOP_ENABLED:
             if config.USE_ADVANCED_TRAILING:
-                self.trailing_manager.add_position(
-                    symbol=option_symbol,
-                    entry_price=price,
-                    contract=contract,
-                    order={
-                        'underlying': parsed_symbol.underlying_symbol,
-                        'exp_month': parsed_symbol.expiration_date.month,
-                        'exp_day': parsed_symbol.expiration_date.day,
-                        'strike': parsed_symbol.strike_price,
-                        'p_or_c': parsed_symbol.option_type,
-                        'qty': qty
-                    },
-                    log_prefix=f"signal #{signal['id']}"
-                )
+                self.trailing_manager.add_position(symbol=option_symbol, contract=contract, entry_price=price,
+                                                   qty=qty)
 
             else:
                 order2 = {'asset_type': 'option', 'underlying': parsed_symbol.underlying_symbol,
-                          'parsed_symbol': parsed_symbol, 'qty': qty, 'trail_percent': config.TRAILING_STOP_PERCENT}
+                          'parsed_symbol': parsed_symbol, 'contract': contract, 'qty': qty,
+                          'trail_percent': config.TRAILING_STOP_PERCENT}
                 self.ib_interface.submit_trailing_stop_order(order2)
 
-        self.ib_interface.unsub_market_data(contract)
+        if not (config.TRAILING_STOP_ENABLED and config.USE_ADVANCED_TRAILING) or config.USE_NATIVE_TRAILING:
+            # the client-side trailing manager streams this contract tick by tick, keep its line open
+            self.ib_interface.unsub_market_data(contract)
         return
 
-    def process_sell_or_trim_signal(self, signal: dict, parsed_symbol: polygon.OptionSymbol):
+    def process_sell_or_trim_signal(self, signal: dict, parsed_symbol: polygon.OptionSymbol,
+                                    contract: ib_insync.Contract):
         logging.info(f'signal #{signal["id"]} is a sell signal | symbol: {parsed_symbol}')
-        current_qty = self.qty_map[parsed_symbol.underlying_symbol]
+        current_qty = self.ib_interface.portfolio.quantity(contract.conId)  # per contract, not per underlying
 
         if not current_qty or current_qty <= 0:
             logging.warning(f'Skipping signal #{signal["id"]} since we do not have any position '
@@ -280,9 +481,8 @@ class Main:
         current_qty = current_qty if signal['instr'] == 'SELL' else floor(current_qty * config.PERCENT_TO_TRIM / 100)
 
         self.ib_interface.submit_sell_market_order({'asset_type': 'option', 'parsed_symbol': parsed_symbol,
-                                                    'qty': current_qty}, adaptive_algo_priority)
-
-        self.qty_map[parsed_symbol.underlying_symbol] -= current_qty
+                                                    'contract': contract, 'qty': current_qty},
+                                                   adaptive_algo_priority)
 
         if signal['instr'] == 'SELL':
             self.current_state[parsed_symbol.underlying_symbol] = {
@@ -308,9 +508,24 @@ def update_last_signal_log_id(log_id: int):
         json.dump({'last_log_id': int(log_id)}, _file)
 
 
+def option_expiry(exp_month: int, exp_day: int) -> date:
+    """
+    Expiry of a month/day signal: this year, or next year once the date has passed.
+    """
+    current_date = date.today()
+    given_date = date(current_date.year, exp_month, exp_day)
+    if given_date < current_date:
+        return date(current_date.year + 1, exp_month, exp_day)
+    return given_date
+
+
 def current_dt() -> datetime:
     return datetime.utcnow().replace(tzinfo=timezone.utc)
 
+
+def current_time_ms() -> int:
+    return time.time_ns() // 1_000_000
+
 # =============================================================================================== #
 
 if __name__ == '__main__':
@@ -0,0 +1,117 @@
+# =============================================================================================== #
+import logging
+import threading
+from collections import OrderedDict
+import config
+
+# =============================================================================================== #
+
+
+class MarketDataLinesExhausted(RuntimeError):
+    """
+    Every market data line is held by a consumer, so a new contract cannot be subscribed.
+    """
+
+
+class MarketDataManager:
+    """
+    One streaming subscription per contract (by conId), shared by every consumer.
+    - `acquire` hands out the live Ticker and takes a reference, `release` drops it; the subscription
+      keeps streaming after the last release so repeat lookups read the latest quote without a request.
+    - Unreferenced subscriptions are cancelled least recently used first once `max_lines - reserve`
+      lines are in use.
+    - `discard` cancels an unreferenced subscription and is a no-op for unknown/cancelled contracts.
+    """
+
+    def __init__(self, ib, max_lines: int = 100, reserve: int = 10, generic_ticks: str = '233'):
+        self.ib = ib
+        self.max_lines = max_lines
+        self.reserve = reserve
+        self.generic_ticks = generic_ticks
+        self.subscriptions = OrderedDict()  # conId -> {'contract', 'ticker', 'refs'}
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_config(cls, ib):
+        return cls(ib, max_lines=config.MARKET_DATA_LINES, reserve=config.MARKET_DATA_LINE_RESERVE)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def acquire(self, contract):
+        """
+        Shared streaming Ticker for a qualified `contract`; pair every call with `release`.
+        """
+        with self.lock:
+            entry = self.subscriptions.get(contract.conId)
+            if entry is not None:
+                self.subscriptions.move_to_end(contract.conId)
+                entry['refs'] += 1
+                self.reuses += 1
+                return entry['ticker']
+
+            self._make_room()
+            ticker = self.ib.reqMktData(contract, self.generic_ticks, False, False)
+            self.subscriptions[contract.conId] = {'contract': contract, 'ticker': ticker, 'refs': 1}
+            self.requests += 1
+            return ticker
+
+    def release(self, contract):
+        with self.lock:
+            entry = self.subscriptions.get(contract.conId)
+            if entry is not None and entry['refs'] > 0:
+                entry['refs'] -= 1
+
+    def ticker(self, contract):
+        """
+        Latest Ticker of a subscribed contract (no IB request, no reference taken), else None.
+        """
+        entry = self.subscriptions.get(contract.conId)
+        return entry['ticker'] if entry is not None else None
+
+    def discard(self, contract) -> bool:
+        """
+        Cancel the subscription of `contract` unless a consumer still holds it. Returns whether a
+        subscription was cancelled.
+        """
+        with self.lock:
+            entry = self.subscriptions.get(contract.conId)
+            if entry is None or entry['refs'] > 0:
+                return False
+            del self.subscriptions[contract.conId]
+            self._cancel(entry)
+            return True
+
+    def metrics(self) -> dict:
+        return {
+            'lines': len(self.subscriptions),
+            'held': sum(1 for entry in self.subscriptions.values() if entry['refs'] > 0),
+            'requests': self.requests,
+            'reuses': self.reuses,
+            'evictions': self.evictions,
+        }
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def _make_room(self):
+        limit = max(self.max_lines - self.reserve, 1)
+        if len(self.subscriptions) < limit:
+            return
+        for con_id, entry in list(self.subscriptions.items()):
+            if entry['refs'] == 0:
+                del self.subscriptions[con_id]
+                self._cancel(entry)
+                self.evictions += 1
+                if len(self.subscriptions) < limit:
+                    return
+        raise MarketDataLinesExhausted(f'all {len(self.subscriptions)} market data lines are in use')
+
+    def _cancel(self, entry: dict):
+        try:
+            self.ib.cancelMktData(entry['contract'])
+        except Exception as _exc:
+            logging.warning(f'[MKT DATA] Could not cancel {entry["contract"].localSymbol}: {_exc}')
+
+# =============================================================================================== #
@@ -5,59 +5,55 @@ import utils
 import polygon
 import re
 import config
-from ib_insync import  Contract, Order
+import signal_classifier
+import signal_grammar
 
 # =============================================================================================== #
 
 def close_positions(self):
-        # Request open positions
-        positions = self.ib_interface.get_positions()
-        if len(positions) == 0:
-            print("no positions are available before close all oisition fun call")
-        # Process and close positions
-        for position in positions:
-            if position.position != 0:
-                print("********position*********",position)
-                print(f"*************Position: {position.contract.symbol}, Quantity: {position.position}, Avg Cost: {position.avgCost}, exchange: {position.contract.exchange}, secType: {position.contract.secType}")
-                order = Order()
-                order.action = "SELL" if position.position > 0 else "BUY"
-                order.orderType = "MKT"  # Market order
-                order.totalQuantity = abs(position.position)
-                if position.contract.secType == 'OPT':
-                    print("======== req contract details ===========")
-                    contract_details = self.ib_interface.get_ContractDetails(position.contract)
-                    print("contract_details**********",contract_details)
-                    if contract_details:
-                        contract_exchange = contract_details[0].contract.exchange
-                        print("Exchange from contract_details:", contract_exchange)
-                        print("======== req contract details end ===========")
-                        contract = Contract(
-                            symbol=position.contract.symbol,
-                            secType=position.contract.secType,
-                            exchange=contract_exchange,
-                            currency=position.contract.currency,
-                            lastTradeDateOrContractMonth=position.contract.lastTradeDateOrContractMonth,
-                            right=position.contract.right,
-                            strike=position.contract.strike
-                        )
-                    else:
-                        print("Contract details not available.")
-                        continue
-                else:
-                    contract = Contract(symbol=position.contract.symbol, secType=position.contract.secType,
-                                    exchange="SMART", primaryExchange=position.contract.exchange, currency=position.contract.currency)
-                try:
-                    self.ib_interface.sleepForMinute()
-                    self.ib_interface.place_order_to_close_all(contract, order)
-                    self.ib_interface.sleepForMinute()
-                    # time.sleep(5)
-                    print("Order placed successfully to close position.")
-                except Exception as e:
-                    print("Order placement failed to close position:", str(e))
+    """
+    Close every open position of the owner at once through its flatten engine (batched contract
+    resolution, all orders submitted together, fills tracked in the background).
+    """
+    self.flatten_engine.start()
 
 class CommonParser:
+    """
+    Parses free-form option alerts with the single-pass grammar in signal_grammar; messages without
+    any strike/right token are dropped first by signal_classifier (returns None).
+    `parse_message` is called as parser.parse_message(owner, msg, state) and reads the keyword lists
+    (BUY_SIGNALS, SELL_SIGNALS, TRIM_SIGNALS, REJECT_SIGNALS, FORMAT_12_BUY) from `owner`.
+    """
     def __init__(self):
-       pass
+        self.BUY_SIGNALS = config.BUY_SIGNALS
+        self.SELL_SIGNALS = config.SELL_SIGNALS
+        self.TRIM_SIGNALS = config.TRIM_SIGNALS
+        self.REJECT_SIGNALS = config.REJECT_SIGNALS
+        self.FORMAT_12_BUY = config.FORMAT_12_BUY
+
+    @staticmethod
+    def parse_message(self, msg: dict, state: dict = None) -> dict:
+        msgg = signal_grammar.message_text(msg)
+        vocab = signal_grammar.vocabulary(self)
+        if vocab.reject.contains(msgg):
+            logging.warning("skipping signal due to reject word")
+            return
+        if config.ONE_CONTRACT_AT_A_TIME and vocab.exits.contains(msgg.lower()):
+            logging.warning("close all position called>>>>>>>>>>>>")
+            close_positions(self)
+            return {}
+        if config.SIGNAL_PREFILTER_ENABLED and not signal_classifier.could_be_signal(msgg):
+            return
+        if signal_grammar.is_template(msgg):
+            return signal_grammar.parse_template(msgg, vocab, state['msg_id'])
+        return signal_grammar.parse_general(msgg, vocab, state['msg_id'], self.FORMAT_12_BUY)
+
+
+class LegacyCommonParser(CommonParser):
+    """
+    The original multi-pass heuristic parser, kept as the reference implementation for the grammar
+    parity tests and the parser benchmark. Select it with CHANNEL_INFO['parser'] = 'LegacyCommonParser'.
+    """
 
     @staticmethod
     def parse_message(self,msg: dict, state: dict = None) -> dict:
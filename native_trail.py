@@ -0,0 +1,35 @@
+# =============================================================================================== #
+from datetime import datetime, timedelta, timezone
+from ib_insync import Order, TimeCondition
+
+# =============================================================================================== #
+
+
+def build_native_trail(qty: float, entry_price: float, breakeven_pct: float, pullback_pct: float,
+                       timeout_minutes: float, oca_group: str, initial_stop_pct: float = 100.0, tick: float = 0.01,
+                       now: datetime = None, account: str = None) -> tuple:
+    """
+    (stop, timeout_exit) SELL orders that make IB enforce the adaptive trailing policy on its servers:
+    - the stop rests `initial_stop_pct` below `entry_price` (at one tick with 100, i.e. no stop before
+      breakeven, as the client-side rules); once the price reaches `breakeven_pct` above entry IB turns it
+      into a trail of `pullback_pct` percent,
+    - the timeout exit is a market order conditioned on `timeout_minutes` from `now`.
+    Both are in the OCA group `oca_group`, so whichever fills first cancels the other.
+    """
+    now = now or datetime.now(timezone.utc)
+    trigger = round(entry_price * (1 + breakeven_pct / 100), 2)
+    stop = Order(action='SELL', totalQuantity=qty, orderType='STP', tif='DAY',
+                 auxPrice=max(tick, round(entry_price * (1 - initial_stop_pct / 100), 2)),
+                 triggerPrice=trigger, adjustedOrderType='TRAIL',
+                 adjustedStopPrice=round(trigger * (1 - pullback_pct / 100), 2),
+                 adjustedTrailingAmount=pullback_pct, adjustableTrailingUnit=1,  # trailing unit: percent
+                 account=account or '')
+    exit_at = now.astimezone(timezone.utc) + timedelta(minutes=timeout_minutes)
+    timeout_exit = Order(action='SELL', totalQuantity=qty, orderType='MKT', tif='DAY',
+                         conditions=[TimeCondition(isMore=True, time=exit_at.strftime('%Y%m%d-%H:%M:%S'))],
+                         account=account or '')
+    for order in (stop, timeout_exit):
+        order.ocaGroup, order.ocaType = oca_group, 1
+    return stop, timeout_exit
+
+# =============================================================================================== #
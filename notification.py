@@ -1,7 +1,27 @@
 import logging
-import requests
+import httpx
+import http_transport
 from config import TELEGRAM_ENABLED, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
+def _telegram_url() -> str:
+    return f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+
+
+def _telegram_payload(text: str) -> dict:
+    return {
+        "chat_id": TELEGRAM_CHAT_ID,
+        "text": text,
+        "parse_mode": "Markdown"
+    }
+
+
+def _log_telegram_error(e: Exception):
+    if isinstance(e, httpx.HTTPStatusError):
+        logging.error(f"[Telegram] HTTP error: {e.response.status_code} – {e.response.text}")
+    else:
+        logging.error(f"[Telegram] Send failed: {e}")
+
+
 def send_telegram_message(text: str):
     """
     Send a text message via Telegram bot.
@@ -10,17 +30,24 @@ def send_telegram_message(text: str):
     if not TELEGRAM_ENABLED or not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
         return
 
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
-        "text": text,
-        "parse_mode": "Markdown"
-    }
     try:
-        resp = requests.post(url, data=payload, timeout=5)
+        resp = http_transport.get_client().post(_telegram_url(), data=_telegram_payload(text))
         resp.raise_for_status()
         logging.debug(f"[Telegram] Message sent successfully.")
-    except requests.RequestException as e:
-        logging.error(f"[Telegram] HTTP error: {e.response.status_code} – {e.response.text}")
     except Exception as e:
-        logging.error(f"[Telegram] Send failed: {e}")
+        _log_telegram_error(e)
+
+
+async def send_telegram_message_async(text: str):
+    """
+    Async variant of `send_telegram_message` on the shared async client.
+    """
+    if not TELEGRAM_ENABLED or not TELEGRAM_BOT_TOKEN or not TELEGRAM_CHAT_ID:
+        return
+
+    try:
+        resp = await http_transport.get_async_client().post(_telegram_url(), data=_telegram_payload(text))
+        resp.raise_for_status()
+        logging.debug(f"[Telegram] Message sent successfully.")
+    except Exception as e:
+        _log_telegram_error(e)
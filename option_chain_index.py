@@ -0,0 +1,169 @@
+# =============================================================================================== #
+import asyncio
+import copy
+import logging
+import time
+from bisect import bisect_left
+from datetime import date
+from ib_insync import Index, Option, Stock
+import config
+
+# =============================================================================================== #
+
+
+class OptionChainIndex:
+    """
+    Local copy of the option chains of a watchlist, so contracts resolve and signals validate without
+    a network call.
+    - `refresh` pulls the listed expirations (reqSecDefOptParams) and, for the nearest `expiries` of
+      them, every listed contract with its conId (reqContractDetails).
+    - Expirations and the strikes of each expiration are kept sorted for bisect lookups.
+    - `watchlist` holds (symbol, underlying secType, tradingClass) tuples, e.g. ('SPX', 'IND', 'SPXW').
+    """
+
+    def __init__(self, watchlist=(), expiries: int = 3, refresh_interval: float = 3600,
+                 clock=time.monotonic, today=date.today):
+        self.watchlist = list(watchlist)
+        self.expiries = expiries
+        self.refresh_interval = refresh_interval
+        self.clock = clock
+        self.today = today
+        self.chains = {}  # symbol -> {'trading_class', 'expirations': [..], 'strikes': {exp: [..]}, 'contracts': {..}}
+        self.refreshed_at = None
+
+    @classmethod
+    def from_config(cls):
+        return cls(watchlist=config.OPTION_CHAIN_WATCHLIST, expiries=config.OPTION_CHAIN_EXPIRIES,
+                   refresh_interval=config.OPTION_CHAIN_REFRESH_MINUTES * 60)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def refresh_due(self) -> bool:
+        return bool(self.watchlist) and (self.refreshed_at is None or
+                                         self.clock() - self.refreshed_at >= self.refresh_interval)
+
+    def refresh(self, ib):
+        """
+        Re-download the chains of the watchlist; an underlying that fails keeps its previous chain.
+        """
+        self.refreshed_at = self.clock()
+        for symbol, sec_type, trading_class in self.watchlist:
+            try:
+                self._store(symbol, self.fetch_chain(ib, symbol, sec_type, trading_class))
+            except Exception as _exc:
+                logging.warning(f'[CHAIN] Could not refresh the {symbol} option chain: {_exc}')
+
+    async def refresh_async(self, ib):
+        """
+        Async variant of `refresh`.
+        """
+        self.refreshed_at = self.clock()
+        for symbol, sec_type, trading_class in self.watchlist:
+            try:
+                self._store(symbol, await self.fetch_chain_async(ib, symbol, sec_type, trading_class))
+            except Exception as _exc:
+                logging.warning(f'[CHAIN] Could not refresh the {symbol} option chain: {_exc}')
+
+    def fetch_chain(self, ib, symbol: str, sec_type: str, trading_class: str) -> dict:
+        underlying = self._underlying(symbol, sec_type)
+        ib.qualifyContracts(underlying)
+        expirations = self._expirations(ib.reqSecDefOptParams(symbol, '', sec_type, underlying.conId), trading_class)
+        details = {}
+        for expiry in expirations:
+            try:
+                details[expiry] = ib.reqContractDetails(self._option(symbol, expiry, trading_class))
+            except Exception as _exc:
+                details[expiry] = _exc
+        return self._chain(trading_class, details)
+
+    async def fetch_chain_async(self, ib, symbol: str, sec_type: str, trading_class: str) -> dict:
+        """
+        Async variant of `fetch_chain`; the contract details of all expirations are requested concurrently.
+        """
+        underlying = self._underlying(symbol, sec_type)
+        await ib.qualifyContractsAsync(underlying)
+        params = await ib.reqSecDefOptParamsAsync(symbol, '', sec_type, underlying.conId)
+        expirations = self._expirations(params, trading_class)
+        replies = await asyncio.gather(*(ib.reqContractDetailsAsync(self._option(symbol, expiry, trading_class))
+                                         for expiry in expirations), return_exceptions=True)
+        return self._chain(trading_class, dict(zip(expirations, replies)))
+
+    @staticmethod
+    def _underlying(symbol: str, sec_type: str):
+        return Index(symbol, 'CBOE', 'USD') if sec_type == 'IND' else Stock(symbol, 'SMART', 'USD')
+
+    @staticmethod
+    def _option(symbol: str, expiry: str, trading_class: str):
+        return Option(symbol, expiry, exchange='SMART', currency='USD', tradingClass=trading_class)
+
+    def _expirations(self, params, trading_class: str) -> list:
+        params = [chain for chain in params if chain.exchange == 'SMART' and chain.tradingClass == trading_class]
+        if not params:
+            raise LookupError(f'no SMART chain with tradingClass {trading_class}')
+        today = self.today().strftime('%Y%m%d')
+        return sorted(expiry for expiry in params[0].expirations if expiry >= today)[:self.expiries]
+
+    @staticmethod
+    def _chain(trading_class: str, details_by_expiry: dict) -> dict:
+        """
+        Chain of the listed expirations; one whose contract details failed or came back empty gets no
+        strikes, so `validate` lets its signals through to normal qualification.
+        """
+        strikes, contracts = {}, {}
+        for expiry, details in details_by_expiry.items():
+            if isinstance(details, Exception) or not details:
+                logging.warning(f'[CHAIN] No {trading_class} contracts loaded for {expiry}: {details or "empty reply"}')
+                continue
+            for detail in details:
+                contract = detail.contract
+                contracts[(expiry, float(contract.strike), contract.right)] = contract
+            strikes[expiry] = sorted({float(detail.contract.strike) for detail in details})
+        return {'trading_class': trading_class, 'expirations': sorted(details_by_expiry), 'strikes': strikes,
+                'contracts': contracts}
+
+    def _store(self, symbol: str, chain: dict):
+        self.chains[symbol] = chain
+        logging.info(f'[CHAIN] {symbol}/{chain["trading_class"]}: {len(chain["contracts"])} contracts over '
+                     f'{", ".join(chain["strikes"])}')
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def resolve(self, key: tuple):
+        """
+        A copy of the listed contract for a contract_key tuple, or None when the index does not have it.
+        """
+        symbol, expiry, strike, right, trading_class = key
+        chain = self.chains.get(symbol)
+        if chain is None or (trading_class and trading_class != chain['trading_class']):
+            return None
+        contract = chain['contracts'].get((expiry, strike, right))
+        return copy.copy(contract) if contract is not None else None
+
+    def nearest_strike(self, symbol: str, expiry: str, strike: float):
+        strikes = self.chains[symbol.upper()]['strikes'].get(expiry) or []
+        if not strikes:
+            return None
+        i = bisect_left(strikes, strike)
+        candidates = strikes[max(i - 1, 0):i + 1]
+        return min(candidates, key=lambda listed: abs(listed - strike))
+
+    def validate(self, symbol: str, expiry: str, strike: float, snap_distance: float = 0.0) -> tuple:
+        """
+        (ok, strike) for a parsed signal. Listed strikes pass unchanged, unlisted ones snap to the nearest
+        listed strike when it is within `snap_distance`, otherwise they fail. Expirations of a watched
+        underlying that are not listed fail; anything the index does not cover (including a listed expiration
+        whose strikes did not load) passes unchecked.
+        """
+        chain = self.chains.get(symbol.upper())
+        if chain is None:
+            return True, strike
+        if expiry not in chain['strikes']:
+            covered = expiry not in chain['expirations'] and chain['expirations'] and \
+                expiry <= chain['expirations'][-1]
+            return not covered, strike
+        nearest = self.nearest_strike(symbol, expiry, strike)
+        if nearest is not None and abs(nearest - strike) <= snap_distance:
+            return True, nearest
+        return False, nearest
+
+# =============================================================================================== #
@@ -0,0 +1,165 @@
+# =============================================================================================== #
+import asyncio
+import logging
+import time
+from math import isnan
+from ib_insync import LimitOrder
+import config
+
+# =============================================================================================== #
+
+
+class PegExecutor:
+    """
+    Marketable-limit execution instead of market orders on wide option spreads.
+    - The order goes out as a limit at the mid of the arrival quote.
+    - Every `step_seconds` it is moved `1 / steps` of the way from the current mid toward the far touch,
+      then rests at the far touch, but never further than `max_slippage_percent` from the arrival mid.
+    - After `timeout` seconds it is cancelled (a partial fill stays as is).
+    - Each execution is reported with its fill latency and the price improvement against the arrival
+      far touch (what a market order would have paid) and mid.
+    Limit prices are put on the contract's own price grid (`ib_interface.ticks`, see tick_rules.py).
+    """
+
+    def __init__(self, ib_interface, step_seconds: float = 0.25, steps: int = 4, max_slippage_percent: float = 5.0,
+                 timeout: float = 5.0, clock=time.monotonic):
+        self.ib_interface = ib_interface
+        self.step_seconds = step_seconds
+        self.steps = steps
+        self.max_slippage_percent = max_slippage_percent
+        self.timeout = timeout
+        self.clock = clock
+        self.walks = {}  # orderId -> task returning the execution report
+        self.reports = []
+
+    @classmethod
+    def from_config(cls, ib_interface):
+        return cls(ib_interface, step_seconds=config.PEG_STEP_SECONDS, steps=config.PEG_STEPS,
+                   max_slippage_percent=config.PEG_MAX_SLIPPAGE_PERCENT, timeout=config.PEG_TIMEOUT_SECONDS)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def submit(self, contract, action: str, qty: float):
+        """
+        Place a limit at the mid of the streaming quote of `contract` and walk it in the background.
+        Returns the Trade, or None when there is no two-sided quote (or no running event loop) to peg
+        to; the caller then sends a market order.
+        """
+        ticker = self.ib_interface.latest_ticker(contract)
+        arrival = _two_sided(ticker)
+        if arrival is None:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+        bid, ask = arrival
+        mid = (bid + ask) / 2
+        cap = mid * (1 + self.max_slippage_percent / 100) if action == 'BUY' else \
+            mid * (1 - self.max_slippage_percent / 100)
+        order = LimitOrder(action, qty, self.limit_price(contract, action, mid, mid, cap))
+        if self.ib_interface.account_number:
+            order.account = self.ib_interface.account_number
+        started = self.clock()
+        trade = self.ib_interface.ib.placeOrder(contract, order)
+        logging.info(f'[PEG] {action} {qty} {contract.localSymbol} at {order.lmtPrice} (bid {bid} / ask {ask})')
+        self.walks[order.orderId] = loop.create_task(self.walk(trade, bid, ask, cap, started))
+        return trade
+
+    async def report(self, trade) -> dict:
+        """
+        Execution report of a trade placed by `submit`, once its walk is over.
+        """
+        return await self.walks[trade.order.orderId]
+
+    async def walk(self, trade, bid: float, ask: float, cap: float, started: float) -> dict:
+        contract, order = trade.contract, trade.order
+        step = reprices = 0
+        filled_at = None
+        try:
+            while trade.isActive():
+                remaining = started + self.timeout - self.clock()
+                if remaining <= 0:
+                    logging.info(f'[PEG] {contract.localSymbol}: unfilled after {self.timeout}s at {order.lmtPrice}, '
+                                 f'cancelling')
+                    self.ib_interface.ib.cancelOrder(order)
+                    await self.ib_interface.wait_for_fill_async(trade, timeout=self.step_seconds)
+                    break
+                if await self.ib_interface.wait_for_fill_async(trade, timeout=min(self.step_seconds, remaining)):
+                    break
+                if not trade.isActive() or self.clock() - started >= self.timeout:
+                    continue
+                step = min(step + 1, self.steps)
+                quote = _two_sided(self.ib_interface.latest_ticker(contract))
+                if quote is None:  # no fresh quote, keep the current price
+                    continue
+                price = self.limit_price(contract, order.action, (quote[0] + quote[1]) / 2,
+                                         quote[1] if order.action == 'BUY' else quote[0], cap, step)
+                if price != order.lmtPrice:
+                    order.lmtPrice = price
+                    self.ib_interface.ib.placeOrder(contract, order)
+                    reprices += 1
+            if trade.filled():
+                filled_at = self.clock()
+        finally:
+            self.walks.pop(order.orderId, None)
+
+        return self.record(trade, bid, ask, reprices, None if filled_at is None else filled_at - started)
+
+    def limit_price(self, contract, action: str, mid: float, far: float, cap: float, step: int = 0) -> float:
+        """
+        `step / steps` of the way from `mid` to `far`, on the tick grid of `contract` (rounded toward the
+        passive side), within `cap`.
+        """
+        price = mid + (far - mid) * min(step, self.steps) / self.steps
+        ticks = self.ib_interface.ticks
+        if action == 'BUY':
+            return min(ticks.round(contract, price, 'down'), ticks.round(contract, cap, 'down'))
+        return max(ticks.round(contract, price, 'up'), ticks.round(contract, cap, 'up'))
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def record(self, trade, bid: float, ask: float, reprices: int, latency) -> dict:
+        action, filled = trade.order.action, trade.filled()
+        mid = (bid + ask) / 2
+        report = {'symbol': trade.contract.localSymbol, 'action': action, 'qty': trade.order.totalQuantity,
+                  'filled': filled, 'status': trade.orderStatus.status, 'arrival_bid': bid, 'arrival_ask': ask,
+                  'avg_price': None, 'latency': latency, 'reprices': reprices,
+                  'improvement': None, 'improvement_vs_mid': None}
+        if filled:
+            avg_price = sum(fill.execution.shares * fill.execution.price for fill in trade.fills) / \
+                sum(fill.execution.shares for fill in trade.fills)
+            sign = 1 if action == 'BUY' else -1
+            report.update(avg_price=avg_price, improvement=sign * ((ask if action == 'BUY' else bid) - avg_price),
+                          improvement_vs_mid=sign * (mid - avg_price))
+            logging.info(f'[PEG] {report["symbol"]}: {action} {filled}/{report["qty"]} at {avg_price:.2f} in '
+                         f'{latency * 1000:.0f} ms after {reprices} reprices | improvement vs touch '
+                         f'{report["improvement"]:+.2f}, vs mid {report["improvement_vs_mid"]:+.2f}')
+        else:
+            logging.warning(f'[PEG] {report["symbol"]}: {action} {report["qty"]} not filled '
+                            f'({report["status"]}) after {reprices} reprices')
+        self.reports.append(report)
+        return report
+
+    def metrics(self) -> dict:
+        filled = [report for report in self.reports if report['filled']]
+        return {'orders': len(self.reports), 'filled': len(filled), 'working': len(self.walks),
+                'mean_latency_ms': 1000 * sum(report['latency'] for report in filled) / len(filled) if filled else 0.0,
+                'mean_improvement': sum(report['improvement'] for report in filled) / len(filled) if filled else 0.0}
+
+# =============================================================================================== #
+
+
+def _two_sided(ticker) -> tuple:
+    """
+    (bid, ask) of `ticker` when it has a valid two-sided quote, else None.
+    """
+    if ticker is None:
+        return None
+    bid, ask = ticker.bid, ticker.ask
+    if bid is None or ask is None or isnan(bid) or isnan(ask) or bid <= 0 or ask < bid:
+        return None
+    return bid, ask
+
+# =============================================================================================== #
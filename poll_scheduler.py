@@ -0,0 +1,169 @@
+# =============================================================================================== #
+import logging
+import time
+from datetime import datetime
+import config
+
+# =============================================================================================== #
+
+MODE_THROTTLED = 'throttled'
+MODE_ACTIVE = 'active'
+MODE_HOT = 'hot'
+MODE_IDLE = 'idle'
+MODE_DORMANT = 'dormant'
+
+# =============================================================================================== #
+
+
+class AdaptivePollScheduler:
+    """
+    Decides how long to wait before the next Discord poll.
+    - Reads the bucket budget from X-RateLimit-* headers and 429 `retry_after` bodies and never
+      polls faster than the remaining budget allows until the bucket resets.
+    - Polls at `min_delay` while the channel is active or inside a hot window (e.g. market open),
+      `idle_delay` otherwise and `max_delay` once the channel has been quiet for `dormant_after` seconds.
+    """
+
+    def __init__(self, min_delay: float, idle_delay: float, max_delay: float, active_window: float,
+                 dormant_after: float, hot_windows=(), reserve: int = 1,
+                 clock=time.monotonic, wall_clock=datetime.now):
+        self.min_delay = min_delay
+        self.idle_delay = idle_delay
+        self.max_delay = max_delay
+        self.active_window = active_window
+        self.dormant_after = dormant_after
+        self.hot_windows = [(start_h * 60 + start_m, end_h * 60 + end_m)
+                            for (start_h, start_m), (end_h, end_m) in hot_windows]
+        self.reserve = reserve
+        self.clock = clock
+        self.wall_clock = wall_clock
+
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.throttled_until = None
+        self.last_request_at = None
+        self.last_message_at = None
+
+        self.requests = 0
+        self.throttled = 0
+        self.mode = MODE_IDLE
+        self.current_delay = idle_delay
+
+    @classmethod
+    def from_config(cls):
+        return cls(min_delay=config.POLL_MIN_DELAY, idle_delay=config.POLL_IDLE_DELAY,
+                   max_delay=config.POLL_MAX_DELAY, active_window=config.POLL_ACTIVE_WINDOW_SECONDS,
+                   dormant_after=config.POLL_DORMANT_AFTER_SECONDS, hot_windows=config.POLL_HOT_WINDOWS,
+                   reserve=config.POLL_RATE_LIMIT_RESERVE)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def observe_response(self, status_code: int, headers, body=None):
+        """
+        Record one Discord response: consumes budget and refreshes the bucket state.
+        """
+        now = self.clock()
+        self.requests += 1
+        self.last_request_at = now
+
+        try:
+            if headers.get('X-RateLimit-Limit') is not None:
+                self.limit = int(headers['X-RateLimit-Limit'])
+            if headers.get('X-RateLimit-Remaining') is not None:
+                self.remaining = int(headers['X-RateLimit-Remaining'])
+            if headers.get('X-RateLimit-Reset-After') is not None:
+                self.reset_at = now + float(headers['X-RateLimit-Reset-After'])
+        except (TypeError, ValueError) as _exc:
+            logging.warning(f'[POLL] Could not parse rate-limit headers: {_exc}')
+
+        if status_code == 429:
+            retry_after = None
+            if isinstance(body, dict) and body.get('retry_after') is not None:
+                retry_after = float(body['retry_after'])
+            elif headers.get('Retry-After') is not None:
+                retry_after = float(headers['Retry-After'])
+            retry_after = retry_after if retry_after is not None else self.max_delay
+            self.throttled += 1
+            self.throttled_until = now + retry_after
+            logging.warning(f'[POLL] Rate limited by Discord, retrying in {retry_after:.2f}s')
+
+    def observe_messages(self, count: int):
+        """
+        Record how many new messages the last poll returned.
+        """
+        if count > 0:
+            self.last_message_at = self.clock()
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def next_delay(self) -> float:
+        """
+        Seconds to wait from now before the next poll.
+        """
+        now = self.clock()
+        if self.throttled_until is not None and now < self.throttled_until:
+            self.mode = MODE_THROTTLED
+            self.current_delay = self.throttled_until - now
+            return self.current_delay
+
+        since_last = now - self.last_request_at if self.last_request_at is not None else float('inf')
+        if self._budget_exhausted(now):
+            self.mode = MODE_THROTTLED
+            delay = self.reset_at - now
+        else:
+            delay = max(self._cadence(now) - since_last, self._budget_spacing(now))
+
+        self.current_delay = max(delay, 0.0)
+        return self.current_delay
+
+    def _cadence(self, now: float) -> float:
+        quiet_for = now - self.last_message_at if self.last_message_at is not None else self.dormant_after
+        if quiet_for <= self.active_window:
+            self.mode = MODE_ACTIVE
+            return self.min_delay
+        if self._in_hot_window():
+            self.mode = MODE_HOT
+            return self.min_delay
+        if quiet_for <= self.dormant_after:
+            self.mode = MODE_IDLE
+            return self.idle_delay
+        self.mode = MODE_DORMANT
+        return self.max_delay
+
+    def _budget_known(self, now: float) -> bool:
+        return self.remaining is not None and self.reset_at is not None and now < self.reset_at
+
+    def _budget_exhausted(self, now: float) -> bool:
+        return self._budget_known(now) and self.remaining <= self.reserve
+
+    def _budget_spacing(self, now: float) -> float:
+        """
+        Wait from now that spreads the remaining budget evenly until the bucket resets.
+        """
+        if not self._budget_known(now):
+            return 0.0
+        return (self.reset_at - now) / (self.remaining - self.reserve)
+
+    def _in_hot_window(self) -> bool:
+        wall = self.wall_clock()
+        minute_of_day = wall.hour * 60 + wall.minute
+        return any(start <= minute_of_day < end for start, end in self.hot_windows)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def metrics(self) -> dict:
+        now = self.clock()
+        return {
+            'mode': self.mode,
+            'delay': round(self.current_delay, 3),
+            'limit': self.limit,
+            'remaining': self.remaining,
+            'reset_in': round(max(self.reset_at - now, 0.0), 3) if self.reset_at is not None else None,
+            'throttled_for': round(max(self.throttled_until - now, 0.0), 3) if self.throttled_until else 0.0,
+            'requests': self.requests,
+            'throttled': self.throttled,
+        }
+
+
+# =============================================================================================== #
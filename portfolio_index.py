@@ -0,0 +1,101 @@
+# =============================================================================================== #
+import logging
+from ib_insync import Position
+
+# =============================================================================================== #
+
+
+class PortfolioIndex:
+    """
+    Local book of open positions and working orders keyed by conId, so "do we hold this / how much"
+    is a dict lookup instead of a broker round trip.
+    - `seed` loads what the IB client already holds after connecting (positions, open trades).
+    - Executions move a position as soon as they are reported (each execId once); position updates
+      from IB are authoritative and overwrite it.
+    - Order status updates keep the working orders current; finished orders are dropped.
+    """
+
+    def __init__(self):
+        self.positions = {}  # conId -> ib_insync.Position
+        self.orders = {}  # orderId -> working ib_insync.Trade
+        self.orders_by_con_id = {}  # conId -> {orderId: trade}
+        self.executions = set()
+        self.updates = 0
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def seed(self, ib):
+        for position in ib.positions():
+            self.on_position(position)
+        for trade in ib.openTrades():
+            self.on_order_status(trade)
+        logging.info(f'[PORTFOLIO] Seeded {len(self.positions)} positions and {len(self.orders)} working orders')
+
+    def attach(self, ib):
+        ib.positionEvent += self.on_position
+        ib.execDetailsEvent += self.on_execution
+        ib.newOrderEvent += self.on_order_status
+        ib.orderStatusEvent += self.on_order_status
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def on_position(self, position: Position):
+        self.updates += 1
+        con_id = position.contract.conId
+        if position.position:
+            self.positions[con_id] = position
+        else:
+            self.positions.pop(con_id, None)
+
+    def on_execution(self, trade, fill):
+        execution = fill.execution
+        if execution.execId in self.executions:
+            return
+        self.executions.add(execution.execId)
+        self.updates += 1
+        contract = fill.contract
+        held = self.positions.get(contract.conId)
+        shares = execution.shares if execution.side == 'BOT' else -execution.shares
+        quantity = (held.position if held else 0) + shares
+        if quantity:
+            avg_cost = held.avgCost if held else execution.price * float(contract.multiplier or 1)
+            self.positions[contract.conId] = Position(execution.acctNumber, contract, quantity, avg_cost)
+        else:
+            self.positions.pop(contract.conId, None)
+
+    def on_order_status(self, trade):
+        self.updates += 1
+        order_id, con_id = trade.order.orderId, trade.contract.conId
+        if trade.isActive():
+            self.orders[order_id] = trade
+            self.orders_by_con_id.setdefault(con_id, {})[order_id] = trade
+        elif self.orders.pop(order_id, None) is not None:
+            working = self.orders_by_con_id.get(con_id, {})
+            working.pop(order_id, None)
+            if not working:
+                self.orders_by_con_id.pop(con_id, None)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def quantity(self, con_id: int) -> float:
+        position = self.positions.get(con_id)
+        return position.position if position else 0
+
+    def holds(self, con_id: int) -> bool:
+        return con_id in self.positions
+
+    def has_open_positions(self) -> bool:
+        return bool(self.positions)
+
+    def open_positions(self) -> list:
+        return list(self.positions.values())
+
+    def working_orders(self, con_id: int = None) -> list:
+        if con_id is None:
+            return list(self.orders.values())
+        return list(self.orders_by_con_id.get(con_id, {}).values())
+
+    def metrics(self) -> dict:
+        return {'positions': len(self.positions), 'working_orders': len(self.orders), 'updates': self.updates}
+
+# =============================================================================================== #
@@ -0,0 +1,163 @@
+# =============================================================================================== #
+import numpy as np
+
+# =============================================================================================== #
+
+HOLD = 0
+EXIT_TRAILING = 1
+EXIT_TIMEOUT = 2
+
+FIELDS = {'entry_price': 'entry', 'highest': 'highest', 'breakeven_hit': 'breakeven', 'qty': 'qty',
+          'start_time': 'start'}
+
+# =============================================================================================== #
+
+
+class PositionBook:
+    """
+    Trailing-stop state of every open position as parallel NumPy arrays (entry price, high-water
+    mark, breakeven flag, quantity, start time), with a symbol -> slot map. Closed slots are reused.
+    - `on_price` applies the breakeven/pullback/timeout rules to one slot (a tick), in constant time.
+    - `evaluate` applies them to every slot in one vectorized pass (a sweep).
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.slots = {}
+        self.symbols = [None] * capacity
+        self.free = list(range(capacity - 1, -1, -1))
+        self.active = np.zeros(capacity, dtype=bool)
+        self.entry = np.zeros(capacity)
+        self.highest = np.zeros(capacity)
+        self.breakeven = np.zeros(capacity, dtype=bool)
+        self.qty = np.zeros(capacity, dtype=np.int64)
+        self.start = np.zeros(capacity)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, symbol):
+        return symbol in self.slots
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def add(self, symbol: str, entry_price: float, qty: int, start_time: float) -> int:
+        if symbol in self.slots:
+            self.remove(symbol)
+        if not self.free:
+            self._grow()
+        slot = self.free.pop()
+        self.slots[symbol] = slot
+        self.symbols[slot] = symbol
+        self.active[slot] = True
+        self.entry[slot] = self.highest[slot] = entry_price
+        self.breakeven[slot] = False
+        self.qty[slot] = qty
+        self.start[slot] = start_time
+        return slot
+
+    def remove(self, symbol: str):
+        slot = self.slots.pop(symbol, None)
+        if slot is not None:
+            self.active[slot] = False
+            self.symbols[slot] = None
+            self.free.append(slot)
+
+    def get(self, symbol: str, field: str):
+        return getattr(self, FIELDS[field])[self.slots[symbol]].item()
+
+    def set(self, symbol: str, field: str, value):
+        getattr(self, FIELDS[field])[self.slots[symbol]] = value
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def on_price(self, symbol: str, price: float, now: float, breakeven_pct: float, pullback_pct: float,
+                 timeout_minutes: float, advanced: bool = True) -> int:
+        """
+        HOLD, EXIT_TRAILING or EXIT_TIMEOUT for one price of `symbol`; updates its breakeven flag and
+        high-water mark.
+        """
+        slot = self.slots[symbol]
+        if advanced:
+            if not self.breakeven[slot] and price >= self.entry[slot] * (1 + breakeven_pct / 100):
+                self.breakeven[slot] = True
+            if self.breakeven[slot]:
+                if price > self.highest[slot]:
+                    self.highest[slot] = price
+                elif price < self.highest[slot] * (1 - pullback_pct / 100):
+                    return EXIT_TRAILING
+        if (now - self.start[slot]) / 60 > timeout_minutes:
+            return EXIT_TIMEOUT
+        return HOLD
+
+    def evaluate(self, prices: np.ndarray, now: float, breakeven_pct: float, pullback_pct: float,
+                 timeout_minutes: float, advanced: bool = True) -> np.ndarray:
+        """
+        Decision (HOLD/EXIT_TRAILING/EXIT_TIMEOUT) for every slot, given one price per slot (NaN = no
+        price, the slot is left untouched). Same rules and state updates as `on_price`.
+        """
+        valid = self.active & ~np.isnan(prices)
+        decisions = np.zeros(len(prices), dtype=np.int8)
+        trailing = np.zeros(len(prices), dtype=bool)
+        if advanced:
+            self.breakeven |= valid & (prices >= self.entry * (1 + breakeven_pct / 100))
+            tracking = valid & self.breakeven
+            rising = tracking & (prices > self.highest)
+            self.highest[rising] = prices[rising]
+            trailing = tracking & ~rising & (prices < self.highest * (1 - pullback_pct / 100))
+            decisions[trailing] = EXIT_TRAILING
+        timed_out = valid & ~trailing & ((now - self.start) / 60 > timeout_minutes)
+        decisions[timed_out] = EXIT_TIMEOUT
+        return decisions
+
+    def prices_from(self, price_of) -> np.ndarray:
+        """
+        Per-slot price array filled by `price_of(symbol)` (None -> NaN).
+        """
+        prices = np.full(len(self.active), np.nan)
+        for symbol, slot in self.slots.items():
+            price = price_of(symbol)
+            if price is not None:
+                prices[slot] = price
+        return prices
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def _grow(self):
+        old = len(self.active)
+        new = old * 2
+        self.symbols.extend([None] * old)
+        self.free.extend(range(new - 1, old - 1, -1))
+        for name, fill in (('active', False), ('entry', 0.0), ('highest', 0.0), ('breakeven', False),
+                           ('qty', 0), ('start', 0.0)):
+            array = getattr(self, name)
+            grown = np.full(new, fill, dtype=array.dtype)
+            grown[:old] = array
+            setattr(self, name, grown)
+
+
+class PositionView:
+    """
+    Dict-style access to one position: numeric fields live in the book, the rest (contract, ticker,
+    handler) in a plain dict.
+    """
+
+    __slots__ = ('book', 'symbol', 'extra')
+
+    def __init__(self, book: PositionBook, symbol: str, **extra):
+        self.book = book
+        self.symbol = symbol
+        self.extra = extra
+
+    def __getitem__(self, key):
+        return self.book.get(self.symbol, key) if key in FIELDS else self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            self.book.set(self.symbol, key, value)
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return key in FIELDS or key in self.extra
+
+# =============================================================================================== #
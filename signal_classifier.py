@@ -0,0 +1,62 @@
+# =============================================================================================== #
+import re
+import time
+
+# =============================================================================================== #
+# First-stage filter in front of CommonParser. A message can only turn into a tradable signal
+# (strike resolved, right 'c' or 'p') when one of its tokens is a call/put form the grammar accepts:
+#   150C / 4.5p   150call / 40put   $150C   or a call/put word plus a number ('150 calls', '$150 p')
+# Tokens are delimited exactly as in signal_grammar, so the filter never drops a message the full
+# parser would have resolved; it only decides whether the full parse is worth running.
+# =============================================================================================== #
+
+STRIKE_RIGHT_SEARCH = re.compile(
+    r'(?<![^\s:*])(?:\$?\d+(?:\.\d+)?[cCpP]|\d+(?:\.\d+)?(?:call|put))(?![^\s:*])'  # 150C, $4.5p, 150call
+)
+RIGHT_WORD_SEARCH = re.compile(r'(?<![^\s:*])(?ai:c|calls?|p|puts?)(?![^\s:*])')       # c, calls, PUT
+# anything float() could turn into the strike of a right word, or a $150 strike
+NUMBER_SEARCH = re.compile(
+    r'(?<![^\s:*])(?:\$?[+-]?(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][+-]?\d[\d_]*)?'
+    r'|(?i:[+-]?(?:inf|infinity|nan)))(?![^\s:*])'
+)
+
+# =============================================================================================== #
+
+
+def could_be_signal(text: str) -> bool:
+    if STRIKE_RIGHT_SEARCH.search(text) is not None:
+        return True
+    return RIGHT_WORD_SEARCH.search(text) is not None and NUMBER_SEARCH.search(text) is not None
+
+
+def classification_report(labelled: list, classifier=could_be_signal) -> dict:
+    """
+    Precision/recall of `classifier` over (text, is_signal) pairs, plus its throughput.
+    """
+    tp = fp = fn = tn = 0
+    start = time.perf_counter()
+    predictions = [classifier(text) for text, _ in labelled]
+    elapsed = time.perf_counter() - start
+    for predicted, (_, is_signal) in zip(predictions, labelled):
+        if predicted and is_signal:
+            tp += 1
+        elif predicted:
+            fp += 1
+        elif is_signal:
+            fn += 1
+        else:
+            tn += 1
+    return {
+        'messages': len(labelled),
+        'true_positives': tp,
+        'false_positives': fp,
+        'false_negatives': fn,
+        'true_negatives': tn,
+        'precision': tp / (tp + fp) if tp + fp else 1.0,
+        'recall': tp / (tp + fn) if tp + fn else 1.0,
+        'passed': (tp + fp) / len(labelled) if labelled else 0.0,
+        'msgs_per_sec': len(labelled) / elapsed if elapsed > 0 else float('inf'),
+    }
+
+
+# =============================================================================================== #
@@ -0,0 +1,326 @@
+# =============================================================================================== #
+import re
+import time
+from datetime import date, datetime, timedelta
+import config
+import utils
+from keyword_matcher import KeywordMatcher
+
+# =============================================================================================== #
+# Single-pass signal grammar used by message_parsers.CommonParser.
+# The message is tokenized once with precompiled patterns, every token is classified in the same pass
+# and the signal fields are then resolved from the recorded token positions with the same precedence
+# rules as the original heuristic parser (message_parsers.LegacyCommonParser).
+# =============================================================================================== #
+
+SPLIT_RE = re.compile(r'[\s:*]+')
+STRIKE_RIGHT_RE = re.compile(r'\d+(\.\d+)?[a-zA-Z]$')         # 150C, 4.5p
+
+# searched on the space-joined token line; (?<![^ ]) / (?![^ ]) anchor a pattern to whole tokens
+WORD_STRIKE_SEARCH = re.compile(r'(?<![^ ])(\d+(?:\.\d+)?)(call|put)(?![^ ])')    # 150call, 4.5put
+STRIKE_RIGHT_SEARCH = re.compile(r'(?<![^ ])\d+(?:\.\d+)?[a-zA-Z](?![^ ])')       # 150C, 4.5p
+DOLLAR_STRIKE_RIGHT_SEARCH = re.compile(r'(?<![^ ])\$\d+(?:\.\d+)?[a-zA-Z]')      # $150C...
+DOLLAR_STRIKE_SEARCH = re.compile(r'(?<![^ ])\$\d+(?:\.\d+)?(?![^ ])')            # $150
+RIGHT_WORD_SEARCH = re.compile(r'(?<![^ ])(?ai:c|calls?|p|puts?)(?![^ ])')        # c, call, puts
+
+DROPPED_TOKENS = frozenset(('exp', 'N/A', '@'))
+TEMPLATE_DROPPED_TOKENS = frozenset(('N/A', '@'))
+CALL_WORDS = frozenset(('c', 'call', 'calls'))
+PUT_WORDS = frozenset(('p', 'put', 'puts'))
+RIGHT_WORDS = CALL_WORDS | PUT_WORDS
+
+_VOCABULARIES = {}
+_DAY_CACHE = {}
+_DAY_WINDOW = [0.0, 0.0]
+
+# =============================================================================================== #
+
+
+class SignalParseError(ValueError):
+    pass
+
+
+class Vocabulary:
+    """
+    Keyword matchers compiled once from the keyword lists of the parser owner:
+    - instructions: BUY/SELL/TRIM, looked up per lowercased token against the lists as written.
+    - reject: REJECT_SIGNALS, case-insensitive substrings.
+    - exits: config SELL/TRIM_SIGNALS as written, substrings of the lowercased message
+      (ONE_CONTRACT_AT_A_TIME close-all check).
+    """
+
+    def __init__(self, buy, sell, trim, reject, exit_sell, exit_trim):
+        self.instructions = KeywordMatcher({'BUY': buy, 'SELL': sell, 'TRIM': trim}, case_sensitive=True)
+        self.keywords = self.instructions.keywords
+        self.reject = KeywordMatcher({'REJECT': reject}, whole_word=False)
+        self.exits = KeywordMatcher({'SELL': exit_sell, 'TRIM': exit_trim}, whole_word=False, case_sensitive=True)
+
+
+def vocabulary(source) -> Vocabulary:
+    """
+    Compiled keywords for `source`, cached per keyword list objects (the lists are not expected to be
+    mutated in place).
+    """
+    lists = (source.BUY_SIGNALS, source.SELL_SIGNALS, source.TRIM_SIGNALS, source.REJECT_SIGNALS,
+             config.SELL_SIGNALS, config.TRIM_SIGNALS)
+    key = tuple(map(id, lists))
+    entry = _VOCABULARIES.get(key)
+    if entry is None:
+        # keep the lists referenced so their ids cannot be reused by other objects
+        entry = _VOCABULARIES[key] = (lists, Vocabulary(*lists))
+    return entry[1]
+
+
+def message_text(msg: dict) -> str:
+    """
+    Content, embed title and embed description joined into one string.
+    """
+    content = msg.get('content')
+    text = content if isinstance(content, str) else ''
+    embeds = msg.get('embeds')
+    if embeds:
+        try:
+            title = embeds[0]['title']
+            if isinstance(title, str):
+                text += ' ' + title
+        except Exception:
+            pass
+        try:
+            description = embeds[0]['description']
+            if isinstance(description, str):
+                text += ' ' + description
+        except Exception:
+            pass
+    return text
+
+
+def is_template(text: str) -> bool:
+    """
+    `Ticker: ... Expiration: ...` style alerts.
+    """
+    return (('ticker' in text or 'Ticker' in text or 'TICKER' in text)
+            and ('expiration' in text or 'Expiration' in text or 'EXPIRATION' in text))
+
+
+def _day_cache() -> dict:
+    """
+    Memo for date lookups that only change with the local day; flushed when the day rolls over.
+    """
+    now = time.time()
+    if not _DAY_WINDOW[0] <= now < _DAY_WINDOW[1]:
+        start = datetime.combine(date.today(), datetime.min.time())
+        _DAY_WINDOW[:] = [start.timestamp(), (start + timedelta(days=1)).timestamp()]
+        _DAY_CACHE.clear()
+    return _DAY_CACHE
+
+
+def _dte_to_date(token: str) -> str:
+    """
+    '0DTE' / '1DTE' -> 'M/D' (business days); falls back to calendar days for tokens like '2DTEs'.
+    """
+    cache = _day_cache()
+    resolved = cache.get(token)
+    if resolved is None:
+        try:
+            expiry = utils.get_business_day(int(token.replace('DTE', '').strip()))
+        except ValueError:
+            expiry = datetime.today() + timedelta(days=int(token.split('DTE')[0]))
+        resolved = cache[token] = f'{expiry.month}/{expiry.day}'
+    return resolved
+
+
+def _default_expiry(daily: bool) -> tuple:
+    """
+    (month, day) used when the alert has no date: today for daily-expiry tickers, next Friday otherwise.
+    """
+    cache = _day_cache()
+    key = (daily, config.NEXT_FRIDAY_IS_A_HOLIDAY)
+    expiry = cache.get(key)
+    if expiry is None:
+        if daily:
+            today = date.today()
+            expiry = (today.month, today.day)
+        else:
+            next_friday = utils.get_next_friday(symbol='')
+            expiry = (int(next_friday[4:6]), int(next_friday[6:8]))
+        cache[key] = expiry
+    return expiry
+
+
+# =============================================================================================== #
+
+
+def parse_template(text: str, vocab: Vocabulary, msg_id) -> dict:
+    tokens = [token for token in SPLIT_RE.split(text) if token and token not in TEMPLATE_DROPPED_TOKENS]
+
+    ticker = exp = strike = p_or_c = None
+    slash_index = None
+    first_index = {}
+    for i, token in enumerate(tokens):
+        first_index.setdefault(token, i)
+        if 'ticker' in token or 'Ticker' in token or 'TICKER' in token:
+            ticker = tokens[i + 1]
+        if slash_index is None and '/' in token:
+            exp = token.split('/')
+            slash_index = i
+        if STRIKE_RIGHT_RE.match(token):
+            p_or_c = token[-1].lower()
+            strike = round(float(token[:-1]), 2)
+
+    instr = None
+    for token in tokens:
+        category = vocab.instructions.lookup(token.lower())
+        if category is not None:
+            if slash_index is None:
+                raise SignalParseError('template keyword without an expiration date')
+            if first_index[token] < slash_index:
+                instr = category
+                break
+
+    if ticker is None or exp is None or strike is None or instr is None:
+        raise SignalParseError(f'incomplete template signal: ticker={ticker} exp={exp} strike={strike} '
+                               f'instr={instr}')
+    exp_month, exp_day = exp
+    return {'underlying': ticker, 'exp_month': int(exp_month), 'exp_day': int(exp_day),
+            'strike': strike, 'p_or_c': p_or_c, 'instr': instr, 'id': msg_id}
+
+
+def parse_general(text: str, vocab: Vocabulary, msg_id, format_12_buy: bool = False) -> dict:
+    # tokenize once; the strike forms are then located with anchored searches over the joined line
+    if ':' in text or '*' in text:
+        tokens = [token for token in SPLIT_RE.split(text) if token]
+    else:
+        tokens = text.split()  # same whitespace set as \s
+    if not DROPPED_TOKENS.isdisjoint(tokens):
+        tokens = [token for token in tokens if token not in DROPPED_TOKENS]
+    if 'DTE' in text:
+        tokens = [_dte_to_date(token) if 'DTE' in token else token for token in tokens]
+    line = ' '.join(tokens)
+    lowered = line.lower().split(' ')  # lowercasing never adds or removes spaces
+
+    ticker = ''
+    strike = ''
+    p_or_c = ''
+    order_limit = 0
+    strike_token = False  # a 150C-style token is present
+
+    # strike + right, in order of precedence
+    match = ('call' in line or 'put' in line) and WORD_STRIKE_SEARCH.search(line)
+    if match:
+        order_limit = line.count(' ', 0, match.start())
+        strike = float(match.group(1))
+        p_or_c = 'c' if match.group(2) == 'call' else 'p'
+        ticker = tokens[order_limit - 2]
+    elif match := STRIKE_RIGHT_SEARCH.search(line):
+        order_limit = line.count(' ', 0, match.start())
+        token = match.group()
+        p_or_c = token[-1].lower()
+        strike = round(float(token[:-1]), 2)
+        strike_token = True
+    elif '$' in line:
+        if match := DOLLAR_STRIKE_RIGHT_SEARCH.search(line):
+            order_limit = line.count(' ', 0, match.start())
+            token = tokens[order_limit]
+            p_or_c = token[-1].lower()
+            strike = round(float(token[1:-1]), 2)
+            tokens[order_limit] = token[1:]
+            lowered[order_limit] = lowered[order_limit][1:]
+            strike_token = True
+        elif match := DOLLAR_STRIKE_SEARCH.search(line):
+            order_limit = line.count(' ', 0, match.start())
+            token = tokens[order_limit]
+            strike = round(float(token[1:]), 2)
+            tokens[order_limit] = token[1:]
+            lowered[order_limit] = lowered[order_limit][1:]
+            previous = tokens[order_limit - 1]
+            if previous.isascii() and previous.isalpha():
+                ticker = previous
+
+    if p_or_c == '' and (match := RIGHT_WORD_SEARCH.search(line)):
+        order_limit = line.count(' ', 0, match.start())
+        p_or_c = 'c' if match.group().lower() in CALL_WORDS else 'p'
+        if strike == '':
+            strike = round(float(tokens[order_limit - 1]), 2)
+        previous = tokens[order_limit - 2]
+        if previous.isascii() and previous.isalpha():
+            ticker = previous
+
+    # instruction keyword before the strike
+    instr = ''
+    for i in range(min(order_limit, len(tokens))):
+        category = vocab.instructions.lookup(lowered[i])
+        if category is not None:
+            instr = category
+            del tokens[i], lowered[i]
+            break
+
+    if ticker == '':
+        ticker = _resolve_ticker(tokens, lowered, vocab, '$' in line, strike_token or '/' in line)
+
+    exp_month, exp_day = _default_expiry(ticker.lower() in config.DAILY_EXPIRY_SIGNALS)
+    if '/' in line:
+        for token in tokens:
+            if '/' in token:
+                splitted_date = token.split('/')
+                exp_month, exp_day = int(splitted_date[0]), int(splitted_date[1])
+                break
+
+    if instr == '':
+        if format_12_buy or (tokens and tokens[0].upper() in config.BUY_SIGNALS):
+            instr = 'BUY'
+
+    return {'underlying': ticker, 'exp_month': exp_month, 'exp_day': exp_day,
+            'strike': strike, 'p_or_c': p_or_c, 'instr': instr, 'id': msg_id}
+
+
+def _resolve_ticker(tokens: list, lowered: list, vocab: Vocabulary, has_dollar: bool, has_anchor: bool) -> str:
+    """
+    Ticker fallbacks when the strike form did not name it: $TICKER, the word before the strike or
+    date, the word after them, then the word before an instruction keyword.
+    """
+    if has_dollar:
+        for token in tokens:
+            if token[0] == '$' and token[1:].isascii() and token[1:].isalpha():
+                return token.upper()[1:]
+
+    keywords = vocab.keywords
+    ticker = ''
+    if has_anchor:
+        ticker = _ticker_around_anchor(tokens, keywords)
+        if ticker:
+            return ticker
+
+    if not keywords.isdisjoint(lowered):
+        for i, token in enumerate(tokens):
+            if lowered[i] in keywords and token not in keywords:
+                previous = tokens[i - 1]
+                if previous.isascii() and previous.isalpha():
+                    ticker = previous
+    return ticker
+
+
+def _ticker_around_anchor(tokens: list, keywords: frozenset) -> str:
+    """
+    Word before the first date (or the last strike) token, else the word after a strike or date token.
+    """
+    ticker = ''
+    previous_alpha = False
+    for i, token in enumerate(tokens):
+        if previous_alpha and token not in keywords:
+            if token[0].isdecimal() and STRIKE_RIGHT_RE.match(token):
+                ticker = tokens[i - 1]
+            if '/' in token:
+                return tokens[i - 1]
+        previous_alpha = token.isascii() and token.isalpha()
+    if ticker:
+        return ticker
+
+    for i, token in enumerate(tokens):
+        if token[0].isdecimal() and STRIKE_RIGHT_RE.match(token) or '/' in token and i != 0:
+            following = tokens[i + 1]
+            if following.isascii() and following.isalpha() and token not in keywords:
+                ticker = following
+    return ticker
+
+
+# =============================================================================================== #
@@ -0,0 +1,82 @@
+# =============================================================================================== #
+import asyncio
+import logging
+import config
+
+# =============================================================================================== #
+
+
+class SignalPipeline:
+    """
+    Runs signal executions concurrently on the event loop with bounded parallelism.
+    - At most `max_concurrency` jobs run at a time.
+    - Jobs submitted under the same key (an underlying, a contract) run one after another in submission
+      order, e.g. BUY before TRIM before SELL. A job waiting on its key does not hold a slot.
+    - A failing job does not stop the next job of its key.
+    """
+
+    def __init__(self, max_concurrency: int = 4):
+        self.max_concurrency = max_concurrency
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.tails = {}  # key -> last submitted task for that key
+        self.tasks = set()
+        self.running = 0
+        self.submitted = 0
+        self.failed = 0
+        self.peak = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(max_concurrency=config.SIGNAL_MAX_CONCURRENCY)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def submit(self, key, job) -> asyncio.Task:
+        """
+        Schedule `job()` (a coroutine function) behind the previous job of `key`.
+        """
+        previous = self.tails.get(key)
+        task = asyncio.get_running_loop().create_task(self._run(previous, job))
+        self.tails[key] = task
+        self.tasks.add(task)
+        self.submitted += 1
+        task.add_done_callback(lambda done: self._done(key, done))
+        return task
+
+    async def drain(self):
+        """
+        Wait for every submitted job to finish.
+        """
+        while self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def metrics(self) -> dict:
+        return {'in_flight': len(self.tasks), 'running': self.running, 'submitted': self.submitted,
+                'failed': self.failed, 'peak': self.peak}
+
+    # ------------------------------------------------------------------------------------------- #
+
+    async def _run(self, previous, job):
+        if previous is not None:
+            await asyncio.wait([previous])
+        async with self.slots:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            try:
+                return await job()
+            finally:
+                self.running -= 1
+
+    def _done(self, key, task: asyncio.Task):
+        self.tasks.discard(task)
+        if self.tails.get(key) is task:
+            del self.tails[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            logging.error(f'[PIPELINE] Job for {key} failed: {task.exception()}')
+
+# =============================================================================================== #
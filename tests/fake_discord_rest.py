@@ -0,0 +1,116 @@
+"""
+Local stand-in for the Discord REST `GET /channels/{id}/messages` endpoint, used by tests and benchmarks.
+Messages are kept oldest-first and served newest-first like the real API.
+"""
+import json
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeDiscordRestServer:
+    def __init__(self, certfile: str = None, keyfile: str = None, rate_limit: tuple = None):
+        self.messages = []
+        self.requests = []
+        self.rate_limit = rate_limit  # (requests, window seconds) per bucket, like Discord's X-RateLimit-*
+        self._window_start = None
+        self._window_used = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+            self.scheme = 'https'
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f'{self.scheme}://{host}:{port}/api/v9/channels/{{channel_id}}/messages?limit={{msg_limit}}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_message(self, message: dict):
+        with self._lock:
+            self.messages.append(message)
+
+    def select(self, query: dict) -> list:
+        limit = int(query.get('limit', ['50'])[0])
+        with self._lock:
+            messages = list(self.messages)
+        if 'after' in query:
+            after = int(query['after'][0])
+            page = [m for m in messages if int(m['id']) > after][:limit]
+        elif 'before' in query:
+            before = int(query['before'][0])
+            page = [m for m in messages if int(m['id']) < before][-limit:]
+        else:
+            page = messages[-limit:]
+        return list(reversed(page))
+
+    def take_budget(self):
+        """
+        Consume one request from the bucket. Returns (allowed, headers).
+        """
+        if self.rate_limit is None:
+            return True, {}
+        limit, window = self.rate_limit
+        now = time.monotonic()
+        with self._lock:
+            if self._window_start is None or now - self._window_start >= window:
+                self._window_start, self._window_used = now, 0
+            reset_after = window - (now - self._window_start)
+            allowed = self._window_used < limit
+            if allowed:
+                self._window_used += 1
+            headers = {'X-RateLimit-Limit': str(limit),
+                       'X-RateLimit-Remaining': str(limit - self._window_used),
+                       'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+                       'X-RateLimit-Bucket': 'messages'}
+        return allowed, headers
+
+    # ------------------------------------------------------------------------------------------- #
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                fake.requests.append(query)
+                allowed, headers = fake.take_budget()
+                if allowed:
+                    body = json.dumps(fake.select(query)).encode()
+                    self.send_response(200)
+                else:
+                    retry_after = float(headers['X-RateLimit-Reset-After'])
+                    body = json.dumps({'message': 'You are being rate limited.', 'retry_after': retry_after,
+                                       'global': False}).encode()
+                    self.send_response(429)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
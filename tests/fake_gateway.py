@@ -0,0 +1,93 @@
+"""
+Local stand-in for the Discord Gateway, speaking just enough of the protocol
+(HELLO / IDENTIFY / RESUME / heartbeats / dispatch / RECONNECT) for tests and benchmarks.
+"""
+import asyncio
+import json
+import uuid
+
+from websockets.asyncio.server import serve
+
+import discord_gateway as gw
+
+
+class FakeGatewayServer:
+    def __init__(self, heartbeat_interval_ms: int = 1000, ack_heartbeats: bool = True):
+        self.heartbeat_interval_ms = heartbeat_interval_ms
+        self.ack_heartbeats = ack_heartbeats
+        self.events = []          # (seq, event, data) log used to replay on RESUME
+        self.sessions = set()
+        self.connections = set()
+        self.identifies = 0
+        self.resumes = 0
+        self.heartbeats = 0
+        self._server = None
+        self.url = None
+
+    async def start(self):
+        self._server = await serve(self._handler, '127.0.0.1', 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f'ws://127.0.0.1:{port}/?v=9&encoding=json'
+        return self
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def publish(self, message: dict, event: str = 'MESSAGE_CREATE'):
+        seq = len(self.events) + 1
+        self.events.append((seq, event, message))
+        for ws in list(self.connections):
+            await self._dispatch(ws, seq, event, message)
+
+    async def drop_connections(self, code: int = 1011):
+        for ws in list(self.connections):
+            await ws.close(code)
+
+    async def request_reconnect(self):
+        for ws in list(self.connections):
+            await ws.send(json.dumps({'op': gw.OP_RECONNECT, 'd': None}))
+
+    # ------------------------------------------------------------------------------------------- #
+
+    async def _dispatch(self, ws, seq, event, data):
+        try:
+            await ws.send(json.dumps({'op': gw.OP_DISPATCH, 's': seq, 't': event, 'd': data}))
+        except Exception:
+            pass
+
+    async def _handler(self, ws):
+        await ws.send(json.dumps({'op': gw.OP_HELLO, 'd': {'heartbeat_interval': self.heartbeat_interval_ms}}))
+        ready = False
+        try:
+            async for raw in ws:
+                payload = json.loads(raw)
+                op = payload['op']
+                if op == gw.OP_HEARTBEAT:
+                    self.heartbeats += 1
+                    if self.ack_heartbeats:
+                        await ws.send(json.dumps({'op': gw.OP_HEARTBEAT_ACK, 'd': None}))
+                elif op == gw.OP_IDENTIFY and not ready:
+                    self.identifies += 1
+                    session_id = uuid.uuid4().hex
+                    self.sessions.add(session_id)
+                    await self._dispatch(ws, len(self.events), 'READY',
+                                         {'session_id': session_id, 'resume_gateway_url': self.url})
+                    self.connections.add(ws)
+                    ready = True
+                elif op == gw.OP_RESUME and not ready:
+                    if payload['d']['session_id'] not in self.sessions:
+                        await ws.send(json.dumps({'op': gw.OP_INVALID_SESSION, 'd': False}))
+                        continue
+                    self.resumes += 1
+                    for seq, event, data in self.events:
+                        if seq > (payload['d']['seq'] or 0):
+                            await self._dispatch(ws, seq, event, data)
+                    await self._dispatch(ws, len(self.events), 'RESUMED', {})
+                    self.connections.add(ws)
+                    ready = True
+        except Exception:
+            pass
+        finally:
+            self.connections.discard(ws)
+            await asyncio.sleep(0)
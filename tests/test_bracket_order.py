@@ -0,0 +1,142 @@
+import asyncio
+import itertools
+
+from ib_insync import Execution, Fill, Option, OrderStatus, Trade
+
+from bracket_order import BracketTrade
+from ib_interface import IBInterface
+
+
+class DummyClient:
+    def __init__(self):
+        self.ids = itertools.count(100)
+
+    def getReqId(self):
+        return next(self.ids)
+
+
+class DummyOrderIB:
+    def __init__(self):
+        self.client = DummyClient()
+        self.placed = []
+        self.trades = {}
+        self.cancelled = []
+
+    def placeOrder(self, contract, order):
+        self.placed.append(order)
+        trade = self.trades[order.orderId] = Trade(contract, order, OrderStatus(orderId=order.orderId,
+                                                                                 status='PreSubmitted'))
+        return trade
+
+    def cancelOrder(self, order):
+        self.cancelled.append(order.orderId)
+        trade = self.trades[order.orderId]
+        asyncio.get_running_loop().call_soon(cancelled, trade)
+
+
+def cancelled(trade):
+    trade.orderStatus.status = 'Cancelled'
+    trade.statusEvent.emit(trade)
+
+
+def make_interface():
+    interface = IBInterface.__new__(IBInterface)
+    interface.ib = DummyOrderIB()
+    interface.account_number = 'DU1'
+    return interface
+
+
+def make_contract():
+    contract = Option("SPX", "20250620", 5800.0, "C", "SMART")
+    contract.conId = 1
+    contract.localSymbol = "SPXW  250620C05800000"
+    return contract
+
+
+def test_bracket_legs_go_out_as_one_group():
+    interface = make_interface()
+    bracket = interface.submit_bracket_order_order({'contract': make_contract(), 'qty': 2, 'tp': 2.3, 'sl': 1.6,
+                                                    'entry_price': 2.0})
+    entry, take_profit, stop_loss = interface.ib.placed
+    assert (entry.orderType, entry.lmtPrice, entry.orderId) == ('LMT', 2.0, 100)
+    assert [order.transmit for order in interface.ib.placed] == [False, False, True]  # one transmit, last leg
+    assert take_profit.parentId == stop_loss.parentId == 100
+    assert take_profit.ocaGroup == stop_loss.ocaGroup == 'bracket-100'
+    assert (take_profit.action, take_profit.lmtPrice, stop_loss.orderType, stop_loss.auxPrice) == \
+           ('SELL', 2.3, 'STP', 1.6)
+    assert {order.account for order in interface.ib.placed} == {'DU1'}
+
+    assert isinstance(bracket, BracketTrade) and bracket.order is entry  # waits like the entry trade
+    assert bracket.status() == {'entry': 'PreSubmitted', 'take_profit': 'PreSubmitted', 'stop_loss': 'PreSubmitted'}
+    bracket.entry.orderStatus.status = 'Filled'
+    assert bracket.protected() and not bracket.done()
+    bracket.take_profit.orderStatus.status = 'Filled'
+    bracket.stop_loss.orderStatus.status = 'Cancelled'
+    assert not bracket.protected() and bracket.done()
+
+
+def test_market_entry_by_default():
+    interface = make_interface()
+    interface.submit_bracket_order_order({'contract': make_contract(), 'qty': 1, 'tp': 2.3, 'sl': 1.6}, 'Urgent')
+    entry = interface.ib.placed[0]
+    assert entry.orderType == 'MKT' and entry.adaptivePriority == 'Urgent'
+
+
+def test_exits_are_replaced_for_a_partly_filled_entry():
+    interface = make_interface()
+    contract = make_contract()
+    bracket = interface.submit_bracket_order_order({'contract': contract, 'qty': 5, 'tp': 2.3, 'sl': 1.6,
+                                                    'entry_price': 2.0})
+    interface.ib.placed.clear()
+
+    protected = interface.resubmit_bracket_exits(bracket, 2)
+
+    take_profit, stop_loss = interface.ib.placed
+    assert protected.entry is bracket.entry and protected.take_profit.order is take_profit
+    assert (take_profit.totalQuantity, take_profit.lmtPrice, stop_loss.totalQuantity, stop_loss.auxPrice) == \
+           (2, 2.3, 2, 1.6)
+    assert take_profit.parentId == stop_loss.parentId == 0  # standalone, the entry is gone
+    assert take_profit.transmit and stop_loss.transmit
+    assert take_profit.ocaGroup == stop_loss.ocaGroup == 'bracket-100-filled'
+
+
+def partly_filled_bracket(interface):
+    bracket = interface.submit_bracket_order_order({'contract': make_contract(), 'qty': 5, 'tp': 2.3, 'sl': 1.6,
+                                                    'entry_price': 2.0})
+    bracket.entry.fills.append(Fill(bracket.contract, Execution(execId='1', shares=2, price=2.0), None, None))
+    bracket.entry.orderStatus.status = 'Cancelled'
+    interface.ib.placed.clear()
+    return bracket
+
+
+def test_still_working_exits_are_cancelled_before_new_ones_go_out():
+    interface = make_interface()
+    bracket = partly_filled_bracket(interface)  # the exits survived the parent cancel
+
+    protected = asyncio.run(interface.replace_bracket_exits_async(bracket, 2, timeout=0.5))
+
+    assert interface.ib.cancelled == [101, 102]
+    assert bracket.take_profit.orderStatus.status == bracket.stop_loss.orderStatus.status == 'Cancelled'
+    assert [order.totalQuantity for order in interface.ib.placed] == [2, 2]
+    assert protected.take_profit.order is interface.ib.placed[0]
+
+
+def test_exits_are_not_doubled_when_the_cancel_is_not_confirmed():
+    interface = make_interface()
+    bracket = partly_filled_bracket(interface)
+    interface.ib.cancelOrder = lambda order: None  # no confirmation arrives
+
+    protected = asyncio.run(interface.replace_bracket_exits_async(bracket, 2, timeout=0.05))
+
+    assert protected is bracket and interface.ib.placed == []
+
+
+def test_exits_already_working_for_the_filled_quantity_are_kept():
+    interface = make_interface()
+    bracket = partly_filled_bracket(interface)
+    for leg in (bracket.take_profit, bracket.stop_loss):
+        leg.order.totalQuantity = 2
+
+    protected = asyncio.run(interface.replace_bracket_exits_async(bracket, 2, timeout=0.05))
+
+    assert protected is bracket and interface.ib.cancelled == [] and interface.ib.placed == []
@@ -0,0 +1,80 @@
+from datetime import date
+
+from ib_insync import Option
+
+from contract_cache import ContractCache, contract_key
+from ib_interface import IBInterface
+from option_chain_index import OptionChainIndex
+
+
+class DummyIB:
+    def __init__(self):
+        self.qualify_calls = 0
+
+    def qualifyContracts(self, *contracts):
+        self.qualify_calls += 1
+        for contract in contracts:
+            contract.conId = 1000 + self.qualify_calls
+            contract.localSymbol = f"{contract.symbol} {contract.lastTradeDateOrContractMonth}{contract.right}"
+            contract.multiplier = "100"
+        return list(contracts)
+
+
+class DummySymbol:
+    def __init__(self, underlying="SPX", expiry=date(2025, 6, 20), strike=5800.0, right="C"):
+        self.underlying_symbol = underlying
+        self.expiry = expiry
+        self.strike_price = strike
+        self.call_or_put = right
+
+
+def make_interface(cache):
+    interface = IBInterface.__new__(IBInterface)
+    interface.ib = DummyIB()
+    interface.account_number = ""
+    interface.contract_cache = cache
+    interface.option_chains = OptionChainIndex()
+    return interface
+
+
+def test_repeat_lookups_skip_qualification():
+    interface = make_interface(ContractCache(today=lambda: date(2025, 6, 18)))
+    first = interface.create_contract(DummySymbol())
+    second = interface.create_contract(DummySymbol())
+    assert interface.ib.qualify_calls == 1
+    assert second.conId == first.conId and second.tradingClass == "SPXW"
+    assert second is not first  # callers get their own copy
+    interface.create_contract(DummySymbol(right="P"))
+    assert interface.contract_cache.metrics() == {'size': 2, 'hits': 1, 'misses': 2, 'hit_rate': 0.333}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ContractCache(max_entries=2, today=lambda: date(2025, 6, 18))
+    interface = make_interface(cache)
+    for strike in (5800.0, 5805.0):
+        interface.create_contract(DummySymbol(strike=strike))
+    interface.create_contract(DummySymbol(strike=5800.0))  # refresh 5800
+    interface.create_contract(DummySymbol(strike=5810.0))
+    assert [key[2] for key in cache.entries] == [5800.0, 5810.0]
+
+
+def test_restart_starts_warm_and_drops_expired(tmp_path):
+    path = str(tmp_path / "contracts.json")
+    cache = ContractCache(path=path, today=lambda: date(2025, 6, 18))
+    interface = make_interface(cache)
+    interface.create_contract(DummySymbol(expiry=date(2025, 6, 18)))
+    interface.create_contract(DummySymbol(expiry=date(2025, 6, 20)))
+
+    restarted = make_interface(ContractCache(path=path, today=lambda: date(2025, 6, 18)))
+    restarted.create_contract(DummySymbol(expiry=date(2025, 6, 20)))
+    assert restarted.ib.qualify_calls == 0
+
+    next_week = ContractCache(path=path, today=lambda: date(2025, 6, 19))
+    assert list(next_week.entries) == [("SPX", "20250620", 5800.0, "C", "SPXW")]
+
+
+def test_unqualified_contracts_are_not_cached():
+    cache = ContractCache(today=lambda: date(2025, 6, 18))
+    contract = Option("SPY", "20250620", 540.0, "C", "SMART")
+    cache.put(contract_key(contract), contract)  # qualification failed, no conId
+    assert cache.get(contract_key(contract)) is None and not cache.entries
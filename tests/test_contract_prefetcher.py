@@ -0,0 +1,54 @@
+import asyncio
+
+from contract_prefetcher import ContractPrefetcher
+from market_data_manager import MarketDataManager
+from tests.test_market_data_manager import DummyStreamIB, make_contract
+
+
+class DummyIBInterface:
+    def __init__(self):
+        self.ib = DummyStreamIB()
+        self.market_data = MarketDataManager(self.ib)
+        self.qualified = []
+
+    async def create_contract_async(self, parsed_symbol):
+        await asyncio.sleep(0.01)  # IB round trip
+        self.qualified.append(parsed_symbol)
+        return make_contract(parsed_symbol)
+
+
+def test_claimed_contract_arrives_qualified_with_a_warm_stream():
+    async def scenario():
+        interface = DummyIBInterface()
+        prefetcher = ContractPrefetcher(interface)
+        prefetcher.start('1', 'O:SPY250620C00501000', 1)
+        await asyncio.sleep(0.02)  # filters and pipeline wait
+        contract = await prefetcher.claim('1', 'O:SPY250620C00501000')
+        ticker = interface.market_data.acquire(contract)  # the quote request
+        return interface, prefetcher, contract, ticker
+
+    interface, prefetcher, contract, ticker = asyncio.run(scenario())
+    assert contract.conId == 1 and ticker.bid == 2.0
+    assert interface.ib.requested == [1]  # one subscription, opened by the prefetch
+    assert interface.market_data.subscriptions[1]['refs'] == 1
+    assert prefetcher.metrics() == {'pending': 0, 'started': 1, 'hits': 1, 'misses': 0, 'discarded': 0}
+
+
+def test_rejected_or_changed_signals_drop_the_speculative_work():
+    async def scenario():
+        interface = DummyIBInterface()
+        prefetcher = ContractPrefetcher(interface)
+        prefetcher.start('1', 'O:SPY250620C00502000', 2)
+        prefetcher.start('2', 'O:SPY250620C00503000', 3)
+        prefetcher.start('3', 'O:SPY250620C00504000', 4)
+        prefetcher.discard('1')  # rejected while still qualifying
+        await asyncio.sleep(0.02)
+        prefetcher.discard('2')  # rejected after its stream opened
+        strike_snapped = await prefetcher.claim('3', 'O:SPY250620C00505000')
+        return interface, prefetcher, strike_snapped
+
+    interface, prefetcher, strike_snapped = asyncio.run(scenario())
+    assert strike_snapped is None
+    assert interface.qualified == [3, 4]
+    assert interface.ib.cancelled == [3, 4] and not interface.market_data.subscriptions
+    assert prefetcher.metrics() == {'pending': 0, 'started': 3, 'hits': 0, 'misses': 1, 'discarded': 3}
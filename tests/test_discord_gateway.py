@@ -0,0 +1,90 @@
+import asyncio
+
+from discord_gateway import DiscordGatewayClient
+from tests.fake_gateway import FakeGatewayServer
+
+CHANNEL_ID = "1021379480503205898"
+
+
+def make_msg(msg_id, content="BTO SPX 5800C 0DTE", channel_id=CHANNEL_ID):
+    return {"id": str(msg_id), "channel_id": channel_id, "content": content, "embeds": [],
+            "timestamp": "2025-06-20T13:30:00+00:00"}
+
+
+async def wait_for(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out waiting for condition"
+        await asyncio.sleep(0.01)
+
+
+def run_scenario(scenario, **server_kwargs):
+    async def _main():
+        server = await FakeGatewayServer(**server_kwargs).start()
+        received = []
+        client = DiscordGatewayClient("token", [CHANNEL_ID], received.append, gateway_url=server.url)
+        task = asyncio.create_task(client.run())
+        try:
+            await wait_for(lambda: client.connected)
+            await scenario(server, client, received)
+        finally:
+            client.stop()
+            task.cancel()
+            await server.stop()
+
+    asyncio.run(_main())
+
+
+def test_messages_pushed_for_watched_channel_only():
+    async def scenario(server, client, received):
+        await server.publish(make_msg(1))
+        await server.publish(make_msg(2, channel_id="999"))
+        await server.publish(make_msg(3))
+        await wait_for(lambda: len(received) == 2)
+        assert [m["id"] for m in received] == ["1", "3"]
+        assert server.identifies == 1
+
+    run_scenario(scenario)
+
+
+def test_partial_message_update_is_ignored():
+    async def scenario(server, client, received):
+        await server.publish({"id": "1", "channel_id": CHANNEL_ID}, event="MESSAGE_UPDATE")
+        await server.publish(make_msg(1, content="BTO SPX 5800C 0DTE edited"), event="MESSAGE_UPDATE")
+        await wait_for(lambda: len(received) == 1)
+        assert received[0]["content"].endswith("edited")
+
+    run_scenario(scenario)
+
+
+def test_resume_replays_missed_events_after_drop():
+    async def scenario(server, client, received):
+        await server.publish(make_msg(1))
+        await wait_for(lambda: len(received) == 1)
+        await server.drop_connections()
+        await wait_for(lambda: not server.connections)
+        await server.publish(make_msg(2))
+        await wait_for(lambda: len(received) == 2)
+        assert [m["id"] for m in received] == ["1", "2"]
+        assert server.resumes == 1 and server.identifies == 1
+
+    run_scenario(scenario)
+
+
+def test_reconnect_request_resumes_session():
+    async def scenario(server, client, received):
+        await server.request_reconnect()
+        await wait_for(lambda: server.resumes == 1)
+        await server.publish(make_msg(5))
+        await wait_for(lambda: len(received) == 1)
+        assert client.reconnects >= 1
+
+    run_scenario(scenario)
+
+
+def test_missing_heartbeat_ack_forces_reconnect():
+    async def scenario(server, client, received):
+        await wait_for(lambda: server.resumes >= 1, timeout=5)
+        assert client.reconnects >= 1
+
+    run_scenario(scenario, heartbeat_interval_ms=100, ack_heartbeats=False)
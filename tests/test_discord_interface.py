@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from datetime import datetime, timezone
+
+import http_transport
+from discord_interface import (DiscordChannelClient, MAX_PAGE_SIZE, filter_new_messages, snowflake_from_datetime,
+                               snowflake_from_ms, snowflake_to_ms)
+from tests.fake_discord_rest import FakeDiscordRestServer
+
+CHANNEL_ID = "1021379480503205898"
+FIRST_ID = 1384267025815175340
+
+
+@pytest.fixture
+def server():
+    srv = FakeDiscordRestServer().start()
+    yield srv
+    srv.stop()
+
+
+def fill(server, count):
+    for i in range(count):
+        server.add_message({"id": str(FIRST_ID + i), "content": f"msg {i}", "embeds": []})
+
+
+def test_fetch_after_returns_only_newer_messages(server):
+    fill(server, 10)
+    client = DiscordChannelClient("token", base_url=server.base_url)
+    messages = client.fetch_messages_after(CHANNEL_ID, FIRST_ID + 6)
+    assert [int(m["id"]) for m in messages] == [FIRST_ID + 9, FIRST_ID + 8, FIRST_ID + 7]
+    assert server.requests[-1]["after"] == [str(FIRST_ID + 6)]
+
+
+def test_catch_up_drains_backlog_beyond_one_page(server):
+    fill(server, 2 * MAX_PAGE_SIZE + 30)
+    client = DiscordChannelClient("token", base_url=server.base_url)
+    messages = client.catch_up(CHANNEL_ID, FIRST_ID - 1)
+    ids = [int(m["id"]) for m in messages]
+    assert ids == sorted(range(FIRST_ID, FIRST_ID + 2 * MAX_PAGE_SIZE + 30), reverse=True)
+    assert len(server.requests) == 3
+
+
+def test_catch_up_steady_state_is_single_request(server):
+    fill(server, 5)
+    client = DiscordChannelClient("token", base_url=server.base_url)
+    assert client.catch_up(CHANNEL_ID, FIRST_ID + 4) == []
+    assert len(server.requests) == 1
+
+
+def test_catch_up_stops_at_page_limit(server):
+    fill(server, 3 * MAX_PAGE_SIZE)
+    client = DiscordChannelClient("token", base_url=server.base_url)
+    messages = client.catch_up(CHANNEL_ID, FIRST_ID - 1, max_pages=2)
+    assert len(messages) == 2 * MAX_PAGE_SIZE
+    assert int(messages[0]["id"]) == FIRST_ID + 2 * MAX_PAGE_SIZE - 1
+
+
+def test_async_catch_up_matches_sync(server):
+    fill(server, MAX_PAGE_SIZE + 7)
+    client = DiscordChannelClient("token", base_url=server.base_url)
+
+    async def run():
+        try:
+            return await client.catch_up_async(CHANNEL_ID, FIRST_ID + 3)
+        finally:
+            await http_transport.aclose()
+
+    assert asyncio.run(run()) == client.catch_up(CHANNEL_ID, FIRST_ID + 3)
+
+
+def test_snowflake_from_datetime_orders_with_message_ids():
+    dt = datetime(2025, 6, 17, 14, 0, tzinfo=timezone.utc)
+    cursor = snowflake_from_datetime(dt)
+    assert ((cursor >> 22) + 1420070400000) == int(dt.timestamp() * 1000)
+    assert snowflake_from_datetime(dt.replace(minute=1)) > cursor
+
+
+def make_timed(created_ms, seq=0):
+    return {"id": str(snowflake_from_ms(created_ms) + seq), "content": "", "embeds": []}
+
+
+def test_filter_new_messages_by_snowflake_age_and_cursor():
+    now_ms = 1750168800000
+    fresh = make_timed(now_ms - 10_000)
+    too_old = make_timed(now_ms - 60_000)
+    edge = make_timed(now_ms - 59_999)
+    future = make_timed(now_ms + 60_000)  # far beyond any clock skew
+    already_seen = make_timed(now_ms - 20_000)
+    newer = make_timed(now_ms - 5_000)
+    messages = [newer, future, fresh, too_old, edge, already_seen]
+
+    out = filter_new_messages(messages, already_seen["id"], now_ms, 60_000)
+    assert [m["id"] for m in out] == [fresh["id"], newer["id"]]
+
+    out = filter_new_messages(messages, 0, now_ms, 60_000)
+    assert [m["id"] for m in out] == [edge["id"], already_seen["id"], fresh["id"], newer["id"]]
+
+
+def test_filter_new_messages_tolerates_clock_skew():
+    now_ms = 1750168800000
+    ahead = make_timed(now_ms + 500)  # Discord's clock slightly ahead of ours
+    too_far = make_timed(now_ms + 6_000)
+    out = filter_new_messages([too_far, ahead], 0, now_ms, 60_000)
+    assert out == [ahead]
+    assert filter_new_messages([ahead], 0, now_ms, 60_000, max_skew_ms=0) == []
+
+
+def test_filter_new_messages_dedups_keeping_latest_copy():
+    now_ms = 1750168800000
+    original = make_timed(now_ms - 1_000)
+    edited = dict(original, content="edited")
+    out = filter_new_messages([original, edited], 0, now_ms, 60_000)
+    assert out == [edited]
+    assert snowflake_to_ms(original["id"]) == now_ms - 1_000
@@ -0,0 +1,159 @@
+import asyncio
+import itertools
+
+from ib_insync import ContractDetails, Execution, Fill, Option, OrderStatus, Position, PriceIncrement, Ticker, Trade
+
+from flatten_engine import FlattenEngine
+from ib_interface import IBInterface
+from market_data_manager import MarketDataLinesExhausted, MarketDataManager
+from portfolio_index import PortfolioIndex
+from tick_rules import TickRules
+
+
+class SimulatedBroker:
+    """
+    Quotes and fills: a limit fills when it reaches the touch, unless the contract is in `illiquid`; limits
+    of contracts in `rejecting` are rejected. Market orders always fill. Option prices tick in 0.05 below
+    3.00 and 0.10 above, like SPX.
+    """
+
+    def __init__(self, quotes, illiquid=(), rejecting=()):
+        self.quotes = quotes
+        self.illiquid = set(illiquid)
+        self.rejecting = set(rejecting)
+        self.portfolio = PortfolioIndex()
+        self.placed = []
+        self.cancelled = []
+        self.qualified = []
+        self.ids = itertools.count(1)
+        self.exec_ids = itertools.count(1)
+
+    async def qualifyContractsAsync(self, *contracts):
+        self.qualified.append([contract.conId for contract in contracts])
+        return list(contracts)
+
+    async def reqContractDetailsAsync(self, contract):
+        return [ContractDetails(contract=contract, marketRuleIds='110', validExchanges='SMART')]
+
+    async def reqMarketRuleAsync(self, rule_id):
+        return [PriceIncrement(0.0, 0.05), PriceIncrement(3.0, 0.10)]
+
+    def reqMktData(self, contract, *args):
+        bid, ask = self.quotes.get(contract.conId, (float('nan'), float('nan')))
+        return Ticker(contract=contract, bid=bid, ask=ask)
+
+    def cancelMktData(self, contract):
+        pass
+
+    def reqMarketDataType(self, market_data_type):
+        pass
+
+    def placeOrder(self, contract, order):
+        if not order.orderId:
+            order.orderId = next(self.ids)
+            self.trades[order.orderId] = Trade(contract, order, OrderStatus(orderId=order.orderId, status='Submitted'))
+        trade = self.trades[order.orderId]
+        assert trade.orderStatus.status not in OrderStatus.DoneStates  # as IB.placeOrder: no modifying done orders
+        self.placed.append((contract.conId, order.orderType, order.lmtPrice if order.orderType == 'LMT' else None))
+        bid, ask = self.quotes.get(contract.conId, (None, None))
+        touch = bid if order.action == 'SELL' else ask
+        if order.orderType == 'LMT' and contract.conId in self.rejecting:
+            asyncio.get_running_loop().call_soon(self.reject, trade)
+        elif order.orderType == 'MKT' or (contract.conId not in self.illiquid and order.lmtPrice == touch):
+            asyncio.get_running_loop().call_soon(self.fill, trade)
+        return trade
+
+    def cancelOrder(self, order):
+        trade = self.trades[order.orderId]
+        self.cancelled.append(order.orderId)
+        trade.orderStatus.status = 'Cancelled'
+        trade.statusEvent.emit(trade)
+
+    def reject(self, trade):
+        trade.orderStatus.status = 'Inactive'
+        trade.statusEvent.emit(trade)
+
+    def fill(self, trade):
+        execution = Execution(execId=str(next(self.exec_ids)), side='SLD' if trade.order.action == 'SELL' else 'BOT',
+                              shares=trade.remaining(), price=1.0)
+        fill = Fill(trade.contract, execution, None, None)
+        trade.fills.append(fill)
+        self.portfolio.on_execution(trade, fill)
+        trade.orderStatus.status = 'Filled'
+        trade.statusEvent.emit(trade)
+
+
+def make_interface(broker):
+    broker.trades = {}
+    interface = IBInterface.__new__(IBInterface)
+    interface.ib = broker
+    interface.account_number = ''
+    interface.market_data = MarketDataManager(broker)
+    interface.portfolio = broker.portfolio
+    interface.ticks = TickRules(broker)
+    return interface
+
+
+def hold(broker, con_id, qty):
+    contract = Option('SPX', '20250620', 5800.0 + con_id, 'C', '', multiplier='100')
+    contract.conId = con_id
+    contract.localSymbol = f'SPX {con_id}'
+    broker.portfolio.on_position(Position('DU1', contract, qty, 200.0))
+
+
+def test_flattens_every_position_at_once_with_reprice_and_escalation():
+    broker = SimulatedBroker(quotes={1: (1.9, 2.1), 2: (0.9, 1.1), 3: (4.0, 4.4)}, illiquid={2})
+    for con_id, qty in ((1, 3), (2, 1), (3, -2), (4, 5)):  # 4 has no quote
+        hold(broker, con_id, qty)
+    engine = FlattenEngine(make_interface(broker), reprice_after=0.1, market_after=0.2, deadline=1.0,
+                           quote_timeout=0.02)
+
+    report = asyncio.run(engine.flatten())
+
+    assert report['positions'] == 4 and report['remaining'] == 0 and report['elapsed'] < 0.5
+    assert broker.qualified == [[1, 2, 3, 4]]  # one batch
+    assert broker.placed[:4] == [(1, 'LMT', 2.0), (2, 'LMT', 1.0), (3, 'LMT', 4.2), (4, 'MKT', None)]
+    assert (1, 'LMT', 1.9) in broker.placed and (3, 'LMT', 4.4) in broker.placed  # repriced to the touch
+    assert (2, 'LMT', 0.9) in broker.placed and broker.placed[-1] == (2, 'MKT', None)  # escalated
+    assert not broker.portfolio.has_open_positions()
+
+
+def test_one_failing_position_does_not_stop_the_others(monkeypatch):
+    broker = SimulatedBroker(quotes={1: (1.9, 2.1), 2: (0.9, 1.1), 3: (4.0, 4.4)})
+    for con_id, qty in ((1, 1), (2, 1), (3, 1)):
+        hold(broker, con_id, qty)
+    interface = make_interface(broker)
+    acquire, place = interface.market_data.acquire, broker.placeOrder
+
+    def exhausted(contract):
+        if contract.conId == 2:
+            raise MarketDataLinesExhausted('all 1 market data lines are in use')
+        return acquire(contract)
+
+    def rejected(contract, order):
+        if contract.conId == 3:
+            raise ConnectionError('not connected')
+        return place(contract, order)
+
+    monkeypatch.setattr(interface.market_data, 'acquire', exhausted)
+    monkeypatch.setattr(broker, 'placeOrder', rejected)
+    engine = FlattenEngine(interface, reprice_after=0.1, market_after=0.2, deadline=1.0, quote_timeout=0.02)
+
+    report = asyncio.run(engine.flatten())
+
+    assert (1, 'LMT', 2.0) in broker.placed and (2, 'MKT', None) in broker.placed  # no quote: at market
+    assert report['remaining'] == 1 and broker.portfolio.holds(3)
+
+
+def test_limits_on_the_tick_grid_and_market_after_a_rejected_limit():
+    broker = SimulatedBroker(quotes={1: (1.95, 2.10), 2: (3.1, 3.45)}, rejecting={2})
+    for con_id, qty in ((1, 1), (2, 2)):
+        hold(broker, con_id, qty)
+    engine = FlattenEngine(make_interface(broker), reprice_after=0.1, market_after=0.2, deadline=1.0,
+                           quote_timeout=0.02)
+
+    report = asyncio.run(engine.flatten())
+
+    assert broker.placed[:2] == [(1, 'LMT', 2.0), (2, 'LMT', 3.3)]  # mids 2.025 / 3.275 on 0.05 / 0.10 grids
+    assert [placed for placed in broker.placed if placed[0] == 2] == [(2, 'LMT', 3.3), (2, 'MKT', None)]  # no modify
+    assert report['remaining'] == 0
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+from ib_pacer import LANE_CONTRACTS, LANE_HISTORICAL, LANE_MARKET_DATA, LANE_ORDERS, IBPacer, PacedIB
+
+
+class DummyIB:
+    def __init__(self):
+        self.calls = []
+        self.connectedEvent = 'event'
+
+    def placeOrder(self, contract, order):
+        self.calls.append('placeOrder')
+
+    def reqMktData(self, contract, *args):
+        self.calls.append('reqMktData')
+
+    async def qualifyContractsAsync(self, *contracts):
+        self.calls.append('qualifyContractsAsync')
+        return list(contracts)
+
+    def positions(self):
+        return []
+
+
+class WireClient:
+    def __init__(self):
+        self.sent = []
+
+    def sendMsg(self, msg):
+        self.sent.append((time.monotonic(), msg))
+
+
+class WireIB:
+    """
+    Requests write their messages to the client, as ib_insync does.
+    """
+
+    def __init__(self):
+        self.client = WireClient()
+
+    def reqMktData(self, contract, *args):
+        self.client.sendMsg(f'mktData {contract}')
+        return f'ticker {contract}'
+
+    def reqMarketDataType(self, market_data_type):
+        self.client.sendMsg(f'type {market_data_type}')
+
+    def placeOrder(self, contract, order):
+        self.client.sendMsg(f'order {contract}')
+
+
+def test_waiting_requests_are_served_by_lane_priority():
+    async def scenario():
+        pacer = IBPacer(rate=200, burst=1)
+        served = []
+
+        async def request(lane, name):
+            await pacer.acquire(lane)
+            served.append(name)
+
+        await pacer.acquire(LANE_MARKET_DATA)  # empties the bucket
+        tasks = [asyncio.create_task(request(lane, name)) for lane, name in
+                 [(LANE_HISTORICAL, 'bars'), (LANE_MARKET_DATA, 'quote 1'), (LANE_CONTRACTS, 'qualify'),
+                  (LANE_MARKET_DATA, 'quote 2')]]
+        await asyncio.sleep(0)
+        assert pacer.metrics()['queued'] == 4
+        pacer.take(LANE_ORDERS)  # an order never waits, the queue absorbs it
+        await asyncio.gather(*tasks)
+        return pacer, served
+
+    pacer, served = asyncio.run(scenario())
+    assert served == ['qualify', 'quote 1', 'quote 2', 'bars']
+    metrics = pacer.metrics()
+    assert metrics['debt_events'] == 1 and metrics['queued'] == 0
+    assert metrics['lanes']['orders'] == {'queued': 0, 'requests': 1, 'waited': 0, 'mean_wait_ms': 0.0,
+                                          'max_wait_ms': 0.0}
+    assert metrics['lanes']['market_data']['waited'] == 2
+    assert metrics['lanes']['historical']['max_wait_ms'] > metrics['lanes']['contracts']['max_wait_ms']
+
+
+def test_every_request_goes_through_the_pacer():
+    slept = []
+    pacer = IBPacer(rate=10, burst=1, sleep=slept.append)
+    ib = PacedIB(DummyIB(), pacer)
+    ib.reqMktData('contract')
+    ib.reqMktData('contract')  # no event loop: sleeps for its token
+    ib.placeOrder('contract', 'order')
+    assert ib.positions() == [] and ib.connectedEvent == 'event'
+    assert asyncio.run(ib.qualifyContractsAsync('contract')) == ['contract']
+
+    assert ib.calls == ['reqMktData', 'reqMktData', 'placeOrder', 'qualifyContractsAsync']
+    assert len(slept) == 1 and 0 < slept[0] <= 0.1
+    lanes = pacer.metrics()['lanes']
+    assert [lanes[name]['requests'] for name in ('orders', 'contracts', 'market_data')] == [1, 1, 2]
+
+
+def test_synchronous_burst_inside_the_loop_is_spread_over_time():
+    async def scenario():
+        ib = PacedIB(WireIB(), IBPacer(rate=20, burst=2))
+        started = time.monotonic()
+        tickers = [ib.reqMktData(n) for n in range(6)]
+        with ib.grouped(LANE_MARKET_DATA):
+            ib.reqMarketDataType(4)
+            ib.reqMktData('delayed')
+            ib.reqMarketDataType(1)
+        ib.placeOrder('entry', 'order')
+        assert len(ib.client.sent) == 3  # two tokens, then the order jumps the queue
+        while ib.pacer.depth():
+            await asyncio.sleep(0.01)
+        return ib, tickers, started
+
+    ib, tickers, started = asyncio.run(scenario())
+    assert tickers == [f'ticker {n}' for n in range(6)]  # returned at once, sent later
+    messages = [msg for _, msg in ib.client.sent]
+    assert messages == ['mktData 0', 'mktData 1', 'order entry'] + [f'mktData {n}' for n in range(2, 6)] + \
+        ['type 4', 'mktData delayed', 'type 1']
+    times = [sent_at - started for sent_at, _ in ib.client.sent]
+    assert times[2] < 0.05 and times[3] >= 0.09 and times[-1] >= 0.2  # 20 per second after the burst
+    assert times[-1] - times[-3] < 0.01  # the group goes out as one unit
+    lanes = ib.pacer.metrics()['lanes']
+    assert lanes['market_data']['requests'] == 7 and lanes['market_data']['waited'] == 5
@@ -0,0 +1,41 @@
+import random
+import string
+
+from keyword_matcher import KeywordMatcher
+
+
+def test_whole_word_hits_with_positions():
+    matcher = KeywordMatcher({'SELL': ['STC', 'STOPPED', 'STOPPED OUT', 'OUT'], 'BUY': ['BTO', 'BOT']})
+    hits = matcher.find_all('BTO spy, then stopped out... about')
+    assert hits == [(0, 3, 'bto', 'BUY'), (14, 21, 'stopped', 'SELL'), (14, 25, 'stopped out', 'SELL'),
+                    (22, 25, 'out', 'SELL')]
+    assert matcher.lookup('Bto') == 'BUY' and matcher.lookup('bottle') is None
+    assert not matcher.contains('bottle about')
+    assert matcher.categories_in('about BOT') == {'BUY'}
+
+
+def test_substring_mode_reports_nested_hits():
+    matcher = KeywordMatcher({'TRIM': ['NOW', 'KNOW'], 'REJECT': ['know']}, whole_word=False)
+    assert matcher.find_all('I KNOW') == [(2, 6, 'know', 'TRIM'), (3, 6, 'now', 'TRIM')]
+    assert matcher.first('now i know') == (0, 3, 'now', 'TRIM')
+
+
+def test_case_sensitive_matcher_uses_keywords_as_written():
+    matcher = KeywordMatcher({'BUY': ['BTO']}, case_sensitive=True)
+    assert matcher.lookup('bto') is None and matcher.lookup('BTO') == 'BUY'
+    assert not matcher.contains('bto spy') and matcher.contains('BTO spy')
+
+
+def test_empty_vocabulary_never_matches():
+    matcher = KeywordMatcher({'REJECT': ['']})
+    assert matcher.find_all('anything') == [] and not matcher.contains('anything')
+
+
+def test_matches_naive_scan_on_large_vocabularies():
+    rng = random.Random(3)
+    words = [''.join(rng.choice('abcdefgh') for _ in range(rng.randint(2, 6))) for _ in range(600)]
+    matcher = KeywordMatcher({'A': words[:300], 'B': words[300:]}, whole_word=False)
+    for _ in range(200):
+        text = ''.join(rng.choice('abcdefgh ' + string.digits) for _ in range(80))
+        expected = {(i, i + len(w), w) for w in set(words) for i in range(len(text)) if text.startswith(w, i)}
+        assert {hit[:3] for hit in matcher.find_all(text)} == expected
@@ -0,0 +1,32 @@
+import logging
+
+import latency_tracer
+from latency_tracer import SignalTrace, stamp_received
+
+
+def test_stage_latencies_follow_recorded_stages(monkeypatch):
+    clock = iter([5_000_000, 7_500_000, 20_000_000])
+    monkeypatch.setattr(latency_tracer.time, "perf_counter_ns", lambda: next(clock))
+    message = stamp_received({"id": "1"})
+    trace = SignalTrace.for_message(message)
+    trace.mark("parsed")
+    trace.mark("quoted")  # 'qualified' skipped, e.g. cache hit
+    assert trace.stage_latencies() == {"parsed": 2.5, "quoted": 12.5, "total": 15.0}
+
+
+def test_stamp_received_keeps_first_arrival():
+    message = stamp_received({"id": "1"})
+    first = message["_received_ns"]
+    assert stamp_received(message)["_received_ns"] == first
+
+
+def test_emit_reports_outcome(caplog):
+    trace = SignalTrace("42")
+    trace.mark("parsed")
+    with caplog.at_level(logging.INFO):
+        trace.emit()
+        trace.finish("filled")
+        trace.finish("ignored")
+        trace.emit()
+    assert "stopped after parsed" in caplog.records[0].message
+    assert caplog.records[1].message.endswith("| filled")
@@ -0,0 +1,263 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from ib_insync import Execution, Fill, Order, OrderStatus, Trade
+
+import config
+from bracket_order import BracketTrade
+import discord_interface
+import main
+from ib_interface import IBInterface
+from latency_tracer import SignalTrace
+from option_chain_index import OptionChainIndex
+from portfolio_index import PortfolioIndex
+from trailing_stop_manager import TrailingStopManager
+from ib_pacer import IBPacer
+from main import Main
+from poll_scheduler import AdaptivePollScheduler
+from signal_pipeline import SignalPipeline
+from contract_prefetcher import ContractPrefetcher
+
+
+class DummyGateway:
+    """
+    Pushes `messages` to the runtime once its session is up; `connected` from the start.
+    """
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.connected = True
+        self.stopped = False
+        self.on_message = None
+
+    async def run(self):
+        await asyncio.sleep(0.02)
+        for message in self.messages:
+            self.on_message(message)
+        await asyncio.Event().wait()
+
+    def stop(self):
+        self.stopped = True
+
+
+class DummyChannelClient:
+    async def catch_up_async(self, channel_id, after):
+        return []
+
+
+class OfflineIBInterface:
+    pacer = IBPacer()
+
+    async def refresh_option_chains_async(self):
+        pass
+
+
+class RecordingMain(Main):
+    def __init__(self, messages, duration):
+        self.poll_scheduler = AdaptivePollScheduler.from_config()
+        self.poll_mode = None
+        self.dc_client = DummyChannelClient()
+        self.ib_interface = OfflineIBInterface()
+        self.last_signal_id = 0
+        self.fetch_cursor = 0
+        self.message_queue = asyncio.Queue()
+        self.signal_queue = asyncio.Queue()
+        self.notifications = set()
+        self.pipeline = SignalPipeline(max_concurrency=2)
+        self.prefetcher = ContractPrefetcher(self.ib_interface)
+        self.gateway = DummyGateway(messages)
+        self.gateway.on_message = self.on_gateway_message
+        self.gateway_live = False
+        self.EXIT_TIME = time.time() + duration
+        self.events = []
+
+    def parse_signal(self, signal, trace=None):
+        return dict(signal, underlying=signal['content'].split()[1])
+
+    async def execute_signal(self, signal, trace=None):
+        self.events.append(('start', signal['content']))
+        await asyncio.sleep(0.05)  # e.g. waiting on a fill
+        self.events.append(('filled', signal['content']))
+        self.notify(f"filled {signal['id']}")
+
+
+def make_messages(*contents):
+    first = discord_interface.snowflake_from_datetime(datetime.now(timezone.utc))
+    return [{'id': str(first + i), 'content': content, 'embeds': []} for i, content in enumerate(contents)]
+
+
+def test_independent_signals_execute_concurrently_in_order_per_underlying(monkeypatch):
+    monkeypatch.setattr("config.TEST_MODE", True)
+    monkeypatch.setattr("config.TRAILING_STOP_ENABLED", False)
+    monkeypatch.setattr("config.FLATTEN_AT_EXIT", False)
+    sent = []
+
+    async def send(text):
+        await asyncio.sleep(0.05)
+        sent.append(text)
+
+    monkeypatch.setattr(main, "send_telegram_message_async", send)
+    messages = make_messages('BTO SPX 5800C', 'BTO QQQ 480C', 'TRIM SPX 5800C', 'SELL SPX 5800C')
+    runtime = RecordingMain(messages, duration=0.5)
+    asyncio.run(runtime.run_async())
+
+    assert runtime.events[:2] == [('start', 'BTO SPX 5800C'), ('start', 'BTO QQQ 480C')]  # no waiting on SPX
+    spx = [event for event in runtime.events if 'SPX' in event[1]]
+    assert spx == [('start', 'BTO SPX 5800C'), ('filled', 'BTO SPX 5800C'), ('start', 'TRIM SPX 5800C'),
+                   ('filled', 'TRIM SPX 5800C'), ('start', 'SELL SPX 5800C'), ('filled', 'SELL SPX 5800C')]
+    assert runtime.gateway.stopped
+    assert len(sent) == 4  # pending notifications are flushed before shutdown
+
+
+class FilledEntryIB:
+    """
+    Lists and quotes every option, fills every order at once and records what the entry path sends.
+    """
+
+    def __init__(self):
+        self.option_chains = OptionChainIndex()
+        self.portfolio = PortfolioIndex()
+        self.orders = []
+        self.native_trails = []
+        self.resubmitted = []
+        self.cancelled = []
+        self.unsubscribed = []
+        self.ib = self
+
+    def cancelOrder(self, order):
+        self.cancelled.append(order.orderId)
+
+    async def create_contract_async(self, parsed_symbol):
+        contract = IBInterface.build_contract(parsed_symbol)
+        contract.conId, contract.localSymbol = 11, 'SPXW  250620C05800000'
+        return contract
+
+    async def get_realtime_price_async(self, contract):
+        return 2.0, contract
+
+    def submit_buy_market_order(self, order, adaptive_algo_priority=None):
+        self.orders.append(order)
+        return Trade(order['contract'], Order(orderId=1, action='BUY', totalQuantity=order['qty']),
+                     OrderStatus(orderId=1, status='Filled', filled=order['qty']))
+
+    async def wait_for_fill_async(self, trade, timeout=None):
+        if trade.order.orderType == 'LMT' and trade.orderStatus.status == 'Submitted':  # resting limit entry
+            if trade.order.orderId in self.cancelled:
+                trade.orderStatus.status = 'Cancelled'
+            return False
+        return True
+
+    def submit_bracket_order_order(self, order, adaptive_algo_priority=None):
+        self.orders.append(order)
+        entry = Trade(order['contract'], Order(orderId=1, action='BUY', totalQuantity=order['qty'], orderType='LMT',
+                                                lmtPrice=order['entry_price']),
+                      OrderStatus(orderId=1, status='Submitted'))
+        entry.fills.append(Fill(order['contract'], Execution(execId='1', shares=2, price=2.0), None, None))
+        return BracketTrade(entry, *(Trade(order['contract'], Order(orderId=order_id, lmtPrice=order['tp'],
+                                                                      auxPrice=order['sl']),
+                                           OrderStatus(orderId=order_id, status='PreSubmitted'))
+                                     for order_id in (2, 3)))
+
+    async def replace_bracket_exits_async(self, bracket, qty, timeout=None):
+        self.resubmitted.append((bracket.entry.order.orderId, qty))
+        return bracket
+
+    def submit_native_trail(self, order):
+        self.native_trails.append(order)
+        return ()
+
+    def unsub_market_data(self, contract):
+        self.unsubscribed.append(contract.conId)
+
+
+class EntryMain(Main):
+    def __init__(self):
+        self.ib_interface = FilledEntryIB()
+        self.prefetcher = ContractPrefetcher(self.ib_interface)
+        self.trailing_manager = TrailingStopManager(self.ib_interface, {}, notify=lambda msg: None)
+        self.notifications = set()
+        self.current_state = {}
+        self.MIN_PRICE, self.MAX_PRICE = config.MIN_PRICE, config.MAX_PRICE
+
+    def notify(self, text):
+        pass
+
+
+def entry_signal():
+    return {'id': 1, 'instr': 'BUY', 'underlying': 'SPX', 'strike': 5800.0, 'p_or_c': 'C', 'exp_month': 6,
+            'exp_day': 20}
+
+
+def test_filled_entry_hands_the_position_to_the_trailing_manager(monkeypatch):
+    monkeypatch.setattr("config.TRAILING_STOP_ENABLED", True)
+    monkeypatch.setattr("config.USE_ADVANCED_TRAILING", True)
+    monkeypatch.setattr("config.USE_BRAKET_ORDER", False)
+    monkeypatch.setattr("config.ONE_CONTRACT_AT_A_TIME", False)
+    runtime = EntryMain()
+
+    asyncio.run(runtime.execute_signal(entry_signal(), SignalTrace(1)))
+
+    assert runtime.ib_interface.orders[0]['qty'] == 5
+    (symbol, trail), = runtime.trailing_manager.active_trails.items()
+    assert symbol.startswith('SPX') and trail['entry_price'] == 2.0 and trail['qty'] == 5
+    assert trail['contract'].conId == 11
+    assert runtime.ib_interface.unsubscribed == []  # the trail keeps the market data line
+
+
+def test_filled_entry_places_native_trail_orders(monkeypatch):
+    monkeypatch.setattr("config.TRAILING_STOP_ENABLED", True)
+    monkeypatch.setattr("config.USE_ADVANCED_TRAILING", True)
+    monkeypatch.setattr("config.USE_NATIVE_TRAILING", True)
+    monkeypatch.setattr("config.USE_BRAKET_ORDER", False)
+    monkeypatch.setattr("config.ONE_CONTRACT_AT_A_TIME", False)
+    monkeypatch.setattr("trailing_stop_manager.USE_NATIVE_TRAILING", True)
+    runtime = EntryMain()
+
+    asyncio.run(runtime.execute_signal(entry_signal(), SignalTrace(1)))
+
+    trail, = runtime.ib_interface.native_trails
+    assert trail['qty'] == 5 and trail['entry_price'] == 2.0 and trail['contract'].conId == 11
+    assert not runtime.trailing_manager.active_trails  # IB enforces the stops, nothing streams
+    assert runtime.ib_interface.unsubscribed == [11]
+
+
+class RecordingFlatten:
+    def __init__(self):
+        self.calls = 0
+
+    async def flatten(self):
+        self.calls += 1
+
+
+def run_until_exit(monkeypatch, duration):
+    monkeypatch.setattr("config.TEST_MODE", True)
+    monkeypatch.setattr("config.TRAILING_STOP_ENABLED", False)
+    monkeypatch.setattr("config.FLATTEN_AT_EXIT", True)
+    runtime = RecordingMain([], duration=duration)
+    runtime.trailing_manager = TrailingStopManager(runtime.ib_interface, {})
+    runtime.flatten_engine = RecordingFlatten()
+    asyncio.run(runtime.run_async())
+    return runtime.flatten_engine.calls
+
+
+def test_flattens_when_the_exit_time_is_reached(monkeypatch):
+    assert run_until_exit(monkeypatch, duration=0.1) == 1
+
+
+def test_no_flatten_when_started_after_the_exit_time(monkeypatch):
+    assert run_until_exit(monkeypatch, duration=-3600) == 0
+
+
+def test_partly_filled_limit_entry_keeps_exits_for_the_filled_quantity(monkeypatch):
+    monkeypatch.setattr("config.TRAILING_STOP_ENABLED", False)
+    monkeypatch.setattr("config.USE_BRAKET_ORDER", True)
+    monkeypatch.setattr("config.BRACKET_LIMIT_ENTRY", True)
+    monkeypatch.setattr("config.ONE_CONTRACT_AT_A_TIME", False)
+    runtime = EntryMain()
+
+    asyncio.run(runtime.execute_signal(entry_signal(), SignalTrace(1)))
+
+    assert runtime.ib_interface.orders[0]['qty'] == 5 and runtime.ib_interface.cancelled == [1]
+    assert runtime.ib_interface.resubmitted == [(1, 2)]  # exits re-placed for the 2 bought
+    assert next(iter(runtime.current_state.values()))['qty'] == 2
@@ -0,0 +1,78 @@
+import pytest
+from ib_insync import Option, Ticker
+
+from ib_interface import IBInterface
+from market_data_manager import MarketDataLinesExhausted, MarketDataManager
+
+
+class DummyStreamIB:
+    def __init__(self):
+        self.requested = []
+        self.cancelled = []
+
+    def reqMktData(self, contract, generic_ticks, snapshot, regulatory):
+        self.requested.append(contract.conId)
+        return Ticker(contract=contract, bid=2.0, ask=2.1)
+
+    def cancelMktData(self, contract):
+        self.cancelled.append(contract.conId)
+
+    def waitOnUpdate(self, timeout=0):
+        return True
+
+
+def make_contract(con_id):
+    contract = Option("SPY", "20250620", 500.0 + con_id, "C", "SMART")
+    contract.conId = con_id
+    contract.localSymbol = f"SPY {con_id}"
+    return contract
+
+
+def test_consumers_share_one_subscription():
+    ib = DummyStreamIB()
+    manager = MarketDataManager(ib, max_lines=10, reserve=0)
+    first = manager.acquire(make_contract(1))
+    second = manager.acquire(make_contract(1))
+    assert first is second and ib.requested == [1]
+
+    manager.release(make_contract(1))
+    assert not manager.discard(make_contract(1))  # still held by the second consumer
+    manager.release(make_contract(1))
+    assert manager.ticker(make_contract(1)) is first  # still streaming after the last release
+    assert manager.discard(make_contract(1)) and ib.cancelled == [1]
+    assert not manager.discard(make_contract(1))  # already cancelled: no second cancelMktData
+    assert ib.cancelled == [1] and manager.ticker(make_contract(1)) is None
+
+
+def test_idle_lines_are_evicted_least_recently_used_first():
+    ib = DummyStreamIB()
+    manager = MarketDataManager(ib, max_lines=4, reserve=1)
+    for con_id in (1, 2, 3):
+        manager.acquire(make_contract(con_id))
+    manager.release(make_contract(1))
+    manager.release(make_contract(2))
+    manager.acquire(make_contract(1))  # 1 is hot again and held
+    manager.release(make_contract(1))
+
+    manager.acquire(make_contract(4))
+    assert ib.cancelled == [2]
+    assert list(manager.subscriptions) == [3, 1, 4]
+
+    manager.acquire(make_contract(5))  # evicts 1, the only idle line
+    with pytest.raises(MarketDataLinesExhausted):
+        manager.acquire(make_contract(6))
+    assert manager.metrics() == {'lines': 3, 'held': 3, 'requests': 5, 'reuses': 1, 'evictions': 2}
+
+
+def test_repeat_quotes_reuse_the_stream():
+    ib = DummyStreamIB()
+    interface = IBInterface.__new__(IBInterface)
+    interface.ib = ib
+    interface.market_data = MarketDataManager(ib)
+    for _ in range(3):
+        assert interface.get_live_price(make_contract(7)) == pytest.approx(2.05)
+    assert ib.requested == [7] and ib.cancelled == []
+
+    interface.unsub_market_data(make_contract(7))
+    interface.unsub_market_data(make_contract(7))
+    assert ib.cancelled == [7]
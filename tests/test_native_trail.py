@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+from ib_insync import Option, OrderStatus, Trade
+
+import config
+import trailing_stop_manager
+from ib_interface import IBInterface
+from native_trail import build_native_trail
+from trailing_stop_manager import TrailingStopManager
+
+
+class DummyOrderIB:
+    def __init__(self):
+        self.placed = []
+
+    def placeOrder(self, contract, order):
+        order.orderId = len(self.placed) + 1
+        self.placed.append(order)
+        return Trade(contract, order, OrderStatus(orderId=order.orderId, status='Submitted'))
+
+
+def make_contract():
+    contract = Option("SPX", "20250620", 5800.0, "C", "SMART")
+    contract.conId = 7
+    contract.localSymbol = "SPXW  250620C05800000"
+    return contract
+
+
+def test_policy_as_adjustable_stop_and_time_conditioned_exit():
+    now = datetime(2025, 6, 20, 14, 0, tzinfo=timezone.utc)
+    stop, timeout_exit = build_native_trail(2, 4.0, breakeven_pct=5, pullback_pct=20, timeout_minutes=30,
+                                            oca_group='trail-7', now=now, account='DU1')
+
+    assert (stop.action, stop.orderType, stop.auxPrice) == ('SELL', 'STP', 0.01)  # no stop before breakeven
+    assert (stop.triggerPrice, stop.adjustedOrderType, stop.adjustedStopPrice) == (4.2, 'TRAIL', 3.36)
+    assert (stop.adjustedTrailingAmount, stop.adjustableTrailingUnit) == (20, 1)
+    assert (timeout_exit.orderType, timeout_exit.conditions[0].time) == ('MKT', '20250620-14:30:00')
+    assert {(order.ocaGroup, order.ocaType, order.account, order.totalQuantity)
+            for order in (stop, timeout_exit)} == {('trail-7', 1, 'DU1', 2)}
+
+    stop, _ = build_native_trail(1, 4.0, 5, 20, 30, oca_group='trail-7', initial_stop_pct=50, now=now)
+    assert stop.auxPrice == 2.0
+
+
+def test_manager_places_native_orders_and_only_watches_fills(monkeypatch):
+    monkeypatch.setattr(trailing_stop_manager, 'USE_NATIVE_TRAILING', True)
+    logged, sent = [], []
+    monkeypatch.setattr(trailing_stop_manager, 'log_trade', lambda *args: logged.append(args))
+    interface = IBInterface.__new__(IBInterface)
+    interface.ib = DummyOrderIB()
+    interface.account_number = ''
+    manager = TrailingStopManager(interface, {}, notify=sent.append)
+
+    manager.add_position("SPX 5800C", make_contract(), entry_price=4.0, qty=2)
+
+    stop, timeout_exit = manager.native_trails["SPX 5800C"]
+    assert [order.orderType for order in interface.ib.placed] == ['STP', 'MKT']
+    assert stop.order.adjustedStopPrice == round(4.0 * (1 + config.BREAKEVEN_TRIGGER_PERCENT / 100) *
+                                                 (1 - config.MAX_LOSS_STOP_PERCENT / 100), 2)
+    assert not manager.active_trails and len(manager.book) == 0  # nothing to poll
+
+    stop.orderStatus.status, stop.orderStatus.avgFillPrice = 'Filled', 5.1
+    stop.fills.append(type('Fill', (), {'execution': type('Execution', (), {'shares': 2})()})())
+    stop.filledEvent.emit(stop)
+    timeout_exit.orderStatus.status = 'Cancelled'  # its OCA sibling
+    timeout_exit.cancelledEvent.emit(timeout_exit)
+
+    assert not manager.native_trails
+    assert logged == [("SPX 5800C", 2, 5.1, "SELL", "trailing_stop")]
+    assert len(sent) == 1 and "Native Trailing Stop" in sent[0]
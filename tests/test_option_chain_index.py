@@ -0,0 +1,129 @@
+import asyncio
+from datetime import date
+
+from ib_insync import Option
+
+from contract_cache import ContractCache, contract_key
+from option_chain_index import OptionChainIndex
+from tests.test_contract_cache import DummySymbol, make_interface
+
+
+class DummyChainParams:
+    def __init__(self, exchange, trading_class, expirations):
+        self.exchange = exchange
+        self.tradingClass = trading_class
+        self.expirations = set(expirations)
+
+
+class DummyDetails:
+    def __init__(self, contract):
+        self.contract = contract
+
+
+class DummyChainIB:
+    """
+    Lists SPXW 5790-5810 (every 5) calls and puts for 20250618/20/23; the 20250620 5805 strike is missing.
+    """
+
+    def __init__(self):
+        self.detail_requests = []
+
+    def qualifyContracts(self, *contracts):
+        for contract in contracts:
+            contract.conId = 416904
+        return list(contracts)
+
+    def reqSecDefOptParams(self, symbol, exchange, sec_type, con_id):
+        return [DummyChainParams('CBOE', 'SPX', ['20250620']),
+                DummyChainParams('SMART', 'SPXW', ['20250617', '20250618', '20250620', '20250623', '20250624'])]
+
+    def reqContractDetails(self, contract):
+        self.detail_requests.append(contract.lastTradeDateOrContractMonth)
+        details = []
+        for strike in (5790.0, 5795.0, 5800.0, 5805.0, 5810.0):
+            if contract.lastTradeDateOrContractMonth == '20250620' and strike == 5805.0:
+                continue
+            for right in ('C', 'P'):
+                listed = Option(contract.symbol, contract.lastTradeDateOrContractMonth, strike, right, 'SMART',
+                                currency='USD', tradingClass=contract.tradingClass)
+                listed.conId = int(strike) * 10 + (right == 'C')
+                details.append(DummyDetails(listed))
+        return details
+
+
+def make_index():
+    index = OptionChainIndex(watchlist=[('SPX', 'IND', 'SPXW')], expiries=3, refresh_interval=3600,
+                             clock=lambda: 0.0, today=lambda: date(2025, 6, 18))
+    index.refresh(DummyChainIB())
+    return index
+
+
+def test_refresh_keeps_nearest_expirations_sorted():
+    ib = DummyChainIB()
+    index = OptionChainIndex(watchlist=[('SPX', 'IND', 'SPXW')], expiries=3, clock=lambda: 0.0,
+                             today=lambda: date(2025, 6, 18))
+    assert index.refresh_due()
+    index.refresh(ib)
+    assert not index.refresh_due()
+    assert ib.detail_requests == ['20250618', '20250620', '20250623']
+    chain = index.chains['SPX']
+    assert chain['expirations'] == ['20250618', '20250620', '20250623']
+    assert chain['strikes']['20250620'] == [5790.0, 5795.0, 5800.0, 5810.0]
+
+
+def test_validate_and_snap_strikes():
+    index = make_index()
+    assert index.validate('spx', '20250620', 5800.0) == (True, 5800.0)
+    assert index.validate('SPX', '20250620', 5805.0) == (False, 5800.0)
+    assert index.validate('SPX', '20250620', 5807.0, snap_distance=5) == (True, 5810.0)
+    assert index.validate('SPX', '20250619', 5800.0) == (False, 5800.0)  # no such expiration
+    assert index.validate('SPX', '20250627', 5800.0) == (True, 5800.0)  # beyond the indexed expirations
+    assert index.validate('AAPL', '20250620', 151.0) == (True, 151.0)  # not watched
+
+
+def test_create_contract_resolves_from_index_without_ib():
+    interface = make_interface(ContractCache(today=lambda: date(2025, 6, 18)))
+    interface.option_chains = make_index()
+    contract = interface.create_contract(DummySymbol(expiry=date(2025, 6, 20), strike=5800.0, right='C'))
+    assert contract.conId == 58001 and interface.ib.qualify_calls == 0
+    assert interface.contract_cache.get(contract_key(contract)) is not None
+
+    interface.create_contract(DummySymbol(expiry=date(2025, 6, 20), strike=5805.0, right='C'))
+    assert interface.ib.qualify_calls == 1  # not listed locally, falls through to IB
+
+
+class PartialChainIB(DummyChainIB):
+    """
+    DummyChainIB whose 20250620 details come back empty and whose 20250623 request fails.
+    """
+
+    def reqContractDetails(self, contract):
+        if contract.lastTradeDateOrContractMonth == '20250620':
+            return []
+        if contract.lastTradeDateOrContractMonth == '20250623':
+            raise TimeoutError('no reply')
+        return super().reqContractDetails(contract)
+
+    async def qualifyContractsAsync(self, *contracts):
+        return self.qualifyContracts(*contracts)
+
+    async def reqSecDefOptParamsAsync(self, *args):
+        return self.reqSecDefOptParams(*args)
+
+    async def reqContractDetailsAsync(self, contract):
+        return self.reqContractDetails(contract)
+
+
+def test_expirations_without_loaded_strikes_are_not_rejected():
+    for refresh in ('refresh', 'refresh_async'):
+        index = OptionChainIndex(watchlist=[('SPX', 'IND', 'SPXW')], expiries=3, clock=lambda: 0.0,
+                                 today=lambda: date(2025, 6, 18))
+        result = getattr(index, refresh)(PartialChainIB())
+        if refresh == 'refresh_async':
+            asyncio.run(result)
+        chain = index.chains['SPX']
+        assert chain['expirations'] == ['20250618', '20250620', '20250623'] and list(chain['strikes']) == ['20250618']
+        assert index.validate('SPX', '20250620', 5805.0) == (True, 5805.0)  # left to normal qualification
+        assert index.validate('SPX', '20250623', 5800.0) == (True, 5800.0)
+        assert index.validate('SPX', '20250619', 5800.0) == (False, 5800.0)  # still not listed
+        assert index.validate('SPX', '20250618', 5805.0) == (True, 5805.0)
@@ -0,0 +1,160 @@
+import asyncio
+import itertools
+
+from ib_insync import Execution, Fill, Option, OrderStatus, Ticker, Trade
+
+from ib_interface import IBInterface
+from peg_executor import PegExecutor
+from tick_rules import TickRules
+
+
+class SimulatedBroker:
+    """
+    One streaming quote; a resting counterparty fills a BUY limit at or above `fill_at` (a SELL at or
+    below it), `fill_qty` at a time.
+    """
+
+    def __init__(self, bid, ask, fill_at=None, fill_qty=None):
+        self.contract = Option('SPY', '20250620', 600.0, 'C', 'SMART')
+        self.contract.conId = 1
+        self.contract.localSymbol = 'SPY 250620C600'
+        self.ticker = Ticker(contract=self.contract, bid=bid, ask=ask)
+        self.fill_at = fill_at
+        self.fill_qty = fill_qty
+        self.placed = []
+        self.cancelled = []
+        self.trades = {}
+        self.ids = itertools.count(1)
+        self.exec_ids = itertools.count(1)
+
+    def placeOrder(self, contract, order):
+        if not order.orderId:
+            order.orderId = next(self.ids)
+            self.trades[order.orderId] = Trade(contract, order, OrderStatus(orderId=order.orderId, status='Submitted'))
+        trade = self.trades[order.orderId]
+        self.placed.append(order.lmtPrice)
+        if self.fill_at is None:
+            return trade
+        if order.lmtPrice >= self.fill_at if order.action == 'BUY' else order.lmtPrice <= self.fill_at:
+            asyncio.get_running_loop().call_soon(self.fill, trade)
+        return trade
+
+    def cancelOrder(self, order):
+        trade = self.trades[order.orderId]
+        self.cancelled.append(order.orderId)
+        trade.orderStatus.status = 'Cancelled'
+        trade.statusEvent.emit(trade)
+
+    def fill(self, trade):
+        shares = min(self.fill_qty or trade.remaining(), trade.remaining())
+        execution = Execution(execId=str(next(self.exec_ids)), side='BOT' if trade.order.action == 'BUY' else 'SLD',
+                              shares=shares, price=trade.order.lmtPrice)
+        trade.fills.append(Fill(trade.contract, execution, None, None))
+        trade.orderStatus.filled += shares
+        trade.orderStatus.remaining = trade.order.totalQuantity - trade.orderStatus.filled
+        trade.orderStatus.status = 'Filled' if trade.orderStatus.remaining <= 0 else 'Submitted'
+        trade.statusEvent.emit(trade)
+
+
+class StreamingInterface:
+    def __init__(self, broker, tick=0.01):
+        self.ib = broker
+        self.ticks = TickRules(broker, fallback=tick)
+        self.account_number = 'DU1'
+        self.wait_for_fill_async = IBInterface.wait_for_fill_async.__get__(self)
+
+    def latest_ticker(self, contract):
+        return self.ib.ticker
+
+
+def make_executor(broker, tick=0.01, **kwargs):
+    params = dict(step_seconds=0.02, steps=4, max_slippage_percent=5.0, timeout=0.3)
+    params.update(kwargs)
+    return PegExecutor(StreamingInterface(broker, tick), **params)
+
+
+def test_walks_from_mid_toward_the_far_touch_until_filled():
+    broker = SimulatedBroker(bid=1.90, ask=2.10, fill_at=2.05)
+    executor = make_executor(broker)
+
+    async def run():
+        trade = executor.submit(broker.contract, 'BUY', 3)
+        return trade, await executor.report(trade)
+
+    trade, report = asyncio.run(run())
+
+    assert broker.placed == [2.0, 2.02, 2.05]  # mid, then a quarter of the spread per step
+    assert trade.order.account == 'DU1' and trade.orderStatus.status == 'Filled'
+    assert report['filled'] == 3 and report['avg_price'] == 2.05 and report['reprices'] == 2
+    assert round(report['improvement'], 2) == 0.05 and round(report['improvement_vs_mid'], 2) == -0.05
+    assert 0 < report['latency'] < 0.2
+    assert executor.metrics()['filled'] == 1 and not executor.walks
+
+
+def test_slippage_cap_and_timeout_cancel():
+    broker = SimulatedBroker(bid=1.00, ask=1.40, fill_at=1.00)  # nobody sells below the bid
+    executor = make_executor(broker, max_slippage_percent=10.0, timeout=0.15)
+
+    async def run():
+        trade = executor.submit(broker.contract, 'SELL', 2)
+        return trade, await executor.report(trade)
+
+    trade, report = asyncio.run(run())
+
+    assert broker.placed[0] == 1.2 and min(broker.placed) == 1.08  # never below the arrival mid - 10%
+    assert broker.cancelled == [trade.order.orderId]
+    assert report['status'] == 'Cancelled' and report['filled'] == 0 and report['improvement'] is None
+    assert executor.metrics()['orders'] == 1 and executor.metrics()['filled'] == 0
+
+
+def test_partial_fill_is_reported_when_cancelled():
+    broker = SimulatedBroker(bid=1.90, ask=2.10, fill_at=2.0, fill_qty=1)
+    executor = make_executor(broker, max_slippage_percent=0.0, timeout=0.1)
+
+    async def run():
+        trade = executor.submit(broker.contract, 'BUY', 3)
+        return await executor.report(trade)
+
+    report = asyncio.run(run())
+
+    assert report['status'] == 'Cancelled' and report['filled'] == 1 and report['avg_price'] == 2.0
+
+
+def test_no_two_sided_quote_falls_back_to_market():
+    broker = SimulatedBroker(bid=float('nan'), ask=2.10)
+    executor = make_executor(broker)
+
+    async def run():
+        return executor.submit(broker.contract, 'BUY', 1)
+
+    assert asyncio.run(run()) is None and not broker.placed
+
+
+def test_tick_grid_rounds_toward_the_passive_side():
+    broker = SimulatedBroker(bid=1.0, ask=1.2)
+    executor = make_executor(broker, tick=0.05)
+    assert executor.limit_price(broker.contract, 'BUY', 1.13, 1.2, 2.0) == 1.1
+    assert executor.limit_price(broker.contract, 'SELL', 1.13, 1.0, 0.5) == 1.15
+    assert executor.limit_price(broker.contract, 'BUY', 1.0, 1.2, 1.07, step=4) == 1.05  # capped
+
+
+def test_each_contract_is_priced_on_its_own_grid():
+    broker = SimulatedBroker(bid=2.40, ask=2.62)
+    executor = make_executor(broker)
+    ticks = executor.ib_interface.ticks
+    ticks.rules = {110: ([0.0, 3.0], [0.05, 0.10]), 32: ([0.0, 3.0], [0.01, 0.05])}  # SPX, penny pilot
+    spx = Option('SPX', '20250620', 5800.0, 'C', 'SMART', conId=2)
+    ticks.by_con_id = {broker.contract.conId: 32, spx.conId: 110}
+
+    assert executor.limit_price(spx, 'BUY', 2.53, 2.62, 5.0) == 2.5
+    assert executor.limit_price(spx, 'SELL', 4.33, 4.0, 1.0) == 4.4
+    assert executor.limit_price(broker.contract, 'BUY', 2.53, 2.62, 5.0) == 2.53
+    assert executor.limit_price(broker.contract, 'SELL', 4.33, 4.0, 1.0) == 4.35
+
+    broker.contract = spx
+
+    async def run():
+        return executor.submit(spx, 'BUY', 1)
+
+    asyncio.run(run())
+    assert broker.placed == [2.5]  # mid 2.51, on the 0.05 grid
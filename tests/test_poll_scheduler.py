@@ -0,0 +1,87 @@
+import pytest
+from datetime import datetime
+
+from discord_interface import DiscordChannelClient
+from poll_scheduler import AdaptivePollScheduler
+from tests.fake_discord_rest import FakeDiscordRestServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(clock, wall=datetime(2025, 6, 20, 12, 0)):
+    return AdaptivePollScheduler(min_delay=0.25, idle_delay=1.0, max_delay=5.0, active_window=60,
+                                 dormant_after=600, hot_windows=[((9, 25), (10, 0))], reserve=1,
+                                 clock=clock, wall_clock=lambda: wall)
+
+
+def test_cadence_follows_channel_activity():
+    clock = FakeClock()
+    sched = make_scheduler(clock)
+    assert sched.next_delay() == 0.0  # nothing polled yet
+    sched.observe_response(200, {})
+    assert sched.next_delay() == pytest.approx(1.0) and sched.mode == "idle"
+
+    sched.observe_messages(3)
+    assert sched.next_delay() == pytest.approx(0.25) and sched.mode == "active"
+
+    clock.now += 120
+    assert sched.next_delay() == 0.0 and sched.mode == "idle"
+    sched.observe_response(200, {})
+    clock.now += 600
+    sched.observe_response(200, {})
+    assert sched.next_delay() == pytest.approx(5.0) and sched.mode == "dormant"
+
+
+def test_hot_window_polls_fast_while_idle():
+    clock = FakeClock()
+    sched = make_scheduler(clock, wall=datetime(2025, 6, 20, 9, 31))
+    sched.observe_response(200, {})
+    assert sched.next_delay() == pytest.approx(0.25) and sched.mode == "hot"
+
+
+def test_budget_spreads_remaining_requests_until_reset():
+    clock = FakeClock()
+    sched = make_scheduler(clock)
+    sched.observe_messages(1)
+    sched.observe_response(200, {"X-RateLimit-Limit": "5", "X-RateLimit-Remaining": "3",
+                                 "X-RateLimit-Reset-After": "4.0"})
+    # 2 usable requests (1 in reserve) over 4 s -> one every 2 s, even though the channel is active
+    assert sched.next_delay() == pytest.approx(2.0)
+
+    sched.observe_response(200, {"X-RateLimit-Limit": "5", "X-RateLimit-Remaining": "1",
+                                 "X-RateLimit-Reset-After": "1.5"})
+    assert sched.next_delay() == pytest.approx(1.5) and sched.mode == "throttled"
+
+    clock.now += 1.5
+    assert sched.next_delay() == 0.0
+
+
+def test_429_retry_after_blocks_polling():
+    clock = FakeClock()
+    sched = make_scheduler(clock)
+    sched.observe_response(429, {}, {"message": "You are being rate limited.", "retry_after": 3.5, "global": False})
+    assert sched.next_delay() == pytest.approx(3.5) and sched.mode == "throttled"
+    metrics = sched.metrics()
+    assert metrics["throttled"] == 1 and metrics["throttled_for"] == pytest.approx(3.5)
+
+
+def test_client_feeds_scheduler_from_response_headers():
+    server = FakeDiscordRestServer(rate_limit=(2, 10.0)).start()
+    try:
+        sched = AdaptivePollScheduler(min_delay=0.25, idle_delay=1.0, max_delay=5.0, active_window=60,
+                                      dormant_after=600, reserve=0)
+        client = DiscordChannelClient("token", base_url=server.base_url, scheduler=sched)
+        client.catch_up("1", 0)
+        assert sched.limit == 2 and sched.remaining == 1
+        client.catch_up("1", 0)
+        assert client.catch_up("1", 0) == []
+        assert sched.throttled == 1 and sched.mode != "active"
+        assert sched.next_delay() > 5.0
+    finally:
+        server.stop()
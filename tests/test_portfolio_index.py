@@ -0,0 +1,70 @@
+from eventkit import Event
+from ib_insync import Execution, Fill, Option, Order, OrderStatus, Position, Trade
+
+from portfolio_index import PortfolioIndex
+
+
+class DummyEventIB:
+    def __init__(self, positions=(), trades=()):
+        self._positions = list(positions)
+        self._trades = list(trades)
+        self.positionEvent = Event()
+        self.execDetailsEvent = Event()
+        self.newOrderEvent = Event()
+        self.orderStatusEvent = Event()
+
+    def positions(self):
+        return self._positions
+
+    def openTrades(self):
+        return self._trades
+
+
+def make_contract(con_id, strike):
+    contract = Option("SPX", "20250620", strike, "C", "SMART", multiplier="100")
+    contract.conId = con_id
+    return contract
+
+
+def make_fill(contract, exec_id, side, shares, price=2.0):
+    return Fill(contract, Execution(execId=exec_id, side=side, shares=shares, price=price, acctNumber="DU1"),
+                None, None)
+
+
+def make_trade(contract, order_id, status):
+    return Trade(contract, Order(orderId=order_id), OrderStatus(orderId=order_id, status=status))
+
+
+def test_positions_are_keyed_by_contract_and_follow_ib_events():
+    held = make_contract(1, 5800.0)
+    ib = DummyEventIB(positions=[Position("DU1", held, 3, 150.0)])
+    index = PortfolioIndex()
+    index.attach(ib)
+    index.seed(ib)
+    assert index.quantity(1) == 3 and index.has_open_positions()
+
+    other_strike = make_contract(2, 5810.0)
+    ib.execDetailsEvent.emit(None, make_fill(other_strike, "e1", "BOT", 2))
+    ib.execDetailsEvent.emit(None, make_fill(other_strike, "e1", "BOT", 2))  # replayed execution
+    assert index.quantity(2) == 2 and index.quantity(1) == 3  # same underlying, no collision
+    assert index.positions[2].avgCost == 200.0
+
+    ib.execDetailsEvent.emit(None, make_fill(held, "e2", "SLD", 1))
+    assert index.quantity(1) == 2
+    ib.positionEvent.emit(Position("DU1", held, 0, 0.0))  # IB's own figure wins
+    assert not index.holds(1) and [p.contract.conId for p in index.open_positions()] == [2]
+
+
+def test_working_orders_follow_order_status():
+    contract = make_contract(1, 5800.0)
+    ib = DummyEventIB(trades=[make_trade(contract, 7, "Submitted")])
+    index = PortfolioIndex()
+    index.attach(ib)
+    index.seed(ib)
+    ib.newOrderEvent.emit(make_trade(contract, 8, "PendingSubmit"))
+    assert [trade.order.orderId for trade in index.working_orders(1)] == [7, 8]
+
+    ib.orderStatusEvent.emit(make_trade(contract, 7, "Filled"))
+    ib.orderStatusEvent.emit(make_trade(contract, 8, "Cancelled"))
+    assert index.working_orders() == [] and index.orders_by_con_id == {}
+    assert index.metrics() == {'positions': 0, 'working_orders': 0, 'updates': 4}
@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+
+from position_book import EXIT_TIMEOUT, EXIT_TRAILING, HOLD, PositionBook, PositionView
+
+RULES = dict(breakeven_pct=5, pullback_pct=10, timeout_minutes=30)
+
+
+def test_slots_are_reused_and_the_book_grows():
+    book = PositionBook(capacity=2)
+    for i in range(5):
+        book.add(f"S{i}", 1.0 + i, qty=i + 1, start_time=0.0)
+    assert len(book) == 5 and len(book.active) == 8
+    book.remove("S1")
+    book.remove("S1")  # already gone
+    slot = book.add("S9", 2.5, qty=3, start_time=0.0)
+    assert slot == 1 and book.symbols[1] == "S9"
+    assert book.get("S4", "qty") == 5 and book.get("S9", "highest") == 2.5
+
+    view = PositionView(book, "S9", contract="contract")
+    view["breakeven_hit"] = True
+    assert view["breakeven_hit"] is True and view["contract"] == "contract"
+
+
+def test_sweep_matches_tick_by_tick_rules():
+    rng = random.Random(3)
+    swept, ticked = PositionBook(capacity=4), PositionBook(capacity=4)
+    for i in range(50):
+        for book in (swept, ticked):
+            book.add(f"S{i}", 2.0, qty=1, start_time=rng.uniform(0, 600))
+    for step in range(40):
+        now = 1000.0 + step * 30
+        prices = np.array([rng.choice([np.nan, rng.uniform(1.5, 3.5)]) for _ in swept.active])
+        decisions = swept.evaluate(prices, now, **RULES)
+        for symbol in list(ticked.slots):
+            slot = swept.slots[symbol]
+            expected = HOLD if np.isnan(prices[slot]) else ticked.on_price(symbol, prices[slot], now, **RULES)
+            assert decisions[slot] == expected, (symbol, step)
+            if expected != HOLD:
+                swept.remove(symbol)
+                ticked.remove(symbol)
+        np.testing.assert_array_equal(swept.highest[swept.active], ticked.highest[ticked.active])
+    assert len(swept) < 50
+
+
+def test_rules():
+    book = PositionBook()
+    book.add("A", 2.0, qty=1, start_time=0.0)
+    assert book.on_price("A", 2.05, 60, **RULES) == HOLD and not book.get("A", "breakeven_hit")
+    assert book.on_price("A", 2.2, 60, **RULES) == HOLD and book.get("A", "highest") == 2.2
+    assert book.on_price("A", 1.97, 60, **RULES) == EXIT_TRAILING
+    book.add("B", 2.0, qty=1, start_time=0.0)
+    assert book.on_price("B", 2.0, 31 * 60, **RULES) == EXIT_TIMEOUT
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from ib_insync import Option, Ticker
+
+from ib_interface import IBInterface, acceptable_quote, fallback_quote
+from market_data_manager import MarketDataManager
+
+NAN = float("nan")
+
+
+class DummyQuoteIB:
+    """
+    Streams `updates` (dicts of ticker fields) one per waitOnUpdate call; delayed data uses `delayed`.
+    """
+
+    def __init__(self, updates=(), delayed=None):
+        self.updates = list(updates)
+        self.delayed = delayed
+        self.ticker = None
+        self.waits = 0
+        self.market_data_types = []
+        self.requested_types = []  # market data type in force at each reqMktData
+
+    def reqMarketDataType(self, market_data_type):
+        self.market_data_types.append(market_data_type)
+
+    def reqMktData(self, contract, generic_ticks, snapshot, regulatory):
+        self.ticker = Ticker(contract=contract)
+        self.requested_types.append(self.market_data_types[-1] if self.market_data_types else 1)
+        if self.market_data_types and self.market_data_types[-1] == 4 and self.delayed:
+            for field, value in self.delayed.items():
+                setattr(self.ticker, field, value)
+        return self.ticker
+
+    def cancelMktData(self, contract):
+        pass
+
+    def waitOnUpdate(self, timeout=0):
+        self.waits += 1
+        if self.updates:
+            for field, value in self.updates.pop(0).items():
+                setattr(self.ticker, field, value)
+        return True
+
+
+def make_interface(ib):
+    interface = IBInterface.__new__(IBInterface)
+    interface.ib = ib
+    interface.market_data = MarketDataManager(ib)
+    return interface
+
+
+def make_contract():
+    contract = Option("SPX", "20250620", 5800.0, "C", "SMART")
+    contract.conId = 1
+    contract.localSymbol = "SPXW  250620C05800000"
+    return contract
+
+
+def test_quality_rule():
+    now = datetime(2025, 6, 18, 14, 0, tzinfo=timezone.utc)
+    assert acceptable_quote(Ticker(bid=2.0, ask=2.2), 15, 10, now) == ("quote", pytest.approx(2.1))
+    assert acceptable_quote(Ticker(bid=1.0, ask=2.0), 15, 10, now) == (None, None)  # 67% wide
+    fresh = Ticker(last=2.05, rtTime=now - timedelta(seconds=3))
+    stale = Ticker(last=2.05, rtTime=now - timedelta(seconds=30))
+    assert acceptable_quote(fresh, 15, 10, now) == ("trade", 2.05)
+    assert acceptable_quote(stale, 15, 10, now) == (None, None)
+
+    assert fallback_quote(stale) == ("last", 2.05)
+    assert fallback_quote(Ticker(bid=1.0, ask=2.0)) == ("wide_quote", 1.5)
+    assert fallback_quote(Ticker(close=1.8)) == ("close", 1.8)
+    assert fallback_quote(Ticker()) == (None, None)
+
+
+def test_returns_on_first_acceptable_tick():
+    ib = DummyQuoteIB(updates=[{"bid": 2.0}, {"ask": 4.0}, {"ask": 2.2}, {"bid": 2.1}])
+    quote = make_interface(ib).get_quote(make_contract(), timeout=3.0)
+    assert quote["tier"] == "quote" and quote["price"] == pytest.approx(2.1)
+    assert ib.waits == 3  # the tick after the tight quote is never waited for
+    assert quote["elapsed"] < 1.0
+
+
+def test_falls_back_to_close_then_delayed(monkeypatch):
+    monkeypatch.setattr("config.QUOTE_DELAYED_TIMEOUT", 0.01)
+    ib = DummyQuoteIB(updates=[{"close": 1.75}])
+    quote = make_interface(ib).get_quote(make_contract(), timeout=0.01)
+    assert (quote["tier"], quote["price"]) == ("close", 1.75)
+
+    ib = DummyQuoteIB(delayed={"last": 1.6, "marketDataType": 4})
+    quote = make_interface(ib).get_quote(make_contract(), timeout=0.01)
+    assert (quote["tier"], quote["price"]) == ("delayed", 1.6)
+    assert ib.market_data_types == [4, 1]  # live data is restored afterwards
+
+    price, _ = make_interface(DummyQuoteIB()).get_realtime_price(make_contract(), timeout=0.01)
+    assert price == -1.0
+
+
+def test_async_quote_wakes_on_ticker_updates():
+    ib = DummyQuoteIB()
+    interface = make_interface(ib)
+
+    async def scenario():
+        waiting = asyncio.create_task(interface.get_quote_async(make_contract(), timeout=3.0))
+        for update in ({"bid": 2.0}, {"ask": 4.0}, {"ask": 2.2}):
+            await asyncio.sleep(0.01)
+            for field, value in update.items():
+                setattr(ib.ticker, field, value)
+            ib.ticker.updateEvent.emit(ib.ticker)
+        return await waiting
+
+    quote = asyncio.run(scenario())
+    assert quote["tier"] == "quote" and quote["price"] == pytest.approx(2.1)
+    assert quote["elapsed"] < 1.0 and ib.waits == 0  # never blocked in waitOnUpdate
+
+
+def test_delayed_type_only_applies_to_the_delayed_request(monkeypatch):
+    ib = DummyQuoteIB()
+    interface = make_interface(ib)
+    other = make_contract()
+    other.conId = 2
+
+    async def scenario():
+        delayed = asyncio.create_task(interface.delayed_quote_async(make_contract(), timeout=0.05))
+        await asyncio.sleep(0.01)
+        interface.market_data.acquire(other)  # e.g. a prefetch while the delayed quote waits
+        return await delayed
+
+    assert asyncio.run(scenario()) == (None, None)
+    assert ib.requested_types == [4, 1] and ib.market_data_types == [4, 1]
@@ -0,0 +1,58 @@
+import random
+import pytest
+from freezegun import freeze_time
+
+import signal_grammar
+from message_parsers import CommonParser
+from signal_classifier import classification_report, could_be_signal
+
+SIGNALS = [
+    "BTO AAPL 150C 06/20",
+    "**BTO** **AMD** **160C** **06/21** @ **2.35**",
+    "Entry: NVDA $120 call 7/19",
+    "BUY TSLA $250C 12/20",
+    "spx 5800 calls 0DTE",
+    "QQQ 480 puts exp 06/14",
+    "bto meta 500call 6/28",
+    "Ticker: SPY Expiration: 06/21 Strike: 540C",
+]
+
+CHATTER = [
+    "good morning everyone, watching SPY 540 level today",
+    "that was a nice run, congrats to everyone who held",
+    "SPX 0DTE looking choppy, waiting for a better entry",
+    "https://discord.com/channels/1/2",
+    "NVDA 5m chart, $5 move",
+    "great call yesterday on $SPY",
+    "",
+]
+
+
+def test_strike_tokens_pass_and_chatter_is_dropped():
+    assert all(could_be_signal(text) for text in SIGNALS)
+    assert not any(could_be_signal(text) for text in CHATTER)
+
+
+def test_report_counts_precision_and_recall():
+    labelled = [(text, True) for text in SIGNALS] + [(text, False) for text in CHATTER] + [("SPY 540c was ugly", False)]
+    report = classification_report(labelled)
+    assert report["recall"] == 1.0 and report["false_positives"] == 1 and report["true_negatives"] == len(CHATTER)
+    assert report["precision"] == pytest.approx(len(SIGNALS) / (len(SIGNALS) + 1))
+    assert report["msgs_per_sec"] > 0
+
+
+@freeze_time("2025-06-18 10:00:00")
+def test_never_drops_a_message_the_grammar_resolves():
+    rng = random.Random(23)
+    vocab = signal_grammar.vocabulary(CommonParser())
+    tokens = ["BTO", "SPX", "$TSLA", "150C", "4.5p", "$150", "$45C", "150call", "c", "Calls", "PUTS", "0DTE",
+              "06/20", "@", "1.20", "exp", "N/A", "**", ":", "5m", "here", "12", "DTE", "x:y", "*4P*", "$5m", "$7pc", "3.5P",
+              "great", ".5", "+2", "1e3", "put", "nan"]
+    for _ in range(3000):
+        text = " ".join(rng.choice(tokens) for _ in range(rng.randint(1, 6)))
+        try:
+            result = signal_grammar.parse_general(text, vocab, "1")
+        except Exception:
+            continue
+        if result["strike"] != "" and result["p_or_c"] in ("c", "p"):
+            assert could_be_signal(text), text
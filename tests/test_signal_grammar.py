@@ -0,0 +1,120 @@
+import random
+import pytest
+from freezegun import freeze_time
+
+import config
+from message_parsers import CommonParser, LegacyCommonParser
+
+CORPUS = [
+    "BTO AAPL 150C 06/20",
+    "AAPL 150p 07/15 BOT",
+    "BTO SPY 400C 06/20 RISK",
+    "BTO SPY 400C 06/20 PlaceHolder",
+    "BTO SPX 450C 1DTE",
+    "BTO SPX 5800C 0DTE",
+    "SPX 5800P 0DTE @ 4.20",
+    "spx 5800 calls 0DTE",
+    "BTO $SPY 450p 06/21 @ 1.10",
+    "$TSLA 250C 12/20",
+    "BUY TSLA $250C 12/20",
+    "Entry: NVDA $120 call 7/19",
+    "QQQ 480 puts exp 06/14",
+    "IWM 200c",
+    "bto meta 500call 6/28",
+    "STC AAPL 150C 06/20",
+    "TRIM SPY 400C",
+    "Scaling out of SPX 5800C here",
+    "**BTO** **AMD** **160C** **06/21** @ **2.35**",
+    "BTO AMZN 185C 6/21 N/A",
+    "open GOOG 175 c 07/05",
+    "spxw 5750p 2DTEs",
+    "NFLX 650.5C 06/28",
+    "4.5p",
+    "DTE",
+    "call",
+    "SPX call",
+    "Ticker: SPY Expiration: 06/21 Strike: 540C BTO",
+    "Ticker: SPY Expiration: 06/21 Strike: 540C",
+    "good morning everyone",
+    "",
+    "see https://discord.com/channels/1/2 for 150C",
+]
+
+EMBEDS = [
+    {"content": "", "embeds": [{"title": "BTO SPY 540C", "description": "exp 06/21 @ 1.20"}]},
+    {"content": "ALERT", "embeds": [{"title": "QQQ 480P 0DTE"}]},
+    {"content": "BTO", "embeds": [{"title": None, "description": "AAPL 190C 07/19"}]},
+    {"embeds": []},
+]
+
+TOKENS = ["BTO", "bto", "STC", "TRIM", "BUY", "SPX", "SPY", "AAPL", "$TSLA", "$NVDA", "150C", "4.5p", "5800P",
+          "$150", "$45C", "150call", "40put", "c", "calls", "P", "puts", "0DTE", "1DTE", "3DTEs", "06/20",
+          "7/19", "@", "1.20", "exp", "N/A", "**", ":", "lotto", "here", "risky", "5m", "12/20/2025", "Call",
+          "PUTS", "callſ", "$spx", "$5DTE", "a/b", "open", "sold", "$4.5"]
+
+
+@pytest.fixture(autouse=True)
+def weekday():
+    # next-friday expiry lookup only knows weekdays
+    with freeze_time("2025-06-18 10:00:00"):
+        yield
+
+
+def owner(lowercase_keywords=False):
+    parser = CommonParser()
+    if lowercase_keywords:
+        # keyword lists as the lowercase element checks of the legacy parser expect them
+        parser.BUY_SIGNALS = [word.lower() for word in config.BUY_SIGNALS]
+        parser.SELL_SIGNALS = [word.lower() for word in config.SELL_SIGNALS]
+        parser.TRIM_SIGNALS = [word.lower() for word in config.TRIM_SIGNALS]
+    return parser
+
+
+def outcome(parse, msg, parser):
+    try:
+        return parse(parser, msg, state={"msg_id": "1"})
+    except Exception:
+        return "error"
+
+
+def tradable(result):
+    return isinstance(result, dict) and result.get("strike", "") != "" and result.get("p_or_c") in ("c", "p")
+
+
+def assert_same(msg, parser):
+    grammar = outcome(CommonParser.parse_message, msg, parser)
+    legacy = outcome(LegacyCommonParser.parse_message, msg, parser)
+    if grammar is None and legacy is not None:
+        # dropped by the pre-classifier: only allowed when the legacy parse is not a tradable signal
+        assert not tradable(legacy), msg
+    else:
+        assert grammar == legacy, msg
+
+
+@pytest.mark.parametrize("lowercase_keywords", [False, True])
+@pytest.mark.parametrize("text", CORPUS)
+def test_grammar_matches_legacy_parser(text, lowercase_keywords):
+    assert_same({"id": "1", "content": text, "embeds": []}, owner(lowercase_keywords))
+
+
+@pytest.mark.parametrize("msg", EMBEDS)
+def test_grammar_matches_legacy_parser_on_embeds(msg):
+    assert_same(msg, owner())
+
+
+@pytest.mark.parametrize("prefilter", [True, False])
+@pytest.mark.parametrize("lowercase_keywords", [False, True])
+def test_grammar_matches_legacy_parser_on_random_messages(lowercase_keywords, prefilter, monkeypatch, capsys):
+    monkeypatch.setattr(config, "SIGNAL_PREFILTER_ENABLED", prefilter)
+    rng = random.Random(11)
+    parser = owner(lowercase_keywords)
+    for _ in range(2000):
+        text = " ".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 7)))
+        assert_same({"id": "1", "content": text, "embeds": []}, parser)
+    capsys.readouterr()
+
+
+def test_grammar_parses_common_alert():
+    out = CommonParser.parse_message(owner(), {"content": "BTO AAPL 150C 06/20"}, state={"msg_id": "9"})
+    assert out == {"underlying": "AAPL", "exp_month": 6, "exp_day": 20, "strike": 150.0, "p_or_c": "c",
+                   "instr": "BUY", "id": "9"}
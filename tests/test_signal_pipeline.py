@@ -0,0 +1,33 @@
+import asyncio
+
+from signal_pipeline import SignalPipeline
+
+
+def test_same_key_jobs_run_in_order_and_parallelism_is_bounded():
+    async def scenario():
+        pipeline = SignalPipeline(max_concurrency=2)
+        log = []
+
+        def job(name, delay, fail=False):
+            async def run():
+                log.append(f'start {name}')
+                await asyncio.sleep(delay)
+                log.append(f'end {name}')
+                if fail:
+                    raise RuntimeError(name)
+            return run
+
+        pipeline.submit('SPX', job('buy', 0.03, fail=True))
+        pipeline.submit('SPX', job('trim', 0.0))
+        pipeline.submit('SPX', job('sell', 0.0))
+        for name in ('qqq', 'spy', 'iwm'):
+            pipeline.submit(name, job(name, 0.01))
+        await pipeline.drain()
+        return pipeline, log
+
+    pipeline, log = asyncio.run(scenario())
+    assert [entry for entry in log if entry.split()[1] in ('buy', 'trim', 'sell')] == \
+           ['start buy', 'end buy', 'start trim', 'end trim', 'start sell', 'end sell']  # a failure does not block
+    assert log.index('end qqq') < log.index('end buy')  # other underlyings do not wait for SPX
+    assert pipeline.metrics() == {'in_flight': 0, 'running': 0, 'submitted': 6, 'failed': 1, 'peak': 2}
+    assert pipeline.tails == {}
@@ -0,0 +1,55 @@
+import asyncio
+
+from ib_insync import ContractDetails, Option, PriceIncrement
+
+from tick_rules import TickRules
+
+
+class DummyRulesIB:
+    """
+    SPX-style rule 110 (0.05 below 3.00, 0.10 above) on SMART, penny rule 26 on CBOE.
+    """
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.rule_requests = []
+
+    async def reqContractDetailsAsync(self, contract):
+        if self.fail:
+            raise TimeoutError('no reply')
+        return [ContractDetails(contract=contract, marketRuleIds='26,110', validExchanges='CBOE,SMART')]
+
+    async def reqMarketRuleAsync(self, rule_id):
+        self.rule_requests.append(rule_id)
+        if rule_id == 26:
+            return [PriceIncrement(0.0, 0.01), PriceIncrement(3.0, 0.05)]
+        return [PriceIncrement(3.0, 0.10), PriceIncrement(0.0, 0.05)]
+
+
+def make_contract(con_id, exchange='SMART'):
+    contract = Option('SPX', '20250620', 5800.0, 'C', exchange)
+    contract.conId, contract.localSymbol = con_id, f'SPX {con_id}'
+    return contract
+
+
+def test_increments_follow_the_market_rule_of_the_exchange():
+    ib = DummyRulesIB()
+    rules = TickRules(ib)
+    smart, other, cboe = make_contract(1), make_contract(2), make_contract(3, 'CBOE')
+
+    async def load():
+        await asyncio.gather(rules.load(smart), rules.load(other), rules.load(cboe))
+
+    asyncio.run(load())
+
+    assert ib.rule_requests == [110, 26]  # the SMART rule is shared by both contracts
+    assert (rules.tick(smart, 2.5), rules.tick(smart, 3.0), rules.tick(cboe, 2.5)) == (0.05, 0.10, 0.01)
+    assert rules.round(smart, 2.03) == 2.05 and rules.round(smart, 3.27) == 3.3
+    assert rules.round(smart, 2.03, 'down') == 2.0 and rules.round(cboe, 2.031, 'up') == 2.04
+
+
+def test_unknown_contracts_use_the_fallback():
+    rules = TickRules(DummyRulesIB(fail=True), fallback=0.10)
+    contract = make_contract(1)
+    asyncio.run(rules.load(contract))
+    assert rules.tick(contract, 1.0) == 0.10 and rules.round(contract, 1.26) == 1.3
@@ -1,5 +1,8 @@
 import pytest
 from freezegun import freeze_time
+from ib_insync import Option, Ticker
+
+from market_data_manager import MarketDataManager
 from trailing_stop_manager import TrailingStopManager
 
 class DummyIB:
@@ -53,3 +56,81 @@ def test_timeout_exit(manager):
         mgr.check_trailing_stops()
     assert len(ib.sell_calls) == 1
     assert "Time-Based Exit" in sent[0]
+
+
+class DummyStreamingIB(DummyIB):
+    """
+    Interface with a market data manager: trails are driven by ticker update events.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.market_data = MarketDataManager(self)
+        self.stopped = []
+
+    def reqMktData(self, contract, generic_ticks, snapshot, regulatory):
+        return Ticker(contract=contract)
+
+    def cancelMktData(self, contract):
+        pass
+
+    def get_live_price(self, contract):
+        raise AssertionError("streaming trails must not poll for prices")
+
+    def stop_stream(self, contract):
+        self.stopped.append(contract)
+
+
+def tick(ticker, bid, ask):
+    ticker.bid, ticker.ask = bid, ask
+    ticker.updateEvent.emit(ticker)
+
+
+@pytest.fixture
+def streaming(monkeypatch):
+    ib = DummyStreamingIB()
+    sent = []
+    monkeypatch.setattr("trailing_stop_manager.send_telegram_message", lambda msg: sent.append(msg))
+    monkeypatch.setattr("trailing_stop_manager.log_trade", lambda *args: None)
+    monkeypatch.setattr("trailing_stop_manager.BREAKEVEN_TRIGGER_PERCENT", 5)
+    monkeypatch.setattr("trailing_stop_manager.MAX_LOSS_STOP_PERCENT", 10)
+    return ib, TrailingStopManager(ib_interface=ib, portfolio_state={}), sent
+
+
+def make_option(con_id):
+    contract = Option("SPX", "20250620", 5800.0 + con_id, "C", "SMART")
+    contract.conId = con_id
+    return contract
+
+
+def test_exit_fires_on_the_breaching_tick(streaming):
+    ib, mgr, sent = streaming
+    contracts = [make_option(con_id) for con_id in range(1, 11)]
+    for contract in contracts:
+        mgr.add_position(f"SPX{contract.conId}", contract, entry_price=2.0, qty=1)
+    ticker = mgr.active_trails["SPX3"]["ticker"]
+
+    tick(ticker, 2.15, 2.25)  # +10%: breakeven
+    tick(ticker, 2.95, 3.05)  # new high 3.0
+    assert mgr.active_trails["SPX3"]["highest"] == pytest.approx(3.0) and not ib.sell_calls
+    tick(ticker, 2.65, 2.75)  # 2.7 is exactly 10% off the high, no exit yet
+    assert not ib.sell_calls
+    tick(ticker, 2.60, 2.70)  # 2.65 breaches it
+
+    assert len(ib.sell_calls) == 1 and ib.sell_calls[0]["contract"] is contracts[2]
+    assert "SPX3" not in mgr.active_trails and len(mgr.active_trails) == 9
+    assert "Trailing Stop" in sent[0] and ib.stopped == [contracts[2]]
+    assert len(ticker.updateEvent) == 0  # no longer listening
+    tick(ticker, 1.0, 1.1)
+    assert len(ib.sell_calls) == 1
+
+
+def test_timeout_sweep_reads_streaming_ticks(streaming):
+    ib, mgr, sent = streaming
+    with freeze_time("2025-06-20 09:30:00"):
+        mgr.add_position("SPX1", make_option(1), entry_price=2.0, qty=2)
+        tick(mgr.active_trails["SPX1"]["ticker"], 1.95, 2.05)
+    with freeze_time("2025-06-20 09:30:00") as frozen:
+        frozen.tick(60 * 31)
+        mgr.check_trailing_stops()
+    assert len(ib.sell_calls) == 1 and "Time-Based Exit" in sent[0]
@@ -0,0 +1,85 @@
+# =============================================================================================== #
+import asyncio
+import logging
+from bisect import bisect_right
+from math import ceil, floor
+import config
+
+# =============================================================================================== #
+
+
+class TickRules:
+    """
+    Price increments of contracts from their IB market rules, so limit prices land on the contract's grid
+    (e.g. SPX options: 0.05 below 3.00, 0.10 above; penny-pilot classes: 0.01 below 3.00).
+    - `load` looks up the contract's market rule (contract details, then reqMarketRule) once per conId;
+      rules are shared between contracts.
+    - `tick` answers from what is loaded, or `fallback` (a coarse increment valid on every option grid).
+    """
+
+    def __init__(self, ib, fallback: float = 0.10):
+        self.ib = ib
+        self.fallback = fallback
+        self.rules = {}  # market rule id -> ([low edges], [increments])
+        self.by_con_id = {}  # conId -> market rule id
+        self.loading = {}  # conId -> task
+
+    @classmethod
+    def from_config(cls, ib):
+        return cls(ib, fallback=config.TICK_SIZE_FALLBACK)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    async def load(self, contract):
+        """
+        Load the market rule of `contract`; failures are logged and leave it on the fallback increment.
+        """
+        if not getattr(contract, 'conId', None) or contract.conId in self.by_con_id:
+            return
+        task = self.loading.get(contract.conId)
+        if task is None:
+            task = self.loading[contract.conId] = asyncio.get_running_loop().create_task(self._load(contract))
+        try:
+            await asyncio.shield(task)
+        except Exception as _exc:
+            logging.warning(f'[TICKS] No market rule for {contract.localSymbol}, using {self.fallback}: {_exc}')
+        finally:
+            self.loading.pop(contract.conId, None)
+
+    def tick(self, contract, price: float) -> float:
+        rule = self.rules.get(self.by_con_id.get(getattr(contract, 'conId', None)))
+        if rule is None:
+            return self.fallback
+        edges, increments = rule
+        return increments[max(bisect_right(edges, price) - 1, 0)]
+
+    def round(self, contract, price: float, direction: str = 'nearest') -> float:
+        """
+        `price` on the grid of `contract`: 'up', 'down' or to the nearest increment.
+        """
+        tick = self.tick(contract, price)
+        steps = round(price / tick, 6)
+        steps = ceil(steps) if direction == 'up' else floor(steps) if direction == 'down' else round(steps)
+        return round(steps * tick, 4)
+
+    # ------------------------------------------------------------------------------------------- #
+
+    async def _load(self, contract):
+        details = await self.ib.reqContractDetailsAsync(contract)
+        if not details:
+            raise LookupError('no contract details')
+        detail = details[0]
+        rule_ids = detail.marketRuleIds.split(',')
+        exchanges = detail.validExchanges.split(',')
+        rule_id = int(rule_ids[exchanges.index(contract.exchange)] if contract.exchange in exchanges and
+                      len(rule_ids) == len(exchanges) else rule_ids[0])
+        if rule_id not in self.rules:
+            increments = await self.ib.reqMarketRuleAsync(rule_id)
+            if not increments:
+                raise LookupError(f'empty market rule {rule_id}')
+            increments = sorted(increments, key=lambda increment: increment.lowEdge)
+            self.rules[rule_id] = ([increment.lowEdge for increment in increments],
+                                   [increment.increment for increment in increments])
+        self.by_con_id[contract.conId] = rule_id
+
+# =============================================================================================== #
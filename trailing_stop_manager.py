@@ -4,20 +4,28 @@ from datetime import datetime
 from config import (
     TRAILING_STOP_ENABLED,
     USE_ADVANCED_TRAILING,
+    USE_NATIVE_TRAILING,
     FALLBACK_IB_TRAIL_ENABLED,
     BREAKEVEN_TRIGGER_PERCENT,
     MAX_LOSS_STOP_PERCENT,
-    TIMEOUT_EXIT_MINUTES
+    TIMEOUT_EXIT_MINUTES,
+    QUOTE_MAX_SPREAD_PERCENT,
+    QUOTE_MAX_LAST_AGE_SECONDS
 )
+from ib_interface import acceptable_quote, fallback_quote
+from position_book import PositionBook, PositionView, HOLD, EXIT_TRAILING
 from trade_logger import log_trade
 from notification import send_telegram_message
 
 
 class TrailingStopManager:
-    def __init__(self, ib_interface, portfolio_state):
+    def __init__(self, ib_interface, portfolio_state, notify=None):
         self.ib = ib_interface
         self.portfolio_state = portfolio_state
-        self.active_trails = {}
+        self.notify = notify  # e.g. Main.notify, which sends without blocking the event loop
+        self.book = PositionBook()
+        self.active_trails = {}  # symbol -> PositionView over self.book
+        self.native_trails = {}  # symbol -> (stop, timeout exit) trades enforced by IB
 
     def add_position(self, symbol: str, contract, entry_price: float, qty: int):
         if not TRAILING_STOP_ENABLED:
@@ -40,103 +48,167 @@ class TrailingStopManager:
             })
             return
 
+        if USE_NATIVE_TRAILING:
+            self.add_native(symbol, contract, entry_price, qty)
+            return
+
         # Initialize adaptive trailing state
-        self.active_trails[symbol] = {
-            'contract': contract,
-            'entry_price': entry_price,
-            'qty': qty,
-            'highest': entry_price,
-            'breakeven_hit': False,
-            'start_time': time.time()
-        }
+        self.book.add(symbol, entry_price, qty, time.time())
+        self.active_trails[symbol] = PositionView(self.book, symbol, contract=contract, ticker=None, handler=None)
+        self.subscribe(symbol)
 
-    def check_trailing_stops(self):
-        if not self.active_trails:
+    def add_native(self, symbol: str, contract, entry_price: float, qty: int):
+        """
+        Leave the breakeven, trail and timeout rules of `symbol` to IB orders and only watch for their fills.
+        """
+        trades = self.ib.submit_native_trail({'contract': contract, 'qty': qty, 'entry_price': entry_price})
+        self.native_trails[symbol] = trades
+        for trade, log_reason, reason in zip(
+                trades, ("trailing_stop", "timeout"),
+                (f"Native Trailing Stop ({MAX_LOSS_STOP_PERCENT}% pullback)",
+                 f"Native Time-Based Exit ({TIMEOUT_EXIT_MINUTES} min)")):
+            trade.filledEvent += lambda filled, log_reason=log_reason, reason=reason: \
+                self.on_native_fill(symbol, filled, log_reason, reason)
+            trade.cancelledEvent += lambda cancelled: self.on_native_cancel(symbol, cancelled)
+
+    def on_native_fill(self, symbol: str, trade, log_reason: str, reason: str):
+        if self.native_trails.pop(symbol, None) is None:
             return
+        price = trade.orderStatus.avgFillPrice
+        logging.info(f"[NATIVE TRAIL EXIT] {symbol} closed by IB: {reason} at {price}")
+        self.report_exit(symbol, trade.filled(), price, log_reason, reason)
 
-        now = time.time()
-        to_remove = []
+    def on_native_cancel(self, symbol: str, trade):
+        if symbol in self.native_trails:  # not the OCA sibling of a fill
+            logging.warning(f"[NATIVE TRAIL] {symbol}: order {trade.order.orderId} ended "
+                            f"{trade.orderStatus.status}, the position is no longer fully protected")
 
+    def subscribe(self, symbol: str):
+        """
+        Evaluate `symbol` on every tick of its shared streaming ticker. Interfaces without a market
+        data manager are polled by check_trailing_stops instead.
+        """
+        market_data = getattr(self.ib, 'market_data', None)
+        if market_data is None:
+            return
+        trail = self.active_trails[symbol]
+        ticker = market_data.acquire(trail['contract'])
+
+        def on_update(updated):
+            try:
+                self.on_price(symbol, tick_price(updated))
+            except Exception as e:
+                logging.error(f"[TRAIL TICK ERROR] {symbol}: {e}")
+
+        ticker.updateEvent += on_update
+        trail['ticker'], trail['handler'] = ticker, on_update
+
+    def unsubscribe(self, symbol: str, trail: dict):
+        if trail['ticker'] is not None:
+            trail['ticker'].updateEvent -= trail['handler']
+            self.ib.market_data.release(trail['contract'])
+            trail['ticker'] = trail['handler'] = None
+
+    def stop_all(self):
+        """
+        Stop managing every position, e.g. before the end-of-day flatten closes them.
+        """
         for symbol, trail in list(self.active_trails.items()):
-            contract = trail['contract']
-            current_price = self.ib.get_live_price(contract)
-            if current_price is None:
+            self.unsubscribe(symbol, trail)
+            self.book.remove(symbol)
+        self.active_trails.clear()
+        self.native_trails.clear()  # their orders are cancelled with every other working order
+
+    def check_trailing_stops(self):
+        """
+        Sweep every open trail in one vectorized pass over the position book: streaming trails are
+        priced from their latest tick (no IB request), the others with get_live_price.
+        """
+        if not self.active_trails:
+            return
+
+        def price_of(symbol):
+            trail = self.active_trails[symbol]
+            price = tick_price(trail['ticker']) if trail['ticker'] is not None else \
+                self.ib.get_live_price(trail['contract'])
+            if price is None:
                 logging.warning(f"[TRAIL WARNING] {symbol} - No valid price for trailing stop")
-                continue
+            return price
+
+        prices = self.book.prices_from(price_of)
+        breakeven_before = self.book.breakeven.copy()
+        decisions = self.book.evaluate(prices, time.time(), BREAKEVEN_TRIGGER_PERCENT, MAX_LOSS_STOP_PERCENT,
+                                       TIMEOUT_EXIT_MINUTES, USE_ADVANCED_TRAILING)
+        for slot in (self.book.breakeven & ~breakeven_before).nonzero()[0]:
+            logging.info(f"[BREAKEVEN HIT] {self.book.symbols[slot]} crossed {BREAKEVEN_TRIGGER_PERCENT}%")
+        for slot in decisions.nonzero()[0]:
+            self.exit_for(self.book.symbols[slot], int(decisions[slot]), float(prices[slot]))
+
+    def on_price(self, symbol: str, current_price) -> bool:
+        """
+        Apply the breakeven, pullback and timeout rules to one price of `symbol`; exits immediately when
+        one triggers. Returns whether the position was exited.
+        """
+        if symbol not in self.active_trails:
+            return False
+        if current_price is None:
+            logging.warning(f"[TRAIL WARNING] {symbol} - No valid price for trailing stop")
+            return False
+
+        breakeven_before = self.book.get(symbol, 'breakeven_hit')
+        decision = self.book.on_price(symbol, current_price, time.time(), BREAKEVEN_TRIGGER_PERCENT,
+                                      MAX_LOSS_STOP_PERCENT, TIMEOUT_EXIT_MINUTES, USE_ADVANCED_TRAILING)
+        if not breakeven_before and self.book.get(symbol, 'breakeven_hit'):
+            logging.info(f"[BREAKEVEN HIT] {symbol} crossed {BREAKEVEN_TRIGGER_PERCENT}%")
+        if decision == HOLD:
+            return False
+        self.exit_for(symbol, decision, current_price)
+        return True
+
+    def exit_for(self, symbol: str, decision: int, current_price: float):
+        if decision == EXIT_TRAILING:
+            logging.info(f"[TRAIL EXIT] {symbol} dropped {MAX_LOSS_STOP_PERCENT}% from high. Exiting...")
+            self.exit_position(symbol, current_price, "trailing_stop",
+                               f"Trailing Stop ({MAX_LOSS_STOP_PERCENT}% pullback)")
+        else:
+            logging.info(f"[TIMEOUT EXIT] {symbol} held longer than {TIMEOUT_EXIT_MINUTES} min. Exiting...")
+            self.exit_position(symbol, current_price, "timeout", f"Time-Based Exit ({TIMEOUT_EXIT_MINUTES} min)")
+
+    def exit_position(self, symbol: str, current_price: float, log_reason: str, reason: str):
+        trail = self.active_trails.pop(symbol)
+        contract, qty = trail['contract'], trail['qty']
+        self.book.remove(symbol)
+        self.unsubscribe(symbol, trail)
+        self.ib.submit_sell_market_order({
+            'qty': qty,
+            'contract': contract,
+            'underlying': contract.symbol,
+            'exp_month': int(contract.lastTradeDateOrContractMonth[4:6]),
+            'exp_day': int(contract.lastTradeDateOrContractMonth[6:]),
+            'strike': contract.strike,
+            'p_or_c': contract.right.lower(),
+            'peg': False  # a stop exit must not be left unfilled
+        })
+        self.report_exit(symbol, qty, current_price, log_reason, reason)
+        self.ib.stop_stream(contract)
+
+    def report_exit(self, symbol: str, qty: int, price: float, log_reason: str, reason: str):
+        # Log and notify
+        log_trade(symbol, qty, price, "SELL", log_reason)
+        msg = (
+            f"🔴 *Exited Trade: {symbol}*\n"
+            f"> Reason: {reason}\n"
+            f"> Price: ${price:.2f}  Qty: {qty}\n"
+            f"> Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        )
+        (self.notify or send_telegram_message)(msg)
 
-            elapsed_minutes = (now - trail['start_time']) / 60
-            logging.info(
-                f"[TRAIL CHECK] {symbol} | price: {current_price:.2f}, "
-                f"elapsed: {elapsed_minutes:.2f} min"
-            )
 
-            # Adaptive trailing logic
-            if USE_ADVANCED_TRAILING:
-                # Breakeven trigger
-                if not trail['breakeven_hit']:
-                    target = trail['entry_price'] * (1 + BREAKEVEN_TRIGGER_PERCENT / 100)
-                    if current_price >= target:
-                        trail['breakeven_hit'] = True
-                        logging.info(f"[BREAKEVEN HIT] {symbol} crossed {BREAKEVEN_TRIGGER_PERCENT}%")
-
-                # Once breakeven_hit, update highest and check pullback
-                if trail['breakeven_hit']:
-                    if current_price > trail['highest']:
-                        trail['highest'] = current_price
-                        logging.debug(f"[TRAIL UPDATE] {symbol} new high: {current_price:.2f}")
-                    else:
-                        threshold = trail['highest'] * (1 - MAX_LOSS_STOP_PERCENT / 100)
-                        if current_price < threshold:
-                            # Trigger trailing exit
-                            logging.info(
-                                f"[TRAIL EXIT] {symbol} dropped {MAX_LOSS_STOP_PERCENT}% from high. Exiting..."
-                            )
-                            self.ib.submit_sell_market_order({
-                                'qty': trail['qty'],
-                                'underlying': contract.symbol,
-                                'exp_month': int(contract.lastTradeDateOrContractMonth[4:6]),
-                                'exp_day': int(contract.lastTradeDateOrContractMonth[6:]),
-                                'strike': contract.strike,
-                                'p_or_c': contract.right.lower()
-                            })
-                            # Log and notify
-                            log_trade(symbol, trail['qty'], current_price, "SELL", "trailing_stop")
-                            msg = (
-                                f"🔴 *Exited Trade: {symbol}*
-"                                f"> Reason: Trailing Stop ({MAX_LOSS_STOP_PERCENT}% pullback)\n"
-                                f"> Price: ${current_price:.2f}  Qty: {trail['qty']}\n"
-                                f"> Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                            )
-                            send_telegram_message(msg)
-                            self.ib.stop_stream(contract)
-                            to_remove.append(symbol)
-                            continue
-
-            # Time-based exit
-            if elapsed_minutes > TIMEOUT_EXIT_MINUTES:
-                logging.info(
-                    f"[TIMEOUT EXIT] {symbol} held longer than {TIMEOUT_EXIT_MINUTES} min. Exiting..."
-                )
-                self.ib.submit_sell_market_order({
-                    'qty': trail['qty'],
-                    'underlying': contract.symbol,
-                    'exp_month': int(contract.lastTradeDateOrContractMonth[4:6]),
-                    'exp_day': int(contract.lastTradeDateOrContractMonth[6:]),
-                    'strike': contract.strike,
-                    'p_or_c': contract.right.lower()
-                })
-                # Log and notify
-                log_trade(symbol, trail['qty'], current_price, "SELL", "timeout")
-                msg = (
-                    f"🔴 *Exited Trade: {symbol}*
-"                    f"> Reason: Time-Based Exit ({TIMEOUT_EXIT_MINUTES} min)\n"
-                    f"> Price: ${current_price:.2f}  Qty: {trail['qty']}\n"
-                    f"> Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                )
-                send_telegram_message(msg)
-                self.ib.stop_stream(contract)
-                to_remove.append(symbol)
-
-        # Cleanup completed trails
-        for symbol in to_remove:
-            self.active_trails.pop(symbol, None)
+def tick_price(ticker):
+    """
+    Price of a streaming ticker under the quote quality rule, else its best fallback price, else None.
+    """
+    _, price = acceptable_quote(ticker, QUOTE_MAX_SPREAD_PERCENT, QUOTE_MAX_LAST_AGE_SECONDS)
+    if price is None:
+        _, price = fallback_quote(ticker)
+    return price